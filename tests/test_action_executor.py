@@ -0,0 +1,195 @@
+import asyncio
+import json
+
+from tools.benchmarks.stand_ins import ScriptedServer, StandInServer, point_at
+from tools.runtime.action_executor import ActionExecutor
+from tools.runtime.instrumentation import Instrumentation
+
+
+def webhook_action(action_id: str, path: str, **options):
+    action = {"actionId": action_id, "type": "webhook",
+              "trigger": {"webhook": {"url": f"https://example.com{path}", "method": "POST",
+                                      "payload": {"transferId": "$data.transferId"}}}}
+    action.update(options)
+    return action
+
+
+def definition_with(actions, **extra):
+    definition = {"stateMachineId": "test-machine", "states": [{"stateId": "s1", "entryActions": actions}]}
+    definition.update(extra)
+    return definition
+
+
+def run_entry_actions(definition, server: StandInServer, **options):
+    """Run the entry actions of ``s1`` against ``server``; returns the results."""
+    async def scenario():
+        port = await server.start()
+        async with ActionExecutor(point_at(definition, f"http://127.0.0.1:{port}"), **options) as executor:
+            results = await executor.run_entry_actions("s1", {"transferId": "tr-1"}, "mt-1")
+        await server.stop()
+        return results
+
+    return asyncio.run(scenario())
+
+
+def test_webhook_success_renders_payload():
+    server = StandInServer(record_bodies=True)
+    [result] = run_entry_actions(definition_with([webhook_action("a1", "/ok")]), server)
+
+    assert result["status"] == "completed"
+    assert result["attempts"] == 1
+    assert result["result"]["echo"] == {"transferId": "tr-1"}
+    assert json.loads(server.bodies[0]) == {"transferId": "tr-1"}
+
+
+def test_retry_then_fail_counts_attempts():
+    server = StandInServer(fail_paths={"/fail"})
+    action = webhook_action("a1", "/fail", retryCount=2, retryDelay="PT0.001S", onError="retry")
+    [result] = run_entry_actions(definition_with([action]), server)
+
+    assert result["status"] == "failed"
+    assert result["attempts"] == 3
+    assert server.requests == 3
+    assert "500" in result["error"]
+
+
+def test_abort_stops_later_actions():
+    server = StandInServer(fail_paths={"/fail"})
+    actions = [webhook_action("a1", "/fail", onError="abort"), webhook_action("a2", "/ok")]
+    results = run_entry_actions(definition_with(actions), server)
+
+    assert [result["status"] for result in results] == ["aborted"]
+    assert server.requests == 1
+
+
+def test_timeout_follows_on_timeout_strategy():
+    server = StandInServer(delay=0.5, slow_paths={"/slow"})
+    action = webhook_action("a1", "/slow", timeout="PT0.05S", onTimeout="proceed", onError="abort")
+    [result] = run_entry_actions(definition_with([action]), server)
+
+    assert result["status"] == "proceeded"
+    assert result["attempts"] == 1
+    assert "no response" in result["error"]
+
+
+def test_timeout_falls_back_to_global_error_handler():
+    server = StandInServer(delay=0.5, slow_paths={"/slow"})
+    action = webhook_action("a1", "/slow", timeout="PT0.05S")
+    definition = definition_with([action], globalErrorHandler={"onTimeout": "abort"})
+    [result] = run_entry_actions(definition, server)
+
+    assert result["status"] == "aborted"
+
+
+def test_callback_falls_back_to_global_callback_handler():
+    server = StandInServer(record_bodies=True)
+    definition = definition_with([webhook_action("a1", "/ok")],
+                                 globalCallbackHandler={"webhook": {"url": "https://example.com/global"}})
+    [result] = run_entry_actions(definition, server)
+
+    assert result["status"] == "completed"
+    callback = json.loads(server.bodies[-1])
+    assert callback["instanceId"] == "mt-1"
+    assert callback["actionId"] == "a1"
+    assert callback["status"] == "completed"
+
+
+def test_action_callback_takes_precedence_over_global_handler():
+    server = StandInServer(record_bodies=True)
+    action = webhook_action("a1", "/ok", callback={"webhook": {"url": "https://example.com/own"}})
+    definition = definition_with([action], globalCallbackHandler={"webhook": {"url": "https://example.com/global"}})
+    run_entry_actions(definition, server)
+
+    assert server.requests == 2
+
+
+def test_notify_strategy_reports_to_global_callback():
+    server = StandInServer(fail_paths={"/fail"}, record_bodies=True)
+    action = webhook_action("a1", "/fail", onError="notify")
+    definition = definition_with([action], globalCallbackHandler={"webhook": {"url": "https://example.com/global"}})
+    [result] = run_entry_actions(definition, server)
+
+    assert result["status"] == "failed"
+    notification = json.loads(server.bodies[-1])
+    assert notification["strategy"] == "notify"
+    assert notification["status"] == "failed"
+
+
+def test_max_per_host_bounds_requests_in_flight():
+    server = StandInServer(delay=0.02, slow_paths={"/slow"})
+
+    async def scenario():
+        port = await server.start()
+        definition = point_at(definition_with([webhook_action("a1", "/slow")]), f"http://127.0.0.1:{port}")
+        async with ActionExecutor(definition, max_per_host=3) as executor:
+            batches = await asyncio.gather(*(executor.run_entry_actions("s1", {"transferId": f"tr-{i}"})
+                                             for i in range(20)))
+        await server.stop()
+        return batches
+
+    batches = asyncio.run(scenario())
+
+    assert all(batch[0]["status"] == "completed" for batch in batches)
+    assert server.requests == 20
+    assert server.peak <= 3
+    assert server.connections <= 3
+
+
+def test_ad_hoc_webhooks_render_their_own_payload():
+    server = StandInServer(record_bodies=True)
+
+    async def scenario():
+        port = await server.start()
+        async with ActionExecutor(definition_with([])) as executor:
+            for i in range(50):
+                # Each dict is dropped after the call, so its id() is free for the next one.
+                action = point_at(webhook_action(f"a{i}", "/ok"), f"http://127.0.0.1:{port}")
+                action["trigger"]["webhook"]["payload"] = {"n": i}
+                await executor.run_action(action, {})
+            cached = len(executor.payloads)
+        await server.stop()
+        return cached
+
+    assert asyncio.run(scenario()) == 0
+    assert [json.loads(body)["n"] for body in server.bodies] == list(range(50))
+
+
+def test_metrics_report_the_state_of_a_reused_action_id():
+    server = StandInServer()
+    definition = definition_with([webhook_action("notify", "/ok")])
+    definition["states"].append({"stateId": "s2", "entryActions": [webhook_action("notify", "/ok")]})
+    metrics = Instrumentation()
+
+    async def scenario():
+        port = await server.start()
+        async with ActionExecutor(point_at(definition, f"http://127.0.0.1:{port}"), metrics=metrics) as executor:
+            await executor.run_entry_actions("s1", {"transferId": "tr-1"})
+            await executor.run_entry_actions("s2", {"transferId": "tr-1"})
+        await server.stop()
+
+    asyncio.run(scenario())
+
+    exposition = metrics.render_prometheus()
+    for state_id in ("s1", "s2"):
+        assert ('fsm_action_attempts_total{stateMachineId="test-machine",stateId="%s",actionId="notify",'
+                'outcome="completed"} 1' % state_id) in exposition
+
+
+def test_broken_replies_follow_on_error():
+    replies = [b"HTTP/1.1 200 OK\r\nContent-Length: 100\r\n\r\ntruncated",
+               b"HTTP/1.1 twohundred OK\r\nContent-Length: 0\r\n\r\n",
+               b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\nzz\r\nok\r\n0\r\n\r\n"]
+    for reply in replies:
+        definition = definition_with([webhook_action("a1", "/hook", onError="proceed")])
+        [result] = run_entry_actions(definition, ScriptedServer(reply, close=True))
+
+        assert result["status"] == "proceeded", reply
+        assert result["error"]
+
+
+def test_no_content_reply_completes_without_a_timeout():
+    definition = definition_with([webhook_action("a1", "/hook", timeout="PT2S")])
+    [result] = run_entry_actions(definition, ScriptedServer(b"HTTP/1.1 204 No Content\r\n\r\n"))
+
+    assert result["status"] == "completed"
+    assert result["result"] is None
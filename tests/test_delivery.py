@@ -0,0 +1,182 @@
+import asyncio
+import json
+import os
+
+from tools.benchmarks.stand_ins import InProcessBroker, StandInServer, check_order, point_at
+from tools.runtime.action_executor import ActionExecutor
+from tools.runtime.delivery import BrokerSink, DeliveryError, DeliveryPipeline, FileSink, Sink, SinkBatcher, WebhookSink
+from tools.runtime.http_client import HTTPClient
+from tools.runtime.instrumentation import Instrumentation
+
+INSTANCES = 50
+CHANGES = 8
+LIMITS = {"linger": 0.002, "max_batch": 16, "lanes": 4}
+
+
+async def publish(batcher: SinkBatcher):
+    for seq in range(CHANGES):
+        for i in range(INSTANCES):
+            await batcher.put(f"mt-{i}", {"instanceId": f"mt-{i}", "seq": seq})
+            if i % 10 == 9:
+                await asyncio.sleep(0)
+    await batcher.close()
+
+
+class FlakySink(Sink):
+    """Fails the first ``failures`` sends, then keeps every batch it is given."""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = 0
+        self.batches = []
+
+    async def send(self, items, keys):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise DeliveryError("503 Service Unavailable")
+        self.batches.append([json.loads(item) for item in items])
+
+
+def test_webhook_sink_keeps_instance_order():
+    server = StandInServer(record_bodies=True)
+
+    async def scenario():
+        port = await server.start()
+        batcher = SinkBatcher(WebhookSink({"url": f"http://127.0.0.1:{port}/callback"}), **LIMITS)
+        await publish(batcher)
+        await server.stop()
+        return batcher
+
+    batcher = asyncio.run(scenario())
+
+    values = [json.dumps(item).encode() for body in server.bodies for item in json.loads(body)]
+    assert check_order(values, INSTANCES, CHANGES) is None
+    assert server.requests == batcher.batches < INSTANCES * CHANGES
+    assert batcher.delivered == INSTANCES * CHANGES
+
+
+def test_broker_sink_keeps_instance_order_per_partition():
+    broker = InProcessBroker(partitions=4, round_trip=0.0)
+    batcher = SinkBatcher(BrokerSink(broker, "state-changes"), **LIMITS)
+    asyncio.run(publish(batcher))
+
+    assert check_order(broker.values("state-changes"), INSTANCES, CHANGES) is None
+    assert broker.requests == batcher.batches
+
+
+def test_file_sink_keeps_instance_order(tmp_path):
+    path = os.path.join(tmp_path, "changes.jsonl")
+    asyncio.run(publish(SinkBatcher(FileSink(path), **LIMITS)))
+
+    with open(path, 'rb') as f:
+        assert check_order(f.read().splitlines(), INSTANCES, CHANGES) is None
+
+
+def test_failed_batch_is_retried_then_dropped():
+    sink = FlakySink(failures=3)
+
+    async def scenario():
+        batcher = SinkBatcher(sink, linger=0.0, lanes=1, retries=2, retry_delay=0.001)
+        await batcher.put("mt-1", {"seq": 0})
+        await batcher.flush()
+        # The lane survives the dropped batch and delivers the next one.
+        await batcher.put("mt-1", {"seq": 1})
+        await batcher.close()
+        return batcher
+
+    batcher = asyncio.run(scenario())
+
+    assert batcher.failed == 1
+    assert batcher.delivered == 1
+    assert sink.calls == 4
+    assert sink.batches == [[{"seq": 1}]]
+
+
+def test_failed_batch_is_retried_until_accepted():
+    sink = FlakySink(failures=2)
+
+    async def scenario():
+        batcher = SinkBatcher(sink, linger=0.0, lanes=1, retries=2, retry_delay=0.001)
+        await batcher.put("mt-1", {"seq": 0})
+        await batcher.close()
+        return batcher
+
+    batcher = asyncio.run(scenario())
+
+    assert (batcher.failed, batcher.delivered, sink.calls) == (0, 1, 3)
+
+
+def test_pipeline_closes_only_its_own_client():
+    async def scenario():
+        shared = HTTPClient()
+        async with DeliveryPipeline(client=shared) as pipeline:
+            pipeline.webhook({"url": "http://127.0.0.1:9/callback"})
+        owned = DeliveryPipeline()
+        owned.webhook({"url": "http://127.0.0.1:9/callback"})
+        closed = []
+        owned.client.close = lambda: asyncio.sleep(0, closed.append(True))
+        shared_close = []
+        shared.close = lambda: asyncio.sleep(0, shared_close.append(True))
+        await owned.close()
+        return closed, shared_close
+
+    closed, shared_close = asyncio.run(scenario())
+
+    assert closed == [True]
+    assert shared_close == []
+
+
+def test_executor_close_flushes_queued_callbacks():
+    server = StandInServer(record_bodies=True)
+    definition = {"stateMachineId": "test-machine",
+                  "globalCallbackHandler": {"webhook": {"url": "https://example.com/global"}},
+                  "states": [{"stateId": "s1", "entryActions": [
+                      {"actionId": "a1", "trigger": {"webhook": {"url": "https://example.com/ok"}}}]}]}
+
+    async def scenario():
+        port = await server.start()
+        async with DeliveryPipeline(linger=60.0) as pipeline:
+            executor = ActionExecutor(point_at(definition, f"http://127.0.0.1:{port}"), delivery=pipeline)
+            await executor.run_entry_actions("s1", {}, "mt-1")
+            await executor.close()
+            delivered = sum(batcher.delivered for batcher in pipeline.batchers.values())
+        await server.stop()
+        return delivered
+
+    assert asyncio.run(scenario()) == 1
+    callback = json.loads(server.bodies[-1])
+    assert callback == [{"instanceId": "mt-1", "actionId": "a1", "status": "completed",
+                         "result": {"success": True, "echo": None}}]
+
+
+def test_delivery_latency_is_exported_with_the_other_metrics():
+    metrics = Instrumentation()
+
+    async def scenario():
+        async with DeliveryPipeline(metrics=metrics, linger=0.0) as pipeline:
+            batcher = pipeline.add("changes", FlakySink(failures=0))
+            for seq in range(3):
+                await batcher.put("mt-1", {"seq": seq})
+        return batcher
+
+    batcher = asyncio.run(scenario())
+
+    exposition = metrics.render_prometheus()
+    assert "# TYPE fsm_delivery_latency_seconds histogram" in exposition
+    assert 'fsm_delivery_latency_seconds_count{sink="changes"} 3' in exposition
+    assert sum(batcher.metrics()["latencyMs"]["buckets"].values()) + batcher.metrics()["latencyMs"]["over"] == 3
+
+
+def test_pipeline_metrics_report_every_batcher():
+    async def scenario(metrics):
+        async with DeliveryPipeline(metrics=metrics, linger=0.0) as pipeline:
+            await pipeline.add("changes", FlakySink(failures=0)).put("mt-1", {"seq": 0})
+            await pipeline.add("audit", FlakySink(failures=0)).put("mt-1", {"seq": 0})
+            await pipeline.flush()
+            return pipeline.metrics()
+
+    for metrics in (None, Instrumentation()):
+        report = asyncio.run(scenario(metrics))
+
+        assert sorted(report) == ["audit", "changes"]
+        assert report["changes"]["delivered"] == report["audit"]["delivered"] == 1
@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+import pytest
+
+from tools.benchmarks.stand_ins import ScriptedServer
+from tools.runtime.http_client import HTTPClient, HTTPError
+
+
+def request_twice(server: ScriptedServer, method: str = "POST"):
+    """Send two requests through one client; returns the responses and the connections it opened."""
+    async def scenario():
+        port = await server.start()
+        client = HTTPClient()
+        try:
+            responses = [await asyncio.wait_for(client.request(method, f"http://127.0.0.1:{port}/hook", b"{}"), 2.0)
+                         for _ in range(2)]
+        finally:
+            await client.close()
+            await server.stop()
+        return responses, client.connections_opened
+
+    return asyncio.run(scenario())
+
+
+def test_no_content_on_keep_alive_does_not_wait_for_close():
+    start = time.perf_counter()
+    responses, opened = request_twice(ScriptedServer(b"HTTP/1.1 204 No Content\r\n\r\n"))
+
+    assert [(response.status, response.body) for response in responses] == [(204, b""), (204, b"")]
+    assert opened == 1
+    assert time.perf_counter() - start < 1.0
+
+
+def test_not_modified_and_head_replies_have_no_body():
+    responses, opened = request_twice(ScriptedServer(b"HTTP/1.1 304 Not Modified\r\nContent-Length: 12\r\n\r\n"))
+    assert [response.body for response in responses] == [b"", b""]
+    assert opened == 1
+
+    responses, opened = request_twice(ScriptedServer(b"HTTP/1.1 200 OK\r\nContent-Length: 12\r\n\r\n"), "HEAD")
+    assert [response.body for response in responses] == [b"", b""]
+    assert opened == 1
+
+
+def test_interim_response_is_skipped():
+    responses, _ = request_twice(ScriptedServer(b"HTTP/1.1 100 Continue\r\n\r\n"
+                                                b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok"))
+    assert [(response.status, response.body) for response in responses] == [(200, b"ok"), (200, b"ok")]
+
+
+def test_body_without_length_is_read_until_close():
+    responses, opened = request_twice(ScriptedServer(b"HTTP/1.1 200 OK\r\nConnection: close\r\n\r\nall of it",
+                                                     close=True))
+    assert [response.body for response in responses] == [b"all of it", b"all of it"]
+    assert opened == 2
+
+
+def test_keep_alive_reply_without_length_is_not_reused():
+    responses, opened = request_twice(ScriptedServer(b"HTTP/1.1 200 OK\r\n\r\n"))
+    assert [response.status for response in responses] == [200, 200]
+    assert opened == 2
+
+
+@pytest.mark.parametrize("reply", [
+    b"HTTP/1.1 200 OK\r\nContent-Length: 100\r\n\r\ntruncated",
+    b"HTTP/1.1 twohundred OK\r\nContent-Length: 0\r\n\r\n",
+    b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\nzz\r\nok\r\n0\r\n\r\n",
+], ids=["truncated", "status", "chunk-size"])
+def test_broken_replies_raise_http_error(reply):
+    with pytest.raises(HTTPError):
+        request_twice(ScriptedServer(reply, close=True))
+
+
+def test_retry_on_a_fresh_connection_closes_the_other_idle_ones():
+    async def scenario():
+        server = ScriptedServer(b"HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n")
+        port = await server.start()
+        client = HTTPClient()
+        key = ("http", "127.0.0.1", port)
+        await asyncio.gather(*(client.request("GET", f"http://127.0.0.1:{port}/hook") for _ in range(3)))
+        idle = list(client._idle[key])
+        # What request() does after a pooled connection turned out to be closed by the server.
+        connection, reused = await client._acquire_fresh(key)
+        closing = [pooled.writer.is_closing() for pooled in idle]
+        for pooled in idle + [connection]:
+            pooled.close()
+        await client.close()
+        await server.stop()
+        return closing, reused
+
+    assert asyncio.run(scenario()) == ([True, True, True], False)
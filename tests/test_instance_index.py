@@ -0,0 +1,43 @@
+from datetime import datetime
+
+import pytest
+
+from tools.storage import instance_index
+from tools.storage.instance_index import UNKNOWN_TIME, InstanceIndex, timestamp_key
+
+NOON = datetime.fromisoformat("2024-05-01T12:00:00+00:00").timestamp()
+
+
+class StrictDatetime(datetime):
+    """``datetime`` as before Python 3.11, whose fromisoformat rejects a trailing Z."""
+
+    @classmethod
+    def fromisoformat(cls, value):
+        if value.endswith(("Z", "z")):
+            raise ValueError(f"Invalid isoformat string: {value!r}")
+        return super().fromisoformat(value)
+
+
+@pytest.fixture(params=[datetime, StrictDatetime], ids=["current", "pre-3.11"])
+def parser(request, monkeypatch):
+    monkeypatch.setattr(instance_index, "datetime", request.param)
+
+
+def test_utc_designator_is_parsed(parser):
+    assert timestamp_key("2024-05-01T12:00:00Z") == NOON
+    assert timestamp_key("2024-05-01T12:00:00+00:00") == NOON
+    assert timestamp_key("2024-05-01T12:00:00") == NOON
+    assert timestamp_key("2024-05-01T14:00:00+02:00") == NOON
+    assert timestamp_key("not a time") == UNKNOWN_TIME
+    assert timestamp_key(None) == UNKNOWN_TIME
+
+
+def test_stale_selects_only_old_instances(parser):
+    index = InstanceIndex()
+    index.update("mt-1", "confirm", "2024-05-01T11:00:00Z")
+    index.update("mt-2", "confirm", "2024-05-01T11:59:30Z")
+    index.update("mt-3", "done", "2024-05-01T10:00:00Z")
+
+    assert index.stale(600, now=NOON) == ["mt-3", "mt-1"]
+    assert index.stale(600, ["confirm"], now=NOON) == ["mt-1"]
+    assert index.updated_before("2024-05-01T11:30:00Z") == ["mt-3", "mt-1"]
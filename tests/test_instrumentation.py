@@ -0,0 +1,125 @@
+import os
+import random
+
+import pytest
+
+from tools.runtime import instrumentation
+from tools.runtime.engine import StateMachineEngine
+from tools.runtime.instrumentation import Instrumentation, every_nth_sampler, rate_sampler
+
+DEFINITION = {
+    "stateMachineId": "test-machine",
+    "states": [{"stateId": "start", "baseStateType": "initial"}, {"stateId": "done"}],
+    "transitions": [{"transitionId": "t1", "fromStateId": "start", "toStateId": "done",
+                     "event": [{"eventId": "finish"}]}],
+}
+
+
+def test_histogram_exposition_has_cumulative_buckets_and_inf():
+    metrics = Instrumentation()
+    histogram = metrics.histogram("fsm_test_seconds", "Test latency", (("stateId", "s1"),), (0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value)
+
+    assert metrics.render_prometheus() == (
+        '# HELP fsm_test_seconds Test latency\n'
+        '# TYPE fsm_test_seconds histogram\n'
+        'fsm_test_seconds_bucket{stateId="s1",le="0.1"} 1\n'
+        'fsm_test_seconds_bucket{stateId="s1",le="1"} 3\n'
+        'fsm_test_seconds_bucket{stateId="s1",le="+Inf"} 4\n'
+        'fsm_test_seconds_sum{stateId="s1"} 6.05\n'
+        'fsm_test_seconds_count{stateId="s1"} 4\n')
+
+
+def test_counters_and_label_escaping():
+    metrics = Instrumentation()
+    metrics.counter("fsm_b_total", "Second", (("actionId", 'say "hi"\\now\n'),)).inc(2)
+    metrics.counter("fsm_a_total", "First", ()).inc()
+
+    assert metrics.render_prometheus().splitlines() == [
+        "# HELP fsm_a_total First",
+        "# TYPE fsm_a_total counter",
+        "fsm_a_total 1",
+        "# HELP fsm_b_total Second",
+        "# TYPE fsm_b_total counter",
+        'fsm_b_total{actionId="say \\"hi\\"\\\\now\\n"} 2',
+    ]
+
+
+def test_instrument_engine_times_each_transition_until_removed():
+    metrics = Instrumentation()
+    engine = metrics.instrument_engine(StateMachineEngine(DEFINITION))
+    instance = engine.new_instance("mt-1")
+    engine.fire(instance, "finish")
+    engine.fire(instance, "finish")
+
+    exposition = metrics.render_prometheus()
+    assert ('fsm_transition_duration_seconds_count{stateMachineId="test-machine",stateId="start",'
+            'transitionId="t1"} 1') in exposition
+    assert ('fsm_transition_duration_seconds_count{stateMachineId="test-machine",stateId="done",'
+            'transitionId="none"} 1') in exposition
+
+    Instrumentation.uninstrument_engine(engine)
+    assert "fire" not in vars(engine)
+    engine.fire(engine.new_instance("mt-2"), "finish")
+    assert metrics.render_prometheus() == exposition
+
+
+def test_samplers():
+    every_third = every_nth_sampler(3)
+    assert [every_third() for _ in range(7)] == [True, False, False, True, False, False, True]
+    assert not any(rate_sampler(0.0)() for _ in range(100))
+    assert all(rate_sampler(1.0)() for _ in range(100))
+    half = rate_sampler(0.5, random.Random(1))
+    assert 400 < sum(half() for _ in range(1000)) < 600
+
+
+def test_sampler_limits_timed_calls():
+    metrics = Instrumentation(sampler=every_nth_sampler(2))
+    engine = metrics.instrument_engine(StateMachineEngine(DEFINITION))
+    for i in range(10):
+        engine.fire(engine.new_instance(f"mt-{i}"), "finish")
+
+    assert 'transitionId="t1"} 5' in metrics.render_prometheus()
+
+
+def test_write_prometheus_replaces_the_file_in_one_step(tmp_path, monkeypatch):
+    path = os.path.join(tmp_path, "metrics", "fsm.prom")
+    metrics = Instrumentation()
+    metrics.counter("fsm_a_total", "First", ()).inc()
+    metrics.write_prometheus(path)
+    before = open(path).read()
+
+    seen = []
+    replace = os.replace
+
+    def observing_replace(source, target):
+        # Until the rename, readers still see the complete previous exposition.
+        seen.append((open(target).read(), open(source).read()))
+        replace(source, target)
+
+    metrics.counter("fsm_a_total", "First", ()).inc()
+    monkeypatch.setattr(instrumentation.os, "replace", observing_replace)
+    metrics.write_prometheus(path)
+
+    after = metrics.render_prometheus()
+    assert seen == [(before, after)]
+    assert open(path).read() == after
+    assert os.listdir(os.path.dirname(path)) == ["fsm.prom"]
+
+
+def test_failed_render_leaves_the_previous_file(tmp_path, monkeypatch):
+    path = os.path.join(tmp_path, "fsm.prom")
+    metrics = Instrumentation()
+    metrics.write_prometheus(path)
+    before = open(path).read()
+
+    def broken():
+        raise RuntimeError("render failed")
+
+    monkeypatch.setattr(metrics, "render_prometheus", broken)
+    with pytest.raises(RuntimeError):
+        metrics.write_prometheus(path)
+
+    assert open(path).read() == before
+    assert os.listdir(tmp_path) == ["fsm.prom"]
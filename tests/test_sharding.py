@@ -0,0 +1,37 @@
+import pytest
+
+from tools.runtime.sharding import ShardedExecutor
+
+DEFINITION = {
+    "stateMachineId": "test-machine",
+    "states": [{"stateId": "start", "baseStateType": "initial"}, {"stateId": "done"}],
+    "transitions": [{"transitionId": "t1", "fromStateId": "start", "toStateId": "done",
+                     "event": [{"eventId": "finish"}]}],
+}
+
+
+def test_batches_are_cut_to_fit_a_small_ring():
+    # 200 commands of ~700 bytes would be one 140 KB batch by count alone.
+    with ShardedExecutor(DEFINITION, workers=1, ring_bytes=8192, batch_size=256, collect=True) as executor:
+        for i in range(100):
+            executor.create(f"mt-{i}", {"note": "x" * 600})
+            executor.fire(f"mt-{i}", "finish", {"note": "y" * 600})
+        results = executor.drain()
+        [summary] = executor.stop(return_instances=True)
+        results += executor.results
+
+    assert summary["transitions"] == 100
+    assert sorted(result[1] for result in results) == sorted(f"mt-{i}" for i in range(100))
+    assert {document["currentState"] for document in executor.instances.values()} == {"done"}
+
+
+def test_command_larger_than_the_ring_is_dropped_without_losing_others():
+    with ShardedExecutor(DEFINITION, workers=1, ring_bytes=8192, collect=True) as executor:
+        executor.create("mt-1")
+        executor.create("mt-2", {"note": "x" * 10000})
+        executor.fire("mt-1", "finish")
+        with pytest.raises(ValueError, match="mt-2"):
+            executor.flush()
+        [summary] = executor.stop()
+
+    assert (summary["instances"], summary["transitions"]) == (1, 1)
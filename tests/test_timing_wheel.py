@@ -0,0 +1,100 @@
+import asyncio
+import logging
+
+import pytest
+
+from tools.runtime.timing_wheel import TimerScheduler, TimingWheel
+
+
+def test_due_timers_fire_on_their_tick_across_levels():
+    # 4 slots x 3 levels: level 0 spans 4 ticks, level 1 16, level 2 64; later timers overflow.
+    wheel = TimingWheel(tick=1.0, slots=4, levels=3, now=0.0)
+    dues = [200, 3, 17, 70, 5, 64, 1]
+    for due in dues:
+        wheel.schedule(float(due), timer_id=f"t{due}")
+    assert sorted(wheel.overflow) == ["t200", "t64", "t70"]
+
+    fired = []
+    for tick in range(1, 210):
+        fired.extend((tick, timer.timer_id) for timer in wheel.advance(float(tick)))
+
+    assert fired == [(due, f"t{due}") for due in sorted(dues)]
+    assert len(wheel) == 0
+
+
+def test_advance_over_many_ticks_returns_everything_due():
+    wheel = TimingWheel(tick=1.0, slots=4, levels=2, now=0.0)
+    for due in (2, 9, 30, 40):
+        wheel.schedule(float(due), timer_id=f"t{due}")
+
+    assert sorted(timer.timer_id for timer in wheel.advance(35.0)) == ["t2", "t30", "t9"]
+    assert [timer.timer_id for timer in wheel.advance(40.0)] == ["t40"]
+
+
+def test_cancel_and_reschedule():
+    wheel = TimingWheel(tick=1.0, slots=4, levels=2, now=0.0)
+    wheel.schedule(3.0, timer_id="a")
+    wheel.schedule(3.0, timer_id="b")
+    wheel.schedule(2.0, timer_id="c")
+    wheel.schedule(6.0, timer_id="c")
+
+    assert wheel.cancel("a") is True
+    assert wheel.cancel("a") is False
+    assert [timer.timer_id for timer in wheel.advance(5.0)] == ["b"]
+    assert [timer.timer_id for timer in wheel.advance(6.0)] == ["c"]
+    assert wheel.metrics()["cancelled"] == 2
+
+
+def test_wait_for_times_out_or_returns_the_result():
+    async def answer():
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def scenario():
+        scheduler = TimerScheduler(wheel=TimingWheel(tick=0.005))
+        scheduler.start()
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await scheduler.wait_for(asyncio.sleep(5), 0.05)
+            result = await scheduler.wait_for(answer(), 5.0)
+            return result, len(scheduler.wheel)
+        finally:
+            await scheduler.stop()
+
+    assert asyncio.run(scenario()) == (42, 0)
+
+
+def test_scheduler_keeps_running_after_a_failing_handler(caplog):
+    delivered = []
+
+    async def fail_later():
+        raise RuntimeError("async handler failed")
+
+    def handler(timer):
+        if timer.payload == "bad":
+            raise RuntimeError("handler failed")
+        if timer.payload == "async-bad":
+            return fail_later()
+        delivered.append(timer.timer_id)
+
+    async def scenario():
+        scheduler = TimerScheduler(handler=handler, wheel=TimingWheel(tick=0.005))
+        scheduler.start()
+        scheduler.schedule("first", 0.01, "bad")
+        scheduler.schedule("second", 0.01, "async-bad")
+        scheduler.schedule("third", 0.03, "good")
+        for _ in range(100):
+            if delivered:
+                break
+            await asyncio.sleep(0.01)
+        running = not scheduler._task.done()
+        await scheduler.stop()
+        return running
+
+    with caplog.at_level(logging.ERROR, logger="tools.runtime.timing_wheel"):
+        assert asyncio.run(scenario()) is True
+
+    assert delivered == ["third"]
+    messages = [record.getMessage() for record in caplog.records]
+    assert "Timer first failed" in messages
+    assert "Timer handler failed" in messages
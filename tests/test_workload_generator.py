@@ -0,0 +1,47 @@
+import re
+
+import pytest
+
+from tools.generators.workload_generator import generate_definition, generate_instances
+
+TYPES = {"number": (int, float), "string": str, "boolean": bool}
+
+
+def schema_problems(data, schema):
+    """What keeps ``data`` from validating against the generated schemas (a subset of JSON Schema)."""
+    problems = [f"missing {name}" for name in schema.get("required", []) if name not in data]
+    for name, value in data.items():
+        rules = schema["properties"].get(name)
+        if rules is None:
+            continue
+        if not isinstance(value, TYPES[rules["type"]]) or (rules["type"] == "number" and isinstance(value, bool)):
+            problems.append(f"{name} is not a {rules['type']}")
+        elif "enum" in rules and value not in rules["enum"]:
+            problems.append(f"{name} not in {rules['enum']}")
+        elif "pattern" in rules and not re.search(rules["pattern"], value):
+            problems.append(f"{name} does not match {rules['pattern']}")
+        elif "minimum" in rules and value < rules["minimum"]:
+            problems.append(f"{name} below {rules['minimum']}")
+    return problems
+
+
+@pytest.mark.parametrize("schema_properties", [1, 5, 8])
+def test_generated_state_data_matches_the_state_schemas(schema_properties):
+    definition = generate_definition(30, schema_properties=schema_properties, seed=3)
+    schemas = {state["stateId"]: state["data"]["schema"] for state in definition["states"] if "data" in state}
+
+    checked = 0
+    for instance, documents in generate_instances(definition, 50, seed=3, data_dir="state-data"):
+        for document in documents:
+            if document["stateId"] in schemas:
+                assert schema_problems(document["data"], schemas[document["stateId"]]) == [], document
+                checked += 1
+    assert checked > 50
+
+
+def test_too_few_transitions_are_refused():
+    with pytest.raises(ValueError, match="at least 9"):
+        generate_definition(10, transitions=5)
+
+    definition = generate_definition(10, transitions=9)
+    assert len(definition["transitions"]) == 9
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+import glob
+import hashlib
+import os
+import time
+from typing import Callable, Dict, List, Any, Optional, Tuple
+
+DEFAULT_CACHE_DIR = ".fsm-cache"
+
+# A worker turns the input file's text into the output text; it must be a module-level function.
+Converter = Callable[[str, Dict[str, Any]], str]
+
+
+def tool_version(*paths: str) -> str:
+    """Fingerprint of the tool's source files, so cached outputs expire when the code changes."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def expand_inputs(pattern: str, suffixes: Tuple[str, ...]) -> List[str]:
+    """Files for a batch: a directory (searched recursively for ``suffixes``), a glob, or one file."""
+    if os.path.isdir(pattern):
+        paths = [os.path.join(root, name)
+                 for root, _, names in os.walk(pattern)
+                 for name in names if name.endswith(suffixes)]
+    else:
+        paths = [path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path)]
+    return sorted(paths)
+
+
+class ContentCache:
+    """Outputs keyed on a hash of the input bytes, the options and the tool version.
+
+    Entries live under ``cache_dir/<tool>/<key[:2]>/<key>`` and hold the
+    output bytes, so a missing or stale output file is restored without
+    converting again.
+    """
+
+    def __init__(self, cache_dir: str, tool: str, version: str):
+        self.root = os.path.join(cache_dir, tool)
+        self.version = version
+
+    def key(self, content: bytes, options: Dict[str, Any]) -> str:
+        digest = hashlib.sha256(self.version.encode())
+        digest.update(repr(sorted(options.items())).encode())
+        digest.update(content)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, output: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as f:
+            f.write(output)
+        os.replace(temporary, path)
+
+
+def _convert(converter: Converter, input_path: str, options: Dict[str, Any]) -> Tuple[str, float]:
+    start = time.perf_counter()
+    with open(input_path, 'r', encoding='utf-8') as f:
+        output = converter(f.read(), options)
+    return output, time.perf_counter() - start
+
+
+def _write_if_changed(path: str, output: bytes) -> bool:
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == output:
+                return False
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(output)
+    return True
+
+
+def run_batch(jobs: List[Tuple[str, str]], converter: Converter, options: Dict[str, Any],
+              cache: Optional[ContentCache], workers: Optional[int] = None) -> Dict[str, Any]:
+    """Convert ``(input, output)`` pairs on a process pool, skipping inputs found in the cache.
+
+    Workers import the tool once and then handle many files, which avoids
+    paying interpreter start-up and heavy imports per file.
+    """
+    start = time.perf_counter()
+    summary = {"files": len(jobs), "converted": 0, "cacheHits": 0, "failed": 0, "written": 0,
+               "convertSeconds": 0.0, "errors": []}
+
+    pending = []
+    for input_path, output_path in jobs:
+        with open(input_path, 'rb') as f:
+            key = cache.key(f.read(), options) if cache else None
+        cached = cache.get(key) if cache else None
+        if cached is not None:
+            summary["cacheHits"] += 1
+            summary["written"] += _write_if_changed(output_path, cached)
+        else:
+            pending.append((input_path, output_path, key))
+
+    if pending:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(pool.submit(_convert, converter, input_path, options), input_path, output_path, key)
+                       for input_path, output_path, key in pending]
+            for future, input_path, output_path, key in futures:
+                try:
+                    output, seconds = future.result()
+                except Exception as e:
+                    summary["failed"] += 1
+                    summary["errors"].append(f"{input_path}: {e}")
+                    continue
+                data = output.encode('utf-8')
+                summary["converted"] += 1
+                summary["convertSeconds"] += seconds
+                summary["written"] += _write_if_changed(output_path, data)
+                if cache:
+                    cache.put(key, data)
+
+    summary["elapsedSeconds"] = time.perf_counter() - start
+    return summary
+
+
+def output_path_for(input_path: str, input_root: str, output_dir: str, suffix: str) -> str:
+    """Mirror ``input_path`` below ``output_dir`` with a new file suffix."""
+    base = input_root if os.path.isdir(input_root) else os.path.dirname(input_root.split("*", 1)[0]) or "."
+    relative = os.path.relpath(input_path, base)
+    if relative.startswith(".."):
+        relative = os.path.basename(input_path)
+    return os.path.join(output_dir, os.path.splitext(relative)[0] + suffix)
+
+
+def print_summary(summary: Dict[str, Any]):
+    print(f"{summary['files']} files: {summary['converted']} converted, {summary['cacheHits']} cache hits, "
+          f"{summary['failed']} failed, {summary['written']} outputs written "
+          f"in {summary['elapsedSeconds']:.2f} s")
+    if summary["converted"]:
+        print(f"Conversion time {summary['convertSeconds']:.2f} s "
+              f"({summary['convertSeconds'] / summary['converted'] * 1000:.1f} ms/file across workers)")
+    for error in summary["errors"]:
+        print(f"  failed: {error}")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tools.benchmarks.stand_ins import StandInServer, point_at
+from tools.runtime.action_executor import ActionExecutor
+
+DEFAULT_DEFINITION = os.path.join(os.path.dirname(__file__), '..', '..', 'definitions', 'money-transfer-definition.json')
+
+
+async def run(definition, instances: int, max_concurrency: int, max_per_host: int):
+    server = StandInServer(delay=0.05, slow_paths={"/process"}, fail_paths={"/verify"})
+    port = await server.start()
+    definition = point_at(definition, f"http://127.0.0.1:{port}")
+    for state in definition["states"]:
+        for action in state.get("entryActions", []):
+            # Keep the benchmark short: retries after 1 ms and a tight timeout on the slow endpoint.
+            if "retryDelay" in action:
+                action["retryDelay"] = "PT0.001S"
+            if action.get("actionId") == "processAction":
+                action["timeout"] = "PT0.01S"
+
+    async with ActionExecutor(definition, max_concurrency=max_concurrency, max_per_host=max_per_host) as executor:
+        start = time.perf_counter()
+        jobs = [executor.run_entry_actions(state_id, {"transferId": f"tr-{i}", "errorMessage": "boom"}, f"mt-{i}")
+                for i in range(instances) for state_id in ("init", "verify", "process", "complete")]
+        results = await asyncio.gather(*jobs)
+        elapsed = time.perf_counter() - start
+
+    statuses = {}
+    for batch in results:
+        for result in batch:
+            statuses[(result["actionId"], result["status"])] = statuses.get((result["actionId"], result["status"]), 0) + 1
+    await server.stop()
+
+    actions = sum(len(batch) for batch in results)
+    print(f"{actions} actions ({server.requests} HTTP requests) in {elapsed:.3f} s: {actions / elapsed:,.0f} actions/s")
+    print(f"Connections opened: client {executor.client.connections_opened}, server saw {server.connections}")
+    for (action_id, status), count in sorted(statuses.items()):
+        print(f"  {action_id:<16} {status:<10} {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run definition actions against a local stand-in HTTP server')
+    parser.add_argument('--definition', default=DEFAULT_DEFINITION, help='State machine definition JSON file')
+    parser.add_argument('--instances', type=int, default=500, help='Instances to run actions for (default: 500)')
+    parser.add_argument('--max-concurrency', type=int, default=256, help='Global in-flight action limit')
+    parser.add_argument('--max-per-host', type=int, default=16, help='In-flight requests per host')
+
+    args = parser.parse_args()
+
+    with open(args.definition, 'r') as f:
+        definition = json.load(f)
+    asyncio.run(run(definition, args.instances, args.max_concurrency, args.max_per_host))
+
+
+if __name__ == "__main__":
+    main()
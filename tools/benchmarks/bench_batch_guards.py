@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tools.runtime.batch_guards import BatchGuardEvaluator, ColumnarBatch
+from tools.runtime.engine import AUTOMATIC, load_engine
+
+DEFAULT_DEFINITION = os.path.join(os.path.dirname(__file__), '..', '..', 'definitions', 'money-transfer-definition.json')
+
+
+def synthetic_records(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        record = {"transferId": f"tr-{i}"}
+        if rng.random() < 0.9:
+            record["amount"] = round(rng.uniform(-50, 5000), 2)
+        if rng.random() < 0.8:
+            record["userConfirmed"] = rng.random() < 0.7
+        record["verificationStatus"] = rng.choice(["pending", "failed", "verified"])
+        records.append(record)
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare batch guard evaluation against per-instance evaluation')
+    parser.add_argument('--definition', default=DEFAULT_DEFINITION, help='State machine definition JSON file')
+    parser.add_argument('--instances', type=int, default=200000, help='Records per state (default: 200000)')
+
+    args = parser.parse_args()
+
+    engine = load_engine(args.definition)
+    evaluator = BatchGuardEvaluator(engine)
+    records = synthetic_records(args.instances)
+    columns = ColumnarBatch.from_columns({
+        "amount": np.array([record.get("amount", np.nan) for record in records], dtype=float),
+        "verificationStatus": np.array([record["verificationStatus"] for record in records]),
+    })
+
+    for state_id, event_id in [("verify", AUTOMATIC), ("confirm", AUTOMATIC), ("verify", "verificationFailed")]:
+        start = time.perf_counter()
+        expected = [getattr(engine.select(state_id, event_id, record), "transition_id", None) for record in records]
+        per_record = time.perf_counter() - start
+
+        start = time.perf_counter()
+        chosen = evaluator.select(state_id, records, event_id)
+        batched = time.perf_counter() - start
+
+        if list(chosen) != expected:
+            raise AssertionError(f"Batch selection differs from per-record selection for {state_id}/{event_id}")
+        print(f"{state_id:>8} {str(event_id):>20}: per-record {args.instances / per_record:>12,.0f}/s  "
+              f"batch {args.instances / batched:>12,.0f}/s  ({per_record / batched:.1f}x)")
+
+    for state_id, event_id in [("verify", AUTOMATIC), ("verify", "verificationFailed")]:
+        start = time.perf_counter()
+        evaluator.select(state_id, columns, event_id)
+        columnar = time.perf_counter() - start
+        print(f"{state_id:>8} {str(event_id):>20}: columnar input {args.instances / columnar:>12,.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
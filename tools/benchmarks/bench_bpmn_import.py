@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+import argparse
+import filecmp
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import xmltodict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tools.benchmarks.bench_definition_graph import build_definition
+from tools.converters.bpmn_converter import BPMNConverter, save_json, save_xml
+
+
+def in_memory(converter: BPMNConverter, input_file: str, output_file: str):
+    with open(input_file, 'r') as f:
+        save_json(converter.bpmn_to_json(xmltodict.parse(f.read())), output_file)
+
+
+def measure(func, *args):
+    """Wall time and peak traced memory of one call."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare in-memory and streaming BPMN to JSON import')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000],
+                        help='Synthetic state counts (default: 1000 5000 20000)')
+
+    args = parser.parse_args()
+    converter = BPMNConverter()
+
+    print(f"{'states':>8} {'BPMN MB':>8} {'dict s':>8} {'dict peak MB':>13} {'stream s':>9} {'stream peak MB':>15}")
+    with tempfile.TemporaryDirectory() as root:
+        for size in args.sizes:
+            bpmn_file = os.path.join(root, f"synthetic{size}.bpmn")
+            save_xml(converter.json_to_bpmn(build_definition(size)), bpmn_file)
+            dict_file, stream_file = os.path.join(root, "dict.json"), os.path.join(root, "stream.json")
+
+            dict_time, dict_peak = measure(in_memory, converter, bpmn_file, dict_file)
+            stream_time, stream_peak = measure(converter.stream_bpmn_to_json, bpmn_file, stream_file)
+            if not filecmp.cmp(dict_file, stream_file, shallow=False):
+                raise SystemExit(f"Streaming output differs from bpmn_to_json for {size} states")
+
+            print(f"{size:>8} {os.path.getsize(bpmn_file) / 1e6:>8.1f} {dict_time:>8.2f} {dict_peak / 1e6:>13.1f} "
+                  f"{stream_time:>9.2f} {stream_peak / 1e6:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
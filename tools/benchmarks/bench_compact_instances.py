@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+import argparse
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tools.model.compact_instance import CompactInstance, format_timestamp, get_state_table
+
+DEFAULT_DEFINITION = os.path.join(os.path.dirname(__file__), '..', '..', 'definitions', 'money-transfer-definition.json')
+
+PATH = ["init", "verify", "confirm", "process", "complete"]
+
+
+def synthetic_instance(i: int, rng: random.Random) -> str:
+    """JSON text of an instance shaped like instances/money-transfer-instance.json."""
+    instance_id = f"mt-{i:08d}-e89b-12d3-a456-426614174000"
+    started = 1704897000 + i * 7
+    visits = rng.randint(1, len(PATH))
+    history = []
+    at = started
+    for state_id in PATH[:visits]:
+        visit = {"stateId": state_id, "enteredAt": format_timestamp(at),
+                 "dataRef": f"instances/state-data/{instance_id}-{state_id}.json"}
+        at += rng.randint(1, 300)
+        history.append(visit)
+    for visit, following in zip(history, history[1:]):
+        visit["exitedAt"] = following["enteredAt"]
+    document = {
+        "instanceId": instance_id,
+        "stateMachineId": "moneyTransferSM",
+        "currentState": history[-1]["stateId"],
+        "startedAt": format_timestamp(started),
+        "lastUpdated": history[-1]["enteredAt"],
+        "consolidatedData": {
+            "transferId": f"tr-{i:08d}-e89b-12d3-a456-426614174000",
+            "timestamp": format_timestamp(started),
+            "clientReference": f"CLIENT-REF-{i % 1000:03d}",
+            "amount": round(rng.uniform(1, 10000), 2),
+            "sourceAccount": f"ACCT{rng.randrange(10 ** 8):08d}",
+            "destinationAccount": f"ACCT{rng.randrange(10 ** 8):08d}",
+            "verificationStatus": rng.choice(["pending", "verified"]),
+        },
+        "stateHistory": history,
+    }
+    return json.dumps(document)
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def measure(kind: str, count: int, definition_file: str):
+    """Build ``count`` instances of one kind in this process and print JSON stats."""
+    with open(definition_file, 'r') as f:
+        table = get_state_table(json.load(f))
+    rng = random.Random(11)
+    gc.collect()
+    before = rss_bytes()
+    start = time.perf_counter()
+    instances = []
+    for i in range(count):
+        document = json.loads(synthetic_instance(i, rng))
+        instances.append(document if kind == "dict" else CompactInstance.from_json(document, table))
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    used = rss_bytes() - before
+    print(json.dumps({"kind": kind, "count": count, "bytes": used, "seconds": elapsed}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memory per instance: JSON dict trees vs CompactInstance')
+    parser.add_argument('--count', type=int, default=1_000_000, help='Synthetic instances (default: 1000000)')
+    parser.add_argument('--definition', default=DEFAULT_DEFINITION, help='State machine definition JSON file')
+    parser.add_argument('--measure', choices=['dict', 'compact'], help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+    if args.measure:
+        measure(args.measure, args.count, args.definition)
+        return
+
+    with open(args.definition, 'r') as f:
+        table = get_state_table(json.load(f))
+    rng = random.Random(3)
+    for i in range(1000):
+        document = json.loads(synthetic_instance(i, rng))
+        if CompactInstance.from_json(document, table).to_json() != document:
+            raise SystemExit(f"Round trip changed instance {i}")
+
+    # Each representation is measured in a fresh process so freed memory does not skew the other.
+    results = {}
+    for kind in ("dict", "compact"):
+        output = subprocess.run([sys.executable, __file__, '--measure', kind, '--count', str(args.count),
+                                 '--definition', args.definition], check=True, capture_output=True, text=True)
+        results[kind] = json.loads(output.stdout)
+
+    print(f"{args.count:,} synthetic instances (round trip verified on 1,000)")
+    for kind, label in (("dict", "JSON dict tree"), ("compact", "CompactInstance")):
+        result = results[kind]
+        print(f"  {label:<16} {result['bytes'] / 2 ** 20:>9,.0f} MiB  {result['bytes'] / args.count:>7,.0f} bytes/instance"
+              f"  loaded in {result['seconds']:.1f} s")
+    print(f"  {results['dict']['bytes'] / results['compact']['bytes']:.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
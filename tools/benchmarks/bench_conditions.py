@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tools.runtime.conditions import compile_condition, evaluate_condition
+
+CONDITIONS = [
+    "true",
+    "data.amount > 0",
+    "data.userConfirmed === true",
+    "data.userConfirmed === false",
+    "data.verificationStatus === 'failed'",
+    "data.amount >= 100 && data.currency === 'USD' || data.verificationStatus !== 'pending'",
+]
+
+SAMPLES = [
+    {"amount": 1000.0, "currency": "USD", "userConfirmed": True, "verificationStatus": "pending"},
+    {"amount": 0, "currency": "EUR", "userConfirmed": False, "verificationStatus": "failed"},
+    {"currency": "GBP"},
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare compiled condition guards against parsing on every evaluation')
+    parser.add_argument('--iterations', type=int, default=20000, help='Evaluations per condition and sample (default: 20000)')
+
+    args = parser.parse_args()
+
+    print(f"{'condition':<90} {'naive/s':>12} {'compiled/s':>12} {'speedup':>8}")
+    for condition in CONDITIONS:
+        guard = compile_condition(condition)
+        for data in SAMPLES:
+            if guard(data) != evaluate_condition(condition, data):
+                raise AssertionError(f"Compiled guard disagrees with the interpreter for {condition!r} on {data}")
+
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            for data in SAMPLES:
+                evaluate_condition(condition, data)
+        naive = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            for data in SAMPLES:
+                guard(data)
+        compiled = time.perf_counter() - start
+
+        evaluations = args.iterations * len(SAMPLES)
+        print(f"{condition:<90} {evaluations / naive:>12,.0f} {evaluations / compiled:>12,.0f} {naive / compiled:>7.1f}x")
+
+    print(f"Cache: {compile_condition.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
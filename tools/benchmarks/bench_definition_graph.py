@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+import argparse
+import copy
+import os
+import sys
+import time
+from typing import Dict, List, Any
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tools.converters.bpmn_converter import BPMNConverter
+from tools.generators.diagram_generator import DiagramGenerator
+from tools.model.definition_graph import DefinitionGraph
+
+
+def build_definition(state_count: int) -> Dict[str, Any]:
+    """Build a synthetic definition: a chain of tasks with branches and shared error exits."""
+    states = [{"stateId": "s0", "name": "Start", "baseStateType": "initial", "stateType": "setup"}]
+    for i in range(1, state_count - 2):
+        state = {"stateId": f"s{i}", "name": f"Task {i}", "baseStateType": "intermediate",
+                 "stateType": "processing"}
+        if i % 3 == 0:
+            state["entryActions"] = [{"actionId": f"a{i}", "name": f"Action {i}"}]
+        states.append(state)
+    states.append({"stateId": "done", "name": "Done", "baseStateType": "final", "stateType": "completion"})
+    states.append({"stateId": "failed", "name": "Failed", "baseStateType": "final", "stateType": "error"})
+
+    transitions = []
+    task_ids = [s["stateId"] for s in states[:-2]]
+    for i, state_id in enumerate(task_ids):
+        next_id = task_ids[i + 1] if i + 1 < len(task_ids) else "done"
+        transitions.append({
+            "transitionId": f"t{i}",
+            "fromStateId": state_id,
+            "toStateId": next_id,
+            "event": [{"eventId": f"e{i}", "name": f"Next {i}", "trigger": "manual" if i % 2 else "auto"}],
+            "condition": "true"
+        })
+        if i % 5 == 0:
+            transitions.append({
+                "transitionId": f"t{i}_fail",
+                "fromStateId": state_id,
+                "toStateId": "failed",
+                "name": f"Fail {i}",
+                "condition": "data.amount <= 0"
+            })
+    for i in range(0, len(task_ids), 50):
+        transitions.append({
+            "transitionId": f"err{i}",
+            "fromStateId": task_ids[i:i + 50],
+            "toStateId": "failed",
+            "event": [{"eventId": f"err{i}", "name": "Error Occurred", "trigger": "manual"}],
+            "condition": "true"
+        })
+    transitions.append({
+        "transitionId": "anyToFailed",
+        "fromStateId": "any",
+        "toStateId": "failed",
+        "event": [{"eventId": "abort", "name": "Abort", "trigger": "manual"}],
+        "condition": "true"
+    })
+
+    return {
+        "stateMachineId": f"synthetic{state_count}",
+        "name": "Synthetic",
+        "version": 1,
+        "states": states,
+        "transitions": transitions
+    }
+
+
+def time_call(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def run(sizes: List[int]):
+    converter = BPMNConverter()
+    print(f"{'states':>8} {'transitions':>12} {'graph (s)':>10} {'json2bpmn (s)':>14} {'mermaid (s)':>12}")
+    for size in sizes:
+        definition = build_definition(size)
+        graph_time = time_call(DefinitionGraph, definition)
+        bpmn_time = time_call(converter.json_to_bpmn, copy.deepcopy(definition))
+
+        def render():
+            generator = DiagramGenerator(definition)
+            generator.generate_state_diagram()
+            generator.generate_sequence_diagram()
+
+        diagram_time = time_call(render)
+        print(f"{size:>8} {len(definition['transitions']):>12} {graph_time:>10.4f} "
+              f"{bpmn_time:>14.4f} {diagram_time:>12.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark definition indexing, BPMN conversion and diagram rendering')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 2500, 5000, 10000],
+                        help='State counts of the synthetic definitions (default: 1000 2500 5000 10000)')
+
+    args = parser.parse_args()
+    run(args.sizes)
+
+
+if __name__ == "__main__":
+    main()
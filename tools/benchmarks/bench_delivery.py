@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, Any, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tools.benchmarks.stand_ins import InProcessBroker, StandInServer, check_order
+from tools.runtime.delivery import BrokerSink, FileSink, SinkBatcher, WebhookSink
+
+
+async def publish(batcher: SinkBatcher, instances: int, changes: int) -> float:
+    start = time.perf_counter()
+    for seq in range(changes):
+        for i in range(instances):
+            await batcher.put(f"mt-{i}", {"instanceId": f"mt-{i}", "seq": seq, "stateId": f"state{seq}",
+                                          "status": "completed", "result": {"transferId": f"tr-{i}"}})
+            if i % 100 == 99:
+                # Producers are engine tasks that yield to the loop between transitions.
+                await asyncio.sleep(0)
+    await batcher.close()
+    return time.perf_counter() - start
+
+
+async def run_sink(kind: str, batched: bool, args, root: str) -> Tuple[Dict[str, Any], float, int]:
+    limits = {"linger": args.linger, "max_batch": args.max_batch, "max_bytes": args.max_bytes} if batched else \
+        {"linger": 0.0, "max_batch": 1}
+    if kind == "webhook":
+        server = StandInServer(record_bodies=True)
+        port = await server.start()
+        sink = WebhookSink({"url": f"http://127.0.0.1:{port}/callback", "method": "POST"})
+    elif kind == "broker":
+        broker = InProcessBroker()
+        sink = BrokerSink(broker, "state-changes")
+    else:
+        path = os.path.join(root, f"{'batched' if batched else 'single'}.jsonl")
+        sink = FileSink(path)
+
+    batcher = SinkBatcher(sink, lanes=args.lanes, **limits)
+    elapsed = await publish(batcher, args.instances, args.changes)
+
+    if kind == "webhook":
+        await server.stop()
+        values = [json.dumps(item).encode() for body in server.bodies for item in json.loads(body)]
+        requests = server.requests
+    elif kind == "broker":
+        values = broker.values("state-changes")
+        requests = broker.requests
+    else:
+        with open(path, 'rb') as f:
+            values = f.read().splitlines()
+        requests = batcher.batches
+    problem = check_order(values, args.instances, args.changes)
+    if problem:
+        raise SystemExit(f"{kind} {'batched' if batched else 'single'}: {problem}")
+    return batcher.metrics(), elapsed, requests
+
+
+async def run(args):
+    total = args.instances * args.changes
+    print(f"{total:,} messages from {args.instances:,} instances; batches of up to {args.max_batch} messages / "
+          f"{args.max_bytes:,} bytes, linger {args.linger * 1000:g} ms, {args.lanes} lanes")
+    print(f"{'sink':<8} {'mode':<8} {'messages/s':>11} {'requests':>9} {'mean batch':>11} "
+          f"{'mean ms':>8} {'max ms':>8}")
+    with tempfile.TemporaryDirectory() as root:
+        for kind in args.sinks:
+            for batched in (False, True):
+                metrics, elapsed, requests = await run_sink(kind, batched, args, root)
+                print(f"{kind:<8} {'batched' if batched else 'single':<8} {total / elapsed:>11,.0f} {requests:>9,} "
+                      f"{metrics['meanBatchSize']:>11.1f} {metrics['latencyMs']['mean']:>8.1f} "
+                      f"{metrics['latencyMs']['max']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Delivery throughput: one request per message vs coalesced batches')
+    parser.add_argument('--instances', type=int, default=1000, help='Instances publishing state changes (default: 1000)')
+    parser.add_argument('--changes', type=int, default=10, help='State changes per instance (default: 10)')
+    parser.add_argument('--sinks', nargs='+', default=["webhook", "broker", "file"],
+                        choices=["webhook", "broker", "file"], help='Sinks to measure (default: all)')
+    parser.add_argument('--linger', type=float, default=0.005, help='Batch linger in seconds (default: 0.005)')
+    parser.add_argument('--max-batch', type=int, default=500, help='Messages per batch (default: 500)')
+    parser.add_argument('--max-bytes', type=int, default=1 << 20, help='Bytes per batch (default: 1 MiB)')
+    parser.add_argument('--lanes', type=int, default=4, help='Batches in flight per sink (default: 4)')
+
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tools.model.compact_instance import format_timestamp
+from tools.runtime.engine import load_engine
+from tools.storage.event_log import EventLogStore
+from tools.storage.instance_index import InstanceIndex, timestamp_key
+
+DEFAULT_DEFINITION = os.path.join(os.path.dirname(__file__), '..', '..', 'definitions', 'money-transfer-definition.json')
+
+NOW = 1704897000
+STALE_SECONDS = 600
+
+# Happy path steps as (event or None for automatic, data).
+STEPS = [("startTransfer", None), (None, {"amount": 100}), (None, {"userConfirmed": True}), ("processComplete", None)]
+
+
+class TimedIndex(InstanceIndex):
+    """Index that accumulates the time spent maintaining it."""
+
+    def __init__(self):
+        super().__init__()
+        self.elapsed = 0.0
+
+    def apply(self, instance_id, record):
+        start = time.perf_counter()
+        super().apply(instance_id, record)
+        self.elapsed += time.perf_counter() - start
+
+
+def populate(store: EventLogStore, engine, count: int, seed: int = 5) -> int:
+    """Create ``count`` instances stopped at random points in the last hour; returns records appended."""
+    rng = random.Random(seed)
+    records = 0
+    for i in range(count):
+        at = NOW - rng.randint(0, 3600)
+        instance = engine.new_instance(f"mt-{i:08d}", {"transferId": f"tr-{i}"}, format_timestamp(at - 40))
+        store.create_instance(instance)
+        records += 1
+        for step, (event_id, data) in enumerate(STEPS[:rng.randint(0, len(STEPS))]):
+            timestamp = format_timestamp(at - 30 + step * 10)
+            if engine.fire(instance, event_id, data, timestamp) is None:
+                break
+            store.record_transition(instance["instanceId"], instance["currentState"], timestamp, data=data)
+            records += 1
+        if rng.random() < 0.03:
+            store.record_transition(instance["instanceId"], "error", format_timestamp(at))
+            records += 1
+    return records
+
+
+def scan_queries(store: EventLogStore):
+    """The same queries answered by loading every instance document."""
+    cutoff = NOW - STALE_SECONDS
+    stuck, errors = [], []
+    for instance in store.iter_instances():
+        if instance["currentState"] == "confirm" and timestamp_key(instance["lastUpdated"]) < cutoff:
+            stuck.append(instance["instanceId"])
+        elif instance["currentState"] == "error":
+            errors.append(instance["instanceId"])
+    return stuck, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Instance index queries vs scanning instance documents')
+    parser.add_argument('--definition', default=DEFAULT_DEFINITION, help='State machine definition JSON file')
+    parser.add_argument('--instances', type=int, default=200000, help='Number of instances (default: 200000)')
+
+    args = parser.parse_args()
+    engine = load_engine(args.definition)
+
+    with tempfile.TemporaryDirectory() as root:
+        index = TimedIndex()
+        with EventLogStore(root, fsync_every=1 << 30, instance_index=index) as store:
+            records = populate(store, engine, args.instances)
+
+            start = time.perf_counter()
+            stuck = index.stale(STALE_SECONDS, ["confirm"], now=NOW)
+            errors = index.in_state("error")
+            query_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            scanned = scan_queries(store)
+            scan_elapsed = time.perf_counter() - start
+            if (sorted(stuck), sorted(errors)) != (sorted(scanned[0]), sorted(scanned[1])):
+                raise SystemExit("Index and scan disagree")
+
+            store.snapshot()
+            start = time.perf_counter()
+            rebuilt = InstanceIndex().rebuild_from_log(store)
+            rebuild_elapsed = time.perf_counter() - start
+            if rebuilt.entries != index.entries:
+                raise SystemExit("Rebuilt index differs")
+
+    print(f"{args.instances:,} instances, {records:,} log records")
+    print(f"  Index maintenance: {index.elapsed / records * 1e6:.2f} us/record")
+    print(f"  Stuck in confirm > {STALE_SECONDS // 60} min ({len(stuck):,}) and in error ({len(errors):,}):")
+    print(f"    index {query_elapsed * 1000:.2f} ms, scan {scan_elapsed * 1000:,.0f} ms "
+          f"({scan_elapsed / query_elapsed:,.0f}x)")
+    print(f"  Rebuild from snapshot: {rebuild_elapsed:.2f} s ({args.instances / rebuild_elapsed:,.0f} instances/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tools.benchmarks.bench_engine import DEFAULT_DEFINITION, TIMESTAMP, run_happy_path
+from tools.runtime.engine import load_engine
+from tools.runtime.instrumentation import Instrumentation, every_nth_sampler, rate_sampler
+from tools.storage.event_log import EventLogStore
+
+
+def engine_rate(definition: str, instances: int, metrics, repeat: int) -> float:
+    """Median transitions per second over ``repeat`` runs, with ``metrics`` attached when given."""
+    rates = []
+    for _ in range(repeat):
+        engine = load_engine(definition)
+        if metrics is not None:
+            metrics.instrument_engine(engine)
+        start = time.perf_counter()
+        taken = run_happy_path(engine, instances)
+        rates.append(taken / (time.perf_counter() - start))
+    return statistics.median(rates)
+
+
+def append_rate(records: int, metrics) -> float:
+    with tempfile.TemporaryDirectory() as root:
+        with EventLogStore(root, fsync_every=0) as store:
+            if metrics is not None:
+                metrics.instrument_store(store)
+            start = time.perf_counter()
+            for i in range(records):
+                store.record_transition(f"mt-{i % 1000}", "verify", TIMESTAMP, "t1")
+            return records / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Overhead of hot-path instrumentation on the engine and event log')
+    parser.add_argument('--definition', default=DEFAULT_DEFINITION, help='State machine definition JSON file')
+    parser.add_argument('--instances', type=int, default=50000, help='Instances per engine run (default: 50000)')
+    parser.add_argument('--records', type=int, default=100000, help='Event log appends (default: 100000)')
+    parser.add_argument('--repeat', type=int, default=3, help='Engine runs per configuration (default: 3)')
+    parser.add_argument('--export', default=None, help='Also write the Prometheus exposition to this file')
+
+    args = parser.parse_args()
+
+    configurations = [("off", None), ("every call", Instrumentation()),
+                      ("1 in 16", Instrumentation(every_nth_sampler(16))),
+                      ("1% random", Instrumentation(rate_sampler(0.01)))]
+    # Warm-up, so the first configuration does not pay for cold caches.
+    engine_rate(args.definition, args.instances, None, 1)
+    baseline = None
+    print(f"{'instrumentation':<16} {'transitions/s':>14} {'overhead':>9} {'appends/s':>11}")
+    for label, metrics in configurations:
+        rate = engine_rate(args.definition, args.instances, metrics, args.repeat)
+        appends = append_rate(args.records, metrics)
+        baseline = baseline or rate
+        print(f"{label:<16} {rate:>14,.0f} {(baseline / rate - 1) * 100:>8.1f}% {appends:>11,.0f}")
+
+    metrics = configurations[1][1]
+    start = time.perf_counter()
+    text = metrics.render_prometheus()
+    print(f"\nPrometheus exposition: {len(text.splitlines())} lines in {(time.perf_counter() - start) * 1000:.1f} ms")
+    if args.export:
+        metrics.write_prometheus(args.export)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tools.benchmarks.bench_definition_graph import build_definition
+from tools.converters.bpmn_converter import BPMNConverter
+from tools.model.definition_graph import DefinitionGraph
+from tools.model.layered_layout import LayeredLayout
+
+
+def random_graph(size: int, fanout: int = 2, seed: int = 7):
+    """Wide random graph: each node links to ``fanout`` nodes a little further on, plus some back edges."""
+    rng = random.Random(seed)
+    nodes = [f"n{i}" for i in range(size)]
+    edges = []
+    for i in range(size):
+        for _ in range(fanout):
+            edges.append((nodes[i], nodes[min(size - 1, i + rng.randint(1, 60))]))
+        if rng.random() < 0.02:
+            edges.append((nodes[i], nodes[max(0, i - rng.randint(1, 200))]))
+    return {node: (120, 80) for node in nodes}, edges
+
+
+def run_random(sizes: List[int], sweeps: int):
+    print(f"\n{'nodes':>8} {'edges':>8} {'layers':>7} {'DFS order':>10} {'crossings':>10} {'layout s':>9} {'us/node':>8}")
+    for size in sizes:
+        node_sizes, edges = random_graph(size)
+        start = time.perf_counter()
+        layout = LayeredLayout(sweeps=sweeps).layout(node_sizes, edges)
+        elapsed = time.perf_counter() - start
+        print(f"{size:>8} {len(edges):>8} {len(layout.layers):>7} {layout.initial_crossings:>10} {layout.crossings:>10} "
+              f"{elapsed:>9.3f} {elapsed / size * 1e6:>8.1f}")
+
+
+def run(sizes: List[int], sweeps: int):
+    converter = BPMNConverter()
+    converter.layout_engine.sweeps = sweeps
+    print(f"{'states':>8} {'edges':>8} {'layers':>7} {'crossings':>10} {'layout s':>9} {'us/state':>9} {'bpmn_di s':>10}")
+    for size in sizes:
+        definition = build_definition(size)
+        graph = DefinitionGraph(definition)
+        node_sizes = {state_id: (120, 80) for state_id in graph.state_ids}
+        edges = [(source, transition["toStateId"]) for transition in graph.transitions
+                 for source in graph.expand_sources(transition)]
+
+        start = time.perf_counter()
+        layout = converter.layout_engine.layout(node_sizes, edges)
+        layout_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        converter.create_bpmn_di(definition["stateMachineId"], definition, graph)
+        di_elapsed = time.perf_counter() - start
+
+        print(f"{size:>8} {len(edges):>8} {len(layout.layers):>7} {layout.crossings:>10} "
+              f"{layout_elapsed:>9.3f} {layout_elapsed / size * 1e6:>9.1f} {di_elapsed:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the layered BPMN layout against graph size')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 2000, 5000, 10000, 20000],
+                        help='Synthetic state counts (default: 1000 2000 5000 10000 20000)')
+    parser.add_argument('--sweeps', type=int, default=LayeredLayout().sweeps,
+                        help='Crossing reduction sweeps (default: %(default)s)')
+
+    args = parser.parse_args()
+    run(args.sizes, args.sweeps)
+    run_random(args.sizes, args.sweeps)
+
+
+if __name__ == "__main__":
+    main()
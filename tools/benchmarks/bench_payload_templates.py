@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tools.runtime.payload_templates import PayloadTemplate, resolve_payload
+
+DEFAULT_DEFINITION = os.path.join(os.path.dirname(__file__), '..', '..', 'definitions', 'money-transfer-definition.json')
+
+
+def trigger_payloads(definition):
+    for state in definition.get("states", []):
+        for action in state.get("entryActions", []) + state.get("exitActions", []):
+            webhook = (action.get("trigger") or {}).get("webhook")
+            if webhook is not None and "payload" in webhook:
+                yield action["actionId"], webhook["payload"]
+
+
+def naive_render(template, data):
+    payload = resolve_payload(template, data)
+    return json.dumps(payload).encode("utf-8") if payload is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark compiled payload templates against per-call resolution')
+    parser.add_argument('--definition', default=DEFAULT_DEFINITION, help='State machine definition JSON file')
+    parser.add_argument('--iterations', type=int, default=200_000, help='Renders per action (default: 200000)')
+
+    args = parser.parse_args()
+
+    with open(args.definition, 'r') as f:
+        definition = json.load(f)
+
+    records = [{"transferId": f"tr-{i}", "amount": i * 10.5, "errorCode": "E42", "errorMessage": "insufficient funds"}
+               for i in range(1000)]
+
+    print(f"{'action':<20} {'naive/s':>12} {'compiled/s':>12} {'speedup':>8}")
+    for action_id, template in trigger_payloads(definition):
+        compiled = PayloadTemplate(template)
+        for data in records[:10]:
+            assert compiled.render(data) == naive_render(template, data), action_id
+
+        timings = []
+        for render in (lambda data: naive_render(template, data), compiled.render):
+            start = time.perf_counter()
+            for i in range(args.iterations):
+                render(records[i % 1000])
+            timings.append(args.iterations / (time.perf_counter() - start))
+        print(f"{action_id:<20} {timings[0]:>12,.0f} {timings[1]:>12,.0f} {timings[1] / timings[0]:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
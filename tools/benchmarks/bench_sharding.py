@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tools.benchmarks.bench_engine import DEFAULT_DEFINITION, TIMESTAMP, run_happy_path
+from tools.runtime.engine import load_engine
+from tools.runtime.sharding import ShardedExecutor
+
+
+def run_sharded(definition, workers: int, instance_count: int, batch_size: int) -> float:
+    """Drive the money-transfer happy path through ``workers`` shards; returns events per second."""
+    with ShardedExecutor(definition, workers=workers, batch_size=batch_size) as executor:
+        start = time.perf_counter()
+        for i in range(instance_count):
+            instance_id = f"mt-{i}"
+            executor.create(instance_id, {"transferId": f"tr-{i}"}, TIMESTAMP)
+            executor.fire(instance_id, "startTransfer", timestamp=TIMESTAMP)
+            executor.advance(instance_id, {"amount": 100 + i}, TIMESTAMP)
+            executor.advance(instance_id, {"userConfirmed": True}, TIMESTAMP)
+            executor.fire(instance_id, "processComplete", timestamp=TIMESTAMP)
+        summaries = executor.stop()
+        elapsed = time.perf_counter() - start
+
+    transitions = sum(summary["transitions"] for summary in summaries)
+    completed = sum(summary["states"].get("complete", 0) for summary in summaries)
+    if transitions != instance_count * 4 or completed != instance_count:
+        raise SystemExit(f"{workers} workers: {transitions} transitions, {completed} completed instances")
+    return transitions / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Throughput of sharded execution against worker count')
+    parser.add_argument('--definition', default=DEFAULT_DEFINITION, help='State machine definition JSON file')
+    parser.add_argument('--instances', type=int, default=100000, help='Number of instances (default: 100000)')
+    parser.add_argument('--workers', type=int, nargs='+', default=None,
+                        help='Worker counts to run (default: 1, 2, 4, ... up to the CPU count)')
+    parser.add_argument('--batch-size', type=int, default=256, help='Commands per ring message (default: 256)')
+
+    args = parser.parse_args()
+    cpus = os.cpu_count() or 1
+    worker_counts: List[int] = args.workers or sorted({min(cpus, 2 ** i) for i in range(cpus.bit_length() + 1)})
+
+    engine = load_engine(args.definition)
+    start = time.perf_counter()
+    taken = run_happy_path(engine, args.instances)
+    baseline = taken / (time.perf_counter() - start)
+
+    print(f"{args.instances:,} instances x 4 transitions, {cpus} CPU(s)")
+    print(f"{'workers':>8} {'transitions/s':>14} {'vs 1 worker':>12}")
+    print(f"{'inline':>8} {baseline:>14,.0f} {'':>12}")
+    single = None
+    for workers in worker_counts:
+        rate = run_sharded(engine.definition, workers, args.instances, args.batch_size)
+        single = single or rate
+        print(f"{workers:>8} {rate:>14,.0f} {rate / single:>11.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+import argparse
+import copy
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tools.model.snapshots import DataHistory
+from tools.storage.event_log import DEFAULT_DATA_VIEWS, EventLogStore
+
+
+def synthetic_visits(fields: int, visits: int, changes: int, rng: random.Random) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Starting data with ``fields`` keys and ``visits`` state data dicts changing ``changes`` keys each."""
+    base = {f"field{i}": f"value-{rng.randrange(10 ** 6)}" for i in range(fields)}
+    base["customer"] = {"id": f"c-{rng.randrange(10 ** 6)}", "tier": "gold", "limits": {"daily": 5000}}
+    updates = []
+    for visit in range(visits):
+        update = {f"field{rng.randrange(fields)}": f"visit-{visit}-{rng.randrange(10 ** 6)}" for _ in range(changes)}
+        update[f"step{visit}"] = visit
+        updates.append(update)
+    return base, updates
+
+
+def full_copies(base: Dict[str, Any], updates: List[Dict[str, Any]], deep: bool) -> List[Dict[str, Any]]:
+    """One complete consolidated dict per visit, as state-data snapshots hold today."""
+    views, current = [], base
+    for update in updates:
+        current = copy.deepcopy(current) if deep else dict(current)
+        current.update(update)
+        views.append(current)
+    return views
+
+
+def deltas(base: Dict[str, Any], updates: List[Dict[str, Any]]) -> DataHistory:
+    history = DataHistory(base)
+    for visit, update in enumerate(updates):
+        history.record(f"state{visit}", update)
+    return history
+
+
+def log_state_data(instances: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]], data_views: int) -> Tuple[float, int]:
+    """Seconds to append every visit and its state data to an event log, and the bytes written."""
+    with tempfile.TemporaryDirectory() as root:
+        with EventLogStore(root, fsync_every=1 << 30, data_views=data_views) as store:
+            start = time.perf_counter()
+            for number, (base, updates) in enumerate(instances):
+                instance_id = f"in-{number}"
+                store.create_instance({"instanceId": instance_id, "currentState": "state0",
+                                       "stateHistory": [{"stateId": "state0", "enteredAt": "t0"}]})
+                store.record_state_data(instance_id, "state0", base)
+                for visit, data in enumerate(full_copies(base, updates, deep=False), 1):
+                    store.record_transition(instance_id, f"state{visit}", f"t{visit}")
+                    store.record_state_data(instance_id, f"state{visit}", data)
+            elapsed = time.perf_counter() - start
+            written = sum(os.path.getsize(segment.path) for segment in store.segments)
+            document = store.load("in-0")
+        if [visit["data"] for visit in document["stateHistory"][1:]] != full_copies(*instances[0], deep=False):
+            raise SystemExit("event log state data does not round-trip")
+        return elapsed, written
+
+
+def measure(build, instances: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]) -> Tuple[float, int, list]:
+    """Seconds to build every history, bytes retained by them, and the histories."""
+    gc.collect()
+    tracemalloc.start()
+    built = [build(base, updates) for base, updates in instances]
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Timed again without tracemalloc's per-allocation hook.
+    del built
+    gc.collect()
+    start = time.perf_counter()
+    built = [build(base, updates) for base, updates in instances]
+    elapsed = time.perf_counter() - start
+    return elapsed, retained, built
+
+
+def main():
+    parser = argparse.ArgumentParser(description='State data history: full copies per visit vs deltas over persistent maps')
+    parser.add_argument('--instances', type=int, default=1000, help='Instances per scenario (default: 1000)')
+    parser.add_argument('--visits', type=int, default=20, help='Visits per instance (default: 20)')
+    parser.add_argument('--changes', type=int, default=2, help='Keys changed per visit (default: 2)')
+    parser.add_argument('--fields', type=int, nargs='+', default=[7, 50, 200],
+                        help='Keys in the consolidated data (default: 7 50 200)')
+
+    args = parser.parse_args()
+    rng = random.Random(18)
+    transitions = args.instances * args.visits
+    print(f"{args.instances:,} instances x {args.visits} visits, {args.changes} changed key(s) per visit")
+    print(f"{'fields':>6} {'history':<13} {'us/transition':>14} {'retained':>11} {'stored':>11} {'view(i) us':>11}")
+    for fields in args.fields:
+        instances = [synthetic_visits(fields, args.visits, args.changes, rng) for _ in range(args.instances)]
+        probes = [(rng.randrange(args.instances), rng.randrange(args.visits)) for _ in range(10000)]
+        for label, build in (("deepcopy", lambda b, u: full_copies(b, u, True)),
+                             ("dict copy", lambda b, u: full_copies(b, u, False)),
+                             ("deltas", deltas)):
+            elapsed, retained, built = measure(build, instances)
+            sample = built[:100]
+            if label == "deltas":
+                stored = sum(len(json.dumps(history.to_json())) for history in sample)
+                start = time.perf_counter()
+                for instance, visit in probes:
+                    built[instance].view(visit).get("field0")
+            else:
+                stored = sum(len(json.dumps(base)) + sum(len(json.dumps(view)) for view in views)
+                             for (base, _), views in zip(instances, sample))
+                start = time.perf_counter()
+                for instance, visit in probes:
+                    built[instance][visit].get("field0")
+            lookup = (time.perf_counter() - start) / len(probes)
+            print(f"{fields:>6} {label:<13} {elapsed / transitions * 1e6:>14.2f} "
+                  f"{retained / args.instances / 1024:>8.1f}KiB {stored / len(sample) / 1024:>8.1f}KiB "
+                  f"{lookup * 1e6:>11.2f}")
+            del built
+        history = deltas(*instances[0])
+        expected = full_copies(*instances[0], deep=False)
+        if any(dict(history.view(i)) != view for i, view in enumerate(expected)):
+            raise SystemExit(f"{fields} fields: delta history does not reproduce the full copies")
+        for label, data_views in (("log full", 0), ("log deltas", DEFAULT_DATA_VIEWS)):
+            elapsed, written = log_state_data(instances, data_views)
+            print(f"{fields:>6} {label:<13} {elapsed / transitions * 1e6:>14.2f} {'':>11} "
+                  f"{written / args.instances / 1024:>8.1f}KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tools.benchmarks.bench_definition_graph import build_definition
+
+DEFAULT_DEFINITION = os.path.join(os.path.dirname(__file__), '..', '..', 'definitions', 'money-transfer-definition.json')
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# Worker startup, run in a fresh interpreter: imports, definition load and engine build.
+COLD = """
+import time; start = time.perf_counter()
+import sys; sys.path.insert(0, {root!r})
+from tools.runtime.engine import load_engine
+from tools.validators.schema_validator import get_validators
+engine = load_engine({path!r}); get_validators(engine.definition)
+print(time.perf_counter() - start)
+"""
+
+CACHED = """
+import time; start = time.perf_counter()
+import sys; sys.path.insert(0, {root!r})
+from tools.runtime.compiled_definition import load_engine_cached
+from tools.validators.schema_validator import get_validators
+engine = load_engine_cached({path!r}, {cache!r}); get_validators(engine.definition)
+print(time.perf_counter() - start)
+"""
+
+CONVERTER_IMPORT = """
+import time; start = time.perf_counter()
+import sys; sys.path.insert(0, {root!r})
+{preload}
+import tools.converters.bpmn_converter
+print(time.perf_counter() - start)
+"""
+
+
+def run_python(code: str, repeat: int) -> float:
+    """Median seconds reported by ``code`` over ``repeat`` fresh interpreters."""
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True)
+        timings.append(float(output.stdout))
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Worker startup: cold definition parse vs compiled definition cache')
+    parser.add_argument('--definition', default=DEFAULT_DEFINITION, help='State machine definition JSON file')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000],
+                        help='Synthetic definition sizes in states (default: 1000 5000 20000)')
+    parser.add_argument('--repeat', type=int, default=5, help='Interpreter starts per measurement (default: 5)')
+
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        cache = os.path.join(root, "cache")
+        definitions = [(os.path.basename(args.definition), os.path.abspath(args.definition))]
+        for size in args.sizes:
+            path = os.path.join(root, f"synthetic-{size}.json")
+            with open(path, 'w') as f:
+                json.dump(build_definition(size), f)
+            definitions.append((f"synthetic {size} states", path))
+
+        print(f"Worker startup in a fresh interpreter (median of {args.repeat}):")
+        print(f"{'definition':<36} {'cold parse':>11} {'cache load':>11} {'speedup':>8}")
+        for label, path in definitions:
+            cold = run_python(COLD.format(root=ROOT, path=path), args.repeat)
+            # The first cached start compiles and writes the artifact; later ones load it.
+            start = time.perf_counter()
+            run_python(CACHED.format(root=ROOT, path=path, cache=cache), 1)
+            first = time.perf_counter() - start
+            cached = run_python(CACHED.format(root=ROOT, path=path, cache=cache), args.repeat)
+            print(f"{label:<36} {cold * 1000:>9.1f}ms {cached * 1000:>9.1f}ms {cold / cached:>7.1f}x"
+                  f"   (artifact written in {first * 1000:.0f} ms incl. interpreter)")
+
+    lazy = run_python(CONVERTER_IMPORT.format(root=ROOT, preload=""), args.repeat)
+    eager = run_python(CONVERTER_IMPORT.format(root=ROOT, preload="import xmltodict"), args.repeat)
+    print(f"\nimport bpmn_converter: {lazy * 1000:.1f} ms (xmltodict loaded on first XML use; "
+          f"{eager * 1000:.1f} ms when imported up front)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+
+import argparse
+import copy
+import gc
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Any, Optional, Set
+
+import xmltodict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tools.converters.bpmn_converter import BPMNConverter, render_xml
+from tools.generators.diagram_generator import DiagramGenerator
+from tools.generators.workload_generator import generate_definition, write_workload
+from tools.storage.event_log import EventLogStore
+from tools.storage.migrate_instances import iter_instance_files, migrate_instance
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+RESULTS_FORMAT = 2
+# Stores flush but do not fsync until closed: disk latency would drown the changes the cases are meant to catch.
+NO_FSYNC = 1 << 30
+
+
+def git_revision() -> Optional[str]:
+    try:
+        output = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, check=True,
+                                capture_output=True, text=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip() or None
+
+
+def measure(run: Callable[[Any], Any], prepare: Callable[[], Any], repeat: int,
+            min_time: float = 0.2) -> Dict[str, float]:
+    """Seconds per call of ``run(prepare())``; preparation is not timed.
+
+    After one untimed warm-up call, each of ``repeat`` rounds calls ``run``
+    until ``min_time`` seconds have been timed, like ``timeit``'s autorange,
+    and counts the mean over its calls. As in ``timeit``, the garbage
+    collector is off while timing.
+    """
+    run(prepare())
+    timings = []
+    collecting = gc.isenabled()
+    try:
+        for _ in range(repeat):
+            total, loops = 0.0, 0
+            while total < min_time:
+                argument = prepare()
+                gc.collect()
+                gc.disable()
+                start = time.perf_counter()
+                run(argument)
+                total += time.perf_counter() - start
+                if collecting:
+                    gc.enable()
+                loops += 1
+            timings.append(total / loops)
+    finally:
+        if collecting:
+            gc.enable()
+    return {"median": statistics.median(timings), "min": min(timings), "max": max(timings), "loops": loops}
+
+
+def definition_cases(size: int, args) -> List[Dict[str, Any]]:
+    definition = generate_definition(size, branching=args.branching, condition_terms=args.condition_terms,
+                                     schema_properties=args.schema_properties, any_transitions=args.any_transitions,
+                                     seed=args.seed)
+    converter = BPMNConverter()
+    xml = render_xml(converter.json_to_bpmn(copy.deepcopy(definition)))
+    params = {"states": size, "transitions": len(definition["transitions"])}
+
+    cases = [
+        ("json_to_bpmn", lambda d: converter.json_to_bpmn(d), lambda: copy.deepcopy(definition)),
+        ("bpmn_to_json", lambda b: converter.bpmn_to_json(b), lambda: xmltodict.parse(xml)),
+        ("diagram_state", lambda d: DiagramGenerator(d).generate_state_diagram(), lambda: definition),
+        ("diagram_sequence", lambda d: DiagramGenerator(d).generate_sequence_diagram(), lambda: definition),
+    ]
+    return [dict(case=name, params=params, items=size, **measure(run, prepare, args.repeat, args.min_time))
+            for name, run, prepare in cases]
+
+
+def instance_cases(count: int, args) -> List[Dict[str, Any]]:
+    """Instance persistence through :class:`EventLogStore`, plus plain JSON files for reference.
+
+    ``instance_migrate`` runs :func:`migrate_instance` over a written
+    workload with state data, ``eventlog_append`` appends the resulting
+    records to a fresh store, ``eventlog_load`` rebuilds every instance
+    from log segments and ``eventlog_iter`` walks a compacted snapshot.
+    """
+    definition = generate_definition(args.instance_states, schema_properties=args.schema_properties, seed=args.seed)
+    params = {"instances": count, "states": args.instance_states}
+    root = tempfile.mkdtemp(prefix="bench-suite-")
+    try:
+        workload = os.path.join(root, "workload")
+        write_workload(workload, definition, count, args.seed, state_data=True)
+        files = list(iter_instance_files(os.path.join(workload, "instances")))
+        instances = []
+        for path in files:
+            with open(path, 'r') as f:
+                instances.append(json.load(f))
+        runs = itertools.count()
+        previous: Dict[str, str] = {}
+
+        def fresh(name: str) -> str:
+            # Remove the last run's output first, so runs do not slow down as the directory fills up.
+            if name in previous:
+                shutil.rmtree(previous[name], ignore_errors=True)
+            path = previous[name] = os.path.join(root, f"{name}{next(runs)}")
+            return path
+
+        def migrate(target: str):
+            with EventLogStore(target, fsync_every=NO_FSYNC) as store:
+                for path in files:
+                    migrate_instance(store, path, [workload])
+
+        log_dir, snapshot_dir = os.path.join(root, "log"), os.path.join(root, "snapshot")
+        migrate(log_dir)
+        migrate(snapshot_dir)
+        with EventLogStore(snapshot_dir) as store:
+            store.snapshot()
+        log = EventLogStore(log_dir)
+        snapshot = EventLogStore(snapshot_dir)
+        records = list(log.iter_records())
+
+        def append(target: str):
+            with EventLogStore(target, fsync_every=NO_FSYNC) as store:
+                for instance_id, record in records:
+                    store.append(instance_id, record)
+
+        def load(store: EventLogStore):
+            for instance_id in store.instance_ids():
+                store.load(instance_id)
+
+        def save_json(target: str):
+            os.makedirs(target)
+            for instance in instances:
+                with open(os.path.join(target, f"{instance['instanceId']}.json"), 'w') as f:
+                    json.dump(instance, f, indent=2)
+
+        def load_json(source: str):
+            for name in os.listdir(source):
+                with open(os.path.join(source, name), 'r') as f:
+                    json.load(f)
+
+        saved = os.path.join(root, "json")
+        save_json(saved)
+        cases = [
+            ("instance_migrate", migrate, lambda: fresh("migrated")),
+            ("eventlog_append", append, lambda: fresh("appended")),
+            ("eventlog_load", load, lambda: log),
+            ("eventlog_iter", lambda store: list(store.iter_instances()), lambda: snapshot),
+        ]
+        # Plain JSON files, as instances were kept before the event log; no repository code involved.
+        references = [
+            ("json_save (ref)", save_json, lambda: fresh("json")),
+            ("json_load (ref)", load_json, lambda: saved),
+        ]
+        try:
+            results = [dict(case=name, params=params, items=count, **measure(run, prepare, args.repeat, args.min_time))
+                       for name, run, prepare in cases]
+            return results + [dict(case=name, params=params, items=count, reference=True,
+                                   **measure(run, prepare, args.repeat, args.min_time))
+                              for name, run, prepare in references]
+        finally:
+            log.close()
+            snapshot.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def run_cases(sizes: List[int], counts: List[int], args) -> Iterator[List[Dict[str, Any]]]:
+    return itertools.chain((definition_cases(size, args) for size in sizes),
+                           (instance_cases(count, args) for count in counts))
+
+
+def case_key(result: Dict[str, Any]) -> str:
+    return result["case"] + "".join(f" {name}={value}" for name, value in sorted(result["params"].items()))
+
+
+def load_baseline(baseline_file: str) -> Dict[str, Dict[str, Any]]:
+    with open(baseline_file, 'r') as f:
+        return {case_key(result): result for result in json.load(f)["results"]}
+
+
+def regressed(result: Dict[str, Any], before: Optional[Dict[str, Any]], threshold: float) -> bool:
+    """Whether the fastest round of a case is slower than in ``before`` by more than ``threshold``.
+
+    The minimum is compared because noise only ever adds time. Reference
+    cases, which run no repository code, never regress.
+    """
+    return before is not None and not result.get("reference") and result["min"] / before["min"] - 1 > threshold
+
+
+def remeasure(results: List[Dict[str, Any]], suspects: Set[str], args):
+    """Run the cases in ``suspects`` again, keeping the faster of the two measurements of each."""
+    sizes = sorted({result["params"]["states"] for result in results
+                    if case_key(result) in suspects and "instances" not in result["params"]})
+    counts = sorted({result["params"]["instances"] for result in results
+                     if case_key(result) in suspects and "instances" in result["params"]})
+    again = {case_key(result): result for cases in run_cases(sizes, counts, args) for result in cases}
+    for index, result in enumerate(results):
+        key = case_key(result)
+        if key in suspects and again[key]["min"] < result["min"]:
+            results[index] = again[key]
+        if key in suspects:
+            print_result(results[index])
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float) -> int:
+    """Print how the fastest round of each case changed; returns how many cases regressed past ``threshold``."""
+    regressions = 0
+    for result in results:
+        before = baseline.get(case_key(result))
+        if before is None:
+            print(f"  {case_key(result):<52} new")
+            continue
+        change = result["min"] / before["min"] - 1
+        flag = "  (reference)" if result.get("reference") else ""
+        if regressed(result, before, threshold):
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"  {case_key(result):<52} {before['min'] * 1000:>10.3f} -> {result['min'] * 1000:>10.3f} ms "
+              f"{change * 100:>+7.1f}%{flag}")
+    return regressions
+
+
+def print_result(result: Dict[str, Any]):
+    parameters = " ".join(f"{name}={value}" for name, value in result["params"].items())
+    print(f"{result['case']:<18} {parameters:<34} {result['median'] * 1000:>10.3f} {result['min'] * 1000:>10.3f} "
+          f"{result['items'] / result['median']:>12,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark suite over synthetic workloads: BPMN conversion, '
+                                                 'diagram rendering and instance persistence')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000],
+                        help='Synthetic definition sizes in states (default: 100 1000 5000)')
+    parser.add_argument('--branching', type=int, default=2, help='Transitions per state (default: 2)')
+    parser.add_argument('--condition-terms', type=int, default=2, help='Comparisons per condition (default: 2)')
+    parser.add_argument('--schema-properties', type=int, default=8, help='Properties per state schema (default: 8)')
+    parser.add_argument('--any-transitions', type=int, default=2, help='Transitions from "any" (default: 2)')
+    parser.add_argument('--instances', type=int, nargs='+', default=[1000],
+                        help='Instance population sizes for persistence (default: 1000)')
+    parser.add_argument('--instance-states', type=int, default=50,
+                        help='States of the definition instances walk (default: 50)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Timed rounds per case; the median and minimum are reported (default: 5)')
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='Seconds each round keeps calling a case for (default: 0.2)')
+    parser.add_argument('--seed', type=int, default=0, help='Workload random seed (default: 0)')
+    parser.add_argument('--output', default=None, help='Write machine-readable results to this JSON file')
+    parser.add_argument('--compare', default=None, help='Results file of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='With --compare, slowdown counted as a regression (default: 0.10)')
+    parser.add_argument('--confirm', type=int, default=2,
+                        help='With --compare, times a case past the threshold is measured again before it counts '
+                             'as a regression (default: 2)')
+
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'case':<18} {'parameters':<34} {'median ms':>10} {'min ms':>10} {'items/s':>12}")
+    for cases in run_cases(args.sizes, args.instances, args):
+        for result in cases:
+            print_result(result)
+        results.extend(cases)
+
+    baseline = load_baseline(args.compare) if args.compare else {}
+    for _ in range(args.confirm if args.compare else 0):
+        # A slower run on a busy machine is not a regression until it repeats.
+        suspects = {case_key(result) for result in results
+                    if regressed(result, baseline.get(case_key(result)), args.threshold)}
+        if not suspects:
+            break
+        print(f"\nMeasuring {len(suspects)} case(s) slower than {args.compare} again:")
+        remeasure(results, suspects, args)
+
+    document = {
+        "format": RESULTS_FORMAT,
+        "revision": git_revision(),
+        "createdAt": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "environment": {"python": platform.python_version(), "implementation": platform.python_implementation(),
+                        "machine": platform.machine(), "system": platform.system(), "cpus": os.cpu_count()},
+        "parameters": {name: value for name, value in vars(args).items()
+                       if name not in ("output", "compare", "threshold", "confirm")},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        print(f"\nAgainst {args.compare}:")
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
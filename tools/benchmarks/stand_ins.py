@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+
+import asyncio
+import copy
+import json
+import zlib
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Local stand-ins for the services actions and deliveries talk to, shared by the benchmarks and tests/.
+
+class StandInServer:
+    """Local keep-alive HTTP server answering every request with ``200 OK``.
+
+    Paths listed in ``fail_paths`` answer ``500`` and paths in ``slow_paths``
+    wait ``delay`` seconds first, to exercise retries and timeouts. With
+    ``record_bodies`` the request bodies are kept in ``bodies``; ``peak``
+    is the most requests the server was answering at once.
+    """
+
+    def __init__(self, delay: float = 0.0, slow_paths=(), fail_paths=(), record_bodies: bool = False):
+        self.delay = delay
+        self.slow_paths = set(slow_paths)
+        self.fail_paths = set(fail_paths)
+        self.bodies = [] if record_bodies else None
+        self.requests = 0
+        self.connections = 0
+        self.in_flight = 0
+        self.peak = 0
+        self.server = None
+        self.handlers = set()
+        self.close_after_reply = False
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        self.handlers.add(asyncio.current_task())
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    if name.lower() == "content-length":
+                        length = int(value)
+                body = await reader.readexactly(length) if length else b""
+                self.requests += 1
+                if self.bodies is not None:
+                    self.bodies.append(body)
+
+                path = request_line.split()[1].decode()
+                self.in_flight += 1
+                self.peak = max(self.peak, self.in_flight)
+                if path in self.slow_paths:
+                    await asyncio.sleep(self.delay)
+                self.in_flight -= 1
+                writer.write(self._reply(path, body))
+                await writer.drain()
+                if self.close_after_reply:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            self.handlers.discard(asyncio.current_task())
+
+    def _reply(self, path: str, body: bytes) -> bytes:
+        status = b"500 Internal Server Error" if path in self.fail_paths else b"200 OK"
+        reply = json.dumps({"success": status == b"200 OK", "echo": json.loads(body or b"null")}).encode()
+        return (b"HTTP/1.1 " + status + b"\r\nContent-Type: application/json\r\nContent-Length: "
+                + str(len(reply)).encode() + b"\r\n\r\n" + reply)
+
+    async def stop(self):
+        # Clients close their pooled connections first, which ends each handler loop.
+        await asyncio.gather(*self.handlers)
+        self.server.close()
+        await self.server.wait_closed()
+
+
+class ScriptedServer(StandInServer):
+    """Answers every request with the raw bytes of ``reply``, then closes the connection if ``close``.
+
+    For replies a well-behaved server would not send: truncated bodies,
+    garbled status lines, responses without a length.
+    """
+
+    def __init__(self, reply: bytes, close: bool = False):
+        super().__init__()
+        self.reply = reply
+        self.close_after_reply = close
+
+    def _reply(self, path: str, body: bytes) -> bytes:
+        return self.reply
+
+
+def point_at(definition, base_url: str):
+    """Rewrite every webhook URL in a definition to the stand-in server."""
+    definition = copy.deepcopy(definition)
+
+    def rewrite(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == "url" and isinstance(value, str):
+                    node[key] = base_url + urlsplit(value).path
+                else:
+                    rewrite(value)
+        elif isinstance(node, list):
+            for value in node:
+                rewrite(value)
+
+    rewrite(definition)
+    return definition
+
+
+class InProcessBroker:
+    """Stand-in for a Kafka cluster: topics of partitions held in lists.
+
+    Records are partitioned by CRC32 of their key, and every ``produce``
+    call costs ``round_trip`` seconds, like a request to a broker.
+    """
+
+    def __init__(self, partitions: int = 8, round_trip: float = 0.0005):
+        self.partitions = partitions
+        self.round_trip = round_trip
+        self.topics: Dict[str, List[List[Tuple[bytes, bytes]]]] = {}
+        self.requests = 0
+
+    async def produce(self, topic: str, records: List[Tuple[bytes, bytes]]):
+        self.requests += 1
+        await asyncio.sleep(self.round_trip)
+        partitions = self.topics.setdefault(topic, [[] for _ in range(self.partitions)])
+        for key, value in records:
+            partitions[zlib.crc32(key) % self.partitions].append((key, value))
+
+    def values(self, topic: str) -> List[bytes]:
+        return [value for partition in self.topics.get(topic, []) for _, value in partition]
+
+
+def check_order(values: List[bytes], instances: int, changes: int) -> Optional[str]:
+    """What is wrong with the delivered messages, or None if every instance's arrived once each and in sequence."""
+    seen: Dict[str, int] = {}
+    for value in values:
+        message = json.loads(value)
+        expected = seen.get(message["instanceId"], -1) + 1
+        if message["seq"] != expected:
+            return f"{message['instanceId']} got seq {message['seq']}, expected {expected}"
+        seen[message["instanceId"]] = expected
+    if len(seen) != instances or any(last != changes - 1 for last in seen.values()):
+        return f"{len(values)} message(s) delivered, expected {instances * changes}"
+    return None
@@ -2,9 +2,19 @@
 
 import json
 import argparse
-import xmltodict
+import tempfile
+import xml.etree.ElementTree as ET
 from typing import Dict, List, Union, Any
 import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tools.batch.batch_runner import (DEFAULT_CACHE_DIR, ContentCache, expand_inputs, output_path_for,
+                                      print_summary, run_batch, tool_version)
+from tools.model import definition_graph, layered_layout
+from tools.model.definition_graph import DefinitionGraph
+from tools.model.layered_layout import LayeredLayout
 
 class BPMNConverter:
     def __init__(self):
@@ -20,6 +30,7 @@ class BPMNConverter:
         self.reverse_type_mapping = {v: k for k, v in self.state_type_mapping.items()}
         self.x_spacing = 150
         self.y_spacing = 100
+        self.layout_engine = LayeredLayout(layer_spacing=self.x_spacing - 70, node_spacing=self.y_spacing - 60)
 
     def get_transition_event_name(self, transition: Dict[str, Any]) -> str:
         """Extract event name from transition."""
@@ -57,8 +68,34 @@ class BPMNConverter:
                     return from_state["stateId"]
         return None
 
-    def create_bpmn_di(self, process_id: str, elements: Dict) -> Dict:
+    def route_edge(self, source: Dict, target: Dict, to_boundary_event: bool = False) -> List[tuple]:
+        """Orthogonal waypoints between two laid-out shapes."""
+        source_x = source["x"] + source["width"]
+        source_y = source["y"] + source["height"] / 2
+        if to_boundary_event:
+            # Error edges end on top of the boundary event sitting on the task's border
+            return [(source_x, source_y), (target["x"] + target["width"] / 2, target["y"])]
+
+        target_x = target["x"]
+        target_y = target["y"] + target["height"] / 2
+        if target_x > source_x:
+            if source_y == target_y:
+                return [(source_x, source_y), (target_x, target_y)]
+            middle_x = source_x + min(self.layout_engine.layer_spacing / 2, (target_x - source_x) / 2)
+            return [(source_x, source_y), (middle_x, source_y), (middle_x, target_y), (target_x, target_y)]
+
+        # Backward or same-column edges loop underneath both shapes
+        below = max(source["y"] + source["height"], target["y"] + target["height"]) + self.layout_engine.node_spacing / 2
+        start_x = source["x"] + source["width"] / 2
+        end_x = target["x"] + target["width"] / 2
+        return [(start_x, source["y"] + source["height"]), (start_x, below), (end_x, below),
+                (end_x, target["y"] + target["height"])]
+
+    def create_bpmn_di(self, process_id: str, elements: Dict, graph: DefinitionGraph = None) -> Dict:
         """Create BPMN diagram information."""
+        if graph is None:
+            graph = DefinitionGraph(elements)
+
         diagram = {
             "bpmndi:BPMNDiagram": {
                 "@id": f"BPMNDiagram_{process_id}",
@@ -71,17 +108,16 @@ class BPMNConverter:
             }
         }
 
-        # Create state position mapping
-        state_positions = {}
-        x, y = 100, 100
-        
-        # First pass: create shapes for all non-boundary events
+        plane = diagram["bpmndi:BPMNDiagram"]["bpmndi:BPMNPlane"]
+
+        # First pass: size the non-boundary shapes
+        sizes = {}
         for state in elements["states"]:
             if state["baseStateType"] != "error":
                 state_id = state["stateId"]
                 
                 # Determine if this is a decision point
-                if self.is_decision_point(state_id, elements["transitions"]):
+                if graph.is_decision_point(state_id):
                     state["baseStateType"] = "decision"
                 
                 # Determine if this is a user task
@@ -90,65 +126,40 @@ class BPMNConverter:
 
                 # Calculate shape dimensions
                 if state["baseStateType"] in ["initial", "final"]:
-                    width = 36
-                    height = 36
+                    sizes[str(state_id)] = (36, 36)
                 elif state["baseStateType"] == "decision":
-                    width = 50
-                    height = 50
+                    sizes[str(state_id)] = (50, 50)
                 else:
-                    width = 120
-                    height = 80
-                
-                shape = {
-                    "@id": f"Shape_{state_id}",
-                    "@bpmnElement": state_id,
-                    "dc:Bounds": {
-                        "@x": str(x),
-                        "@y": str(y),
-                        "@width": str(width),
-                        "@height": str(height)
-                    }
-                }
-                diagram["bpmndi:BPMNDiagram"]["bpmndi:BPMNPlane"]["bpmndi:BPMNShape"].append(shape)
-                
-                # Store position for edge creation
-                state_positions[str(state_id)] = {
-                    "x": x,
-                    "y": y,
-                    "width": width,
-                    "height": height
-                }
-                
-                x += self.x_spacing
-                if x > 600:  # Start new row
-                    x = 100
-                    y += self.y_spacing
+                    sizes[str(state_id)] = (120, 80)
 
-        # Second pass: add boundary events
+        # Second pass: lay the shapes out in layers along the transitions
+        # "any" fans out over the retyped states, as the sequence flows do in json_to_bpmn
+        any_sources = [s["stateId"] for s in elements["states"] if s["baseStateType"] not in ["initial", "final", "error"]]
+        flows = [(transition, str(source_id), str(transition["toStateId"]))
+                 for transition in elements["transitions"]
+                 for source_id in (any_sources if transition["fromStateId"] == "any" else graph.expand_sources(transition))]
+        layout = self.layout_engine.layout(sizes, [(source, target) for _, source, target in flows])
+
+        state_positions = {}
+        for state_id, (width, height) in sizes.items():
+            x, y = layout.positions[state_id]
+            state_positions[state_id] = {"x": x, "y": y, "width": width, "height": height}
+
+        # Third pass: add boundary events along the bottom edge of their attached tasks
+        attached_count = {}
         for state in elements["states"]:
             if state["baseStateType"] == "error":
                 state_id = state["stateId"]
                 width = 36
                 height = 36
                 
-                attached_task_id = self.find_attached_task(state_id, elements["transitions"], elements["states"])
+                attached_task_id = graph.find_attached_task(state_id)
                 if attached_task_id and attached_task_id in state_positions:
                     task_pos = state_positions[attached_task_id]
-                    x = task_pos["x"] + task_pos["width"] - width/2
+                    offset = attached_count.get(attached_task_id, 0)
+                    attached_count[attached_task_id] = offset + 1
+                    x = task_pos["x"] + task_pos["width"] - width/2 - offset * (width + 8)
                     y = task_pos["y"] + task_pos["height"] - height/2
-                    
-                    shape = {
-                        "@id": f"Shape_{state_id}",
-                        "@bpmnElement": state_id,
-                        "dc:Bounds": {
-                            "@x": str(x),
-                            "@y": str(y),
-                            "@width": str(width),
-                            "@height": str(height)
-                        }
-                    }
-                    diagram["bpmndi:BPMNDiagram"]["bpmndi:BPMNPlane"]["bpmndi:BPMNShape"].append(shape)
-                    
                     state_positions[str(state_id)] = {
                         "x": x,
                         "y": y,
@@ -156,35 +167,37 @@ class BPMNConverter:
                         "height": height
                     }
 
-        # Third pass: create edges
-        for transition in elements["transitions"]:
-            from_state_id = str(transition["fromStateId"])
-            to_state_id = str(transition["toStateId"])
-            
+        for state in elements["states"]:
+            position = state_positions.get(str(state["stateId"]))
+            if position:
+                plane["bpmndi:BPMNShape"].append({
+                    "@id": f"Shape_{state['stateId']}",
+                    "@bpmnElement": state["stateId"],
+                    "dc:Bounds": {
+                        "@x": str(position["x"]),
+                        "@y": str(position["y"]),
+                        "@width": str(position["width"]),
+                        "@height": str(position["height"])
+                    }
+                })
+
+        # Fourth pass: create edges, one per sequence flow
+        for transition, from_state_id, to_state_id in flows:
             from_state = state_positions.get(from_state_id)
             to_state = state_positions.get(to_state_id)
             
             if from_state and to_state:
-                # Calculate connection points
-                source_x = from_state["x"] + from_state["width"]
-                source_y = from_state["y"] + (from_state["height"] / 2)
-                target_x = to_state["x"]
-                target_y = to_state["y"] + (to_state["height"] / 2)
-                
-                # For boundary events, adjust the connection points
-                if self.get_state_by_id(elements["states"], to_state_id)["baseStateType"] == "error":
-                    target_x = to_state["x"] + to_state["width"]/2
-                    target_y = to_state["y"]
-                
+                flow_id = transition["transitionId"]
+                if isinstance(transition["fromStateId"], list) or transition["fromStateId"] == "any":
+                    flow_id = f"{flow_id}_{from_state_id}"
                 edge = {
-                    "@id": f"Edge_{transition['transitionId']}",
-                    "@bpmnElement": transition["transitionId"],
-                    "di:waypoint": [
-                        {"@x": str(source_x), "@y": str(source_y)},
-                        {"@x": str(target_x), "@y": str(target_y)}
-                    ]
+                    "@id": f"Edge_{flow_id}",
+                    "@bpmnElement": flow_id,
+                    "di:waypoint": [{"@x": str(x), "@y": str(y)}
+                                    for x, y in self.route_edge(from_state, to_state,
+                                                                graph.get_state(to_state_id)["baseStateType"] == "error")]
                 }
-                diagram["bpmndi:BPMNDiagram"]["bpmndi:BPMNPlane"]["bpmndi:BPMNEdge"].append(edge)
+                plane["bpmndi:BPMNEdge"].append(edge)
 
         return diagram
 
@@ -210,9 +223,11 @@ class BPMNConverter:
             }
         }
 
+        graph = DefinitionGraph(json_data)
+
         # First pass: identify decision points and user tasks
         for state in json_data["states"]:
-            if self.is_decision_point(state["stateId"], json_data["transitions"]):
+            if graph.is_decision_point(state["stateId"]):
                 state["baseStateType"] = "decision"
             if self.is_user_task(state):
                 state["baseStateType"] = "user"
@@ -235,7 +250,7 @@ class BPMNConverter:
             
             # Add boundary event attributes
             if bpmn_type == "boundaryEvent":
-                attached_task_id = self.find_attached_task(state["stateId"], json_data["transitions"], json_data["states"])
+                attached_task_id = graph.find_attached_task(state["stateId"])
                 if attached_task_id:
                     element["@attachedToRef"] = attached_task_id
                     element["@cancelActivity"] = "true"
@@ -254,6 +269,7 @@ class BPMNConverter:
 
         # Add transitions
         sequence_flows = []
+        possible_sources = None
         for transition in json_data["transitions"]:
             event_name = self.get_transition_event_name(transition)
             
@@ -274,15 +290,17 @@ class BPMNConverter:
             # Handle special case for error transitions
             if isinstance(transition.get("fromStateId"), list):
                 # Create a boundary event for each source state
-                for source_id in transition["fromStateId"]:
+                for source_id in graph.expand_sources(transition):
                     error_flow = flow.copy()
                     error_flow["@id"] = f"{flow['@id']}_{source_id}"
                     error_flow["@sourceRef"] = source_id
                     sequence_flows.append(error_flow)
             elif transition.get("fromStateId") == "any":
-                # Create a boundary event for each possible source state
-                possible_sources = [s["stateId"] for s in json_data["states"] 
-                                 if s["baseStateType"] not in ["initial", "final", "error"]]
+                # Create a boundary event for each possible source state; the first
+                # pass may have retyped states, so the candidates are taken from it
+                if possible_sources is None:
+                    possible_sources = [s["stateId"] for s in json_data["states"]
+                                        if s["baseStateType"] not in ["initial", "final", "error"]]
                 for source_id in possible_sources:
                     error_flow = flow.copy()
                     error_flow["@id"] = f"{flow['@id']}_{source_id}"
@@ -295,10 +313,51 @@ class BPMNConverter:
             bpmn["definitions"]["process"]["sequenceFlow"] = sequence_flows
 
         # Add diagram information
-        bpmn["definitions"].update(self.create_bpmn_di(process_id, json_data))
+        bpmn["definitions"].update(self.create_bpmn_di(process_id, json_data, graph))
 
         return bpmn
 
+    def make_state(self, state_id: str, name: str, description: str, bpmn_type: str, attached_to: str = None) -> Dict:
+        """Build a state definition from a BPMN flow node."""
+        state = {
+            "stateId": state_id,
+            "name": name,
+            "description": description,
+            "baseStateType": self.reverse_type_mapping.get(bpmn_type, "intermediate"),
+            "stateType": "process",
+            "data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {}
+                }
+            }
+        }
+
+        # Add gateway-specific properties
+        if bpmn_type == "exclusiveGateway":
+            state["stateType"] = "decision"
+        elif bpmn_type == "userTask":
+            state["stateType"] = "user"
+        elif bpmn_type == "boundaryEvent":
+            state["attachedTo"] = attached_to
+        return state
+
+    def make_transition(self, flow_id: str, source: str, target: str, name: str, condition: str,
+                        manual: bool) -> Dict:
+        """Build a transition from a BPMN sequence flow."""
+        return {
+            "transitionId": flow_id,
+            "fromStateId": source,
+            "toStateId": target,
+            "event": [{
+                "eventId": f"evt_{flow_id}",
+                "name": name,
+                "description": "",
+                "trigger": "manual" if manual else "auto"
+            }] if name else [],
+            "condition": condition
+        }
+
     def bpmn_to_json(self, bpmn_data: Dict) -> Dict:
         """Convert BPMN XML structure to state machine JSON definition."""
         process = bpmn_data["definitions"]["process"]
@@ -319,30 +378,9 @@ class BPMNConverter:
                 elements = [elements]
                 
             for element in elements:
-                state_type = self.reverse_type_mapping.get(bpmn_type, "intermediate")
-                
-                state = {
-                    "stateId": element["@id"],
-                    "name": element.get("@name", element["@id"]),
-                    "description": element.get("documentation", {}).get("text", ""),
-                    "baseStateType": state_type,
-                    "stateType": "process",
-                    "data": {
-                        "schema": {
-                            "type": "object",
-                            "properties": {}
-                        }
-                    }
-                }
-                
-                # Add gateway-specific properties
-                if bpmn_type == "exclusiveGateway":
-                    state["stateType"] = "decision"
-                elif bpmn_type == "userTask":
-                    state["stateType"] = "user"
-                elif bpmn_type == "boundaryEvent":
-                    state["attachedTo"] = element.get("@attachedToRef")
-                
+                state = self.make_state(element["@id"], element.get("@name", element["@id"]),
+                                        element.get("documentation", {}).get("text", ""), bpmn_type,
+                                        element.get("@attachedToRef"))
                 state_machine["states"].append(state)
 
         # Convert BPMN elements to states
@@ -354,50 +392,215 @@ class BPMNConverter:
         flows = process.get("sequenceFlow", [])
         if not isinstance(flows, list):
             flows = [flows]
+
+        user_state_ids = {s["stateId"] for s in state_machine["states"] if s["stateType"] == "user"}
             
         for flow in flows:
-            transition = {
-                "transitionId": flow["@id"],
-                "fromStateId": flow["@sourceRef"],
-                "toStateId": flow["@targetRef"],
-                "event": [{
-                    "eventId": f"evt_{flow['@id']}",
-                    "name": flow.get("@name", ""),
-                    "description": "",
-                    "trigger": "manual" if any(s["stateType"] == "user" for s in state_machine["states"] if s["stateId"] == flow["@sourceRef"]) else "auto"
-                }] if flow.get("@name") else [],
-                "condition": flow.get("conditionExpression", {}).get("#text", "true")
-            }
+            transition = self.make_transition(flow["@id"], flow["@sourceRef"], flow["@targetRef"], flow.get("@name"),
+                                              flow.get("conditionExpression", {}).get("#text", "true"),
+                                              flow["@sourceRef"] in user_state_ids)
             state_machine["transitions"].append(transition)
 
         return state_machine
 
-def save_xml(bpmn_data: Dict, output_file: str):
-    """Save BPMN dictionary as XML file."""
+    def stream_bpmn_to_json(self, input_file: str, output_file: str) -> Dict[str, int]:
+        """Convert a BPMN file to JSON without loading the document into memory.
+
+        Parses with ``iterparse`` and drops each element once it has been
+        handled, so diagram (bpmndi) sections cost parse time but no memory.
+        States and transitions are spooled to temporary files as they are met
+        and copied into the output at the end, grouped the same way as
+        :meth:`bpmn_to_json` so both paths write identical JSON. Only the ids of
+        user tasks are kept, to set each transition's trigger.
+
+        Items are spooled already formatted, one per line with their line
+        breaks stored as ``\\r`` (which JSON always escapes inside strings), so
+        each is encoded once.
+        """
+        state_spools = {bpmn_type: tempfile.TemporaryFile('w+', encoding='utf-8', newline='\n')
+                        for bpmn_type in self.state_type_mapping.values()}
+        transition_spool = tempfile.TemporaryFile('w+', encoding='utf-8', newline='\n')
+        user_state_ids = set()
+        header = None
+        counts = {"states": 0, "transitions": 0}
+
+        stack = []
+        process_depth = None
+        try:
+            for event, element in ET.iterparse(input_file, events=("start", "end")):
+                tag = local_name(element.tag)
+                if event == "start":
+                    stack.append(element)
+                    if tag == "process" and header is None:
+                        process_depth = len(stack)
+                        header = {
+                            "stateMachineId": element.get("id"),
+                            "name": element.get("name", "Converted from BPMN"),
+                        }
+                    continue
+
+                stack.pop()
+                depth = len(stack) + 1
+                if process_depth is not None and depth > process_depth + 1:
+                    # Documentation, conditions and the like: read when their flow node ends.
+                    continue
+                if process_depth is not None and depth == process_depth + 1:
+                    if tag in state_spools:
+                        state = self.make_state(element.get("id"), element.get("name", element.get("id")),
+                                                child_text(element, ["documentation", "text"], ""), tag,
+                                                element.get("attachedToRef"))
+                        if tag == "userTask":
+                            user_state_ids.add(state["stateId"])
+                        state_spools[tag].write(spooled(state) + "\n")
+                        counts["states"] += 1
+                    elif tag == "sequenceFlow":
+                        condition = child_text(element, ["conditionExpression"]) or "true"
+                        transition = self.make_transition(element.get("id"), element.get("sourceRef"),
+                                                          element.get("targetRef"), element.get("name"),
+                                                          condition, False)
+                        transition_spool.write(json.dumps(transition["fromStateId"]) + "\t" + spooled(transition) + "\n")
+                        counts["transitions"] += 1
+                elif depth == process_depth:
+                    process_depth = None
+                # Handled or not needed: drop it from its parent, which it is the last child of.
+                if stack:
+                    del stack[-1][-1]
+
+            if header is None:
+                raise ValueError(f"No process element found in {input_file}")
+
+            def states():
+                for spool in state_spools.values():
+                    spool.seek(0)
+                    for line in spool:
+                        yield line[:-1]
+
+            def transitions():
+                transition_spool.seek(0)
+                for line in transition_spool:
+                    source, item = line[:-1].split("\t", 1)
+                    if json.loads(source) in user_state_ids:
+                        item = item.replace('"trigger": "auto"', '"trigger": "manual"')
+                    yield item
+
+            with open(output_file, 'w') as f:
+                f.write("{\n")
+                f.write(f'  "stateMachineId": {json.dumps(header["stateMachineId"])},\n')
+                f.write(f'  "name": {json.dumps(header["name"])},\n')
+                f.write('  "description": "Converted from BPMN format",\n')
+                f.write('  "version": 1,\n')
+                write_json_array(f, "states", states())
+                f.write(",\n")
+                write_json_array(f, "transitions", transitions())
+                f.write("\n}")
+        finally:
+            for spool in state_spools.values():
+                spool.close()
+            transition_spool.close()
+        return counts
+
+def local_name(tag: str) -> str:
+    """Strip the namespace from an ElementTree tag."""
+    return tag.rsplit("}", 1)[-1]
+
+def child_text(element, path: List[str], default: str = None) -> str:
+    """Text of a nested child, stripped as xmltodict does; ``default`` if absent, None if empty."""
+    for name in path:
+        element = next((child for child in element if local_name(child.tag) == name), None)
+        if element is None:
+            return default
+    text = (element.text or "").strip()
+    return text or None
+
+def spooled(item: Any) -> str:
+    """An array item formatted as ``json.dump(..., indent=2)`` nests it, on a single line."""
+    return "    " + json.dumps(item, indent=2).replace("\n", "\r    ")
+
+def write_json_array(f, key: str, items):
+    """Write ``"key": [...]`` from spooled items, formatted like ``json.dump(..., indent=2)``."""
+    f.write(f'  {json.dumps(key)}: [')
+    first = True
+    for item in items:
+        f.write("\n" if first else ",\n")
+        f.write(item.replace("\r", "\n"))
+        first = False
+    f.write("]" if first else "\n  ]")
+
+def render_xml(bpmn_data: Dict) -> str:
+    """Render a BPMN dictionary as XML text."""
+    # xmltodict is imported where XML is read or written, so importing this module stays cheap.
+    import xmltodict
     xml_str = xmltodict.unparse(bpmn_data, pretty=True)
     # Remove any existing XML declaration
     if xml_str.startswith('<?xml'):
         xml_str = xml_str[xml_str.find('?>')+2:].lstrip()
     # Add our own XML declaration
-    final_xml = '<?xml version="1.0" encoding="UTF-8"?>\n' + xml_str
+    return '<?xml version="1.0" encoding="UTF-8"?>\n' + xml_str
+
+def save_xml(bpmn_data: Dict, output_file: str):
+    """Save BPMN dictionary as XML file."""
     with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(final_xml)
+        f.write(render_xml(bpmn_data))
 
 def save_json(json_data: Dict, output_file: str):
     """Save JSON dictionary to file."""
     with open(output_file, 'w') as f:
         json.dump(json_data, f, indent=2)
 
+def convert_text(text: str, options: Dict[str, Any]) -> str:
+    """Convert one document's text in the given direction; used by batch mode workers."""
+    converter = BPMNConverter()
+    if options["direction"] == 'json2bpmn':
+        return render_xml(converter.json_to_bpmn(json.loads(text)))
+    import xmltodict
+    return json.dumps(converter.bpmn_to_json(xmltodict.parse(text)), indent=2)
+
+def run_batch_mode(args):
+    """Convert every file matched by a directory or glob into ``--output-dir``."""
+    if args.direction == 'json2bpmn':
+        suffixes, output_suffix = ('.json',), '.bpmn'
+    else:
+        suffixes, output_suffix = ('.bpmn', '.xml'), '.json'
+    inputs = expand_inputs(args.input_file, suffixes)
+    jobs = [(path, output_path_for(path, args.input_file, args.output_dir, output_suffix)) for path in inputs]
+
+    cache = None
+    if not args.no_cache:
+        # Every module the output depends on, so a layout change expires the cached BPMN.
+        version = tool_version(__file__, definition_graph.__file__, layered_layout.__file__)
+        cache = ContentCache(args.cache_dir, 'bpmn_converter', version)
+    summary = run_batch(jobs, convert_text, {"direction": args.direction}, cache, args.workers)
+    print_summary(summary)
+    return 1 if summary["failed"] else 0
+
 def main():
     parser = argparse.ArgumentParser(description='Convert between State Machine JSON and BPMN XML formats')
-    parser.add_argument('input_file', help='Input file path (JSON or BPMN XML)')
-    parser.add_argument('output_file', help='Output file path')
+    parser.add_argument('input_file', help='Input file path (JSON or BPMN XML); with --output-dir a directory or glob')
+    parser.add_argument('output_file', nargs='?', help='Output file path')
     parser.add_argument('--direction', choices=['json2bpmn', 'bpmn2json'], required=True,
                       help='Conversion direction')
+    parser.add_argument('--stream', action='store_true',
+                      help='bpmn2json: parse incrementally with bounded memory (for very large files)')
+    parser.add_argument('--output-dir', help='Batch mode: convert every matching input file into this directory')
+    parser.add_argument('--workers', type=int, help='Batch mode: worker processes (default: CPU count)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                      help=f'Batch mode: content-hash cache directory (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--no-cache', action='store_true', help='Batch mode: convert every file')
     
     args = parser.parse_args()
+
+    if args.output_dir:
+        sys.exit(run_batch_mode(args))
+    if args.output_file is None:
+        parser.error('output_file is required unless --output-dir is given')
     
     converter = BPMNConverter()
+
+    if args.stream and args.direction == 'bpmn2json':
+        counts = converter.stream_bpmn_to_json(args.input_file, args.output_file)
+        print(f"Conversion completed ({counts['states']} states, {counts['transitions']} transitions). "
+              f"Output saved to: {args.output_file}")
+        return
     
     # Read input file
     with open(args.input_file, 'r') as f:
@@ -406,6 +609,7 @@ def main():
             output_data = converter.json_to_bpmn(input_data)
             save_xml(output_data, args.output_file)
         else:  # bpmn2json
+            import xmltodict
             input_data = xmltodict.parse(f.read())
             output_data = converter.bpmn_to_json(input_data)
             save_json(output_data, args.output_file)
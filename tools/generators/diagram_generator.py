@@ -3,12 +3,21 @@ import json
 import sys
 from typing import Dict, List
 import argparse
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tools.batch.batch_runner import (DEFAULT_CACHE_DIR, ContentCache, expand_inputs, output_path_for,
+                                      print_summary, run_batch, tool_version)
+from tools.model import definition_graph
+from tools.model.definition_graph import DefinitionGraph
 
 class DiagramGenerator:
     def __init__(self, json_data: Dict):
         self.data = json_data
-        self.states = {state["stateId"]: state for state in json_data["states"]}
-        self.transitions = json_data["transitions"]
+        self.graph = DefinitionGraph(json_data)
+        self.states = self.graph.states
+        self.transitions = self.graph.transitions
 
     def get_transition_label(self, transition):
         if 'name' in transition:
@@ -72,56 +81,78 @@ class DiagramGenerator:
             # Handle user-triggered transitions
             if 'trigger' in transition.get('event', [{}])[0] and transition['event'][0]['trigger'] == 'manual':
                 mermaid.append(f"    User->>+System: {label}")
-                if 'entryActions' in next((s for s in self.data["states"] if s['stateId'] == to_state), {}):
+                if 'entryActions' in self.states.get(to_state, {}):
                     mermaid.append(f"    System->>System: Execute {to_state} actions")
                 mermaid.append(f"    System-->>-User: State updated to {to_state}")
             # Handle system-triggered transitions
             else:
                 mermaid.append(f"    activate System")
                 mermaid.append(f"    System->>System: {label}")
-                if 'entryActions' in next((s for s in self.data["states"] if s['stateId'] == to_state), {}):
+                if 'entryActions' in self.states.get(to_state, {}):
                     mermaid.append(f"    System->>System: Execute {to_state} actions")
                 mermaid.append(f"    System-->>User: State updated to {to_state}")
                 mermaid.append(f"    deactivate System")
 
         return "\n".join(mermaid)
 
-def main():
-    parser = argparse.ArgumentParser(description='Generate Mermaid diagrams from state machine definition')
-    parser.add_argument('input_file', help='Input JSON file path')
-    parser.add_argument('--type', choices=['state', 'sequence', 'all'], default='all',
-                      help='Type of diagram to generate (default: all)')
-    parser.add_argument('--output', help='Output markdown file path')
-    
-    args = parser.parse_args()
-    
-    # Read JSON file
-    with open(args.input_file, 'r') as f:
-        json_data = json.load(f)
-    
-    # Create generator
+def render_markdown(json_data: Dict, diagram_type: str = 'all') -> str:
+    """Render the requested Mermaid diagrams of a definition as markdown."""
     generator = DiagramGenerator(json_data)
-    
-    # Generate diagrams
+
     output = []
-    if args.type in ['state', 'all']:
+    if diagram_type in ['state', 'all']:
         output.extend([
             "# State Diagram",
             "```mermaid",
             generator.generate_state_diagram(),
             "```\n"
         ])
-    
-    if args.type in ['sequence', 'all']:
+
+    if diagram_type in ['sequence', 'all']:
         output.extend([
             "# Sequence Diagram",
             "```mermaid",
             generator.generate_sequence_diagram(),
             "```\n"
         ])
+    return "\n".join(output)
+
+def convert_text(text: str, options: Dict) -> str:
+    """Batch mode worker: definition JSON text to markdown."""
+    return render_markdown(json.loads(text), options["type"])
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate Mermaid diagrams from state machine definition')
+    parser.add_argument('input_file', help='Input JSON file path; with --output-dir a directory or glob')
+    parser.add_argument('--type', choices=['state', 'sequence', 'all'], default='all',
+                      help='Type of diagram to generate (default: all)')
+    parser.add_argument('--output', help='Output markdown file path')
+    parser.add_argument('--output-dir', help='Batch mode: write a .md file per matching definition into this directory')
+    parser.add_argument('--workers', type=int, help='Batch mode: worker processes (default: CPU count)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                      help=f'Batch mode: content-hash cache directory (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--no-cache', action='store_true', help='Batch mode: regenerate every file')
+    
+    args = parser.parse_args()
+
+    if args.output_dir:
+        inputs = expand_inputs(args.input_file, ('.json',))
+        jobs = [(path, output_path_for(path, args.input_file, args.output_dir, '.md')) for path in inputs]
+        cache = None
+        if not args.no_cache:
+            cache = ContentCache(args.cache_dir, 'diagram_generator', tool_version(__file__, definition_graph.__file__))
+        summary = run_batch(jobs, convert_text, {"type": args.type}, cache, args.workers)
+        print_summary(summary)
+        sys.exit(1 if summary["failed"] else 0)
+    
+    # Read JSON file
+    with open(args.input_file, 'r') as f:
+        json_data = json.load(f)
+    
+    # Generate diagrams
+    output_content = render_markdown(json_data, args.type)
     
     # Output results
-    output_content = "\n".join(output)
     if args.output:
         with open(args.output, 'w') as f:
             f.write(output_content)
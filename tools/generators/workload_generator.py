@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Any, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+EPOCH = datetime(2024, 1, 10, 14, 30, tzinfo=timezone.utc)
+CURRENCIES = ["USD", "EUR", "GBP"]
+INTERMEDIATE_TYPES = [("task", "processing"), ("userTask", "confirmation"), ("intermediate", "verification")]
+
+
+def format_timestamp(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def property_schema(index: int) -> Dict[str, Any]:
+    """Schema of synthetic property ``p<index>``; the kinds cycle through number, enum, string and boolean."""
+    kind = index % 4
+    if kind == 0:
+        return {"type": "number", "minimum": 0, "description": f"Amount {index}"}
+    if kind == 1:
+        return {"type": "string", "enum": CURRENCIES, "description": f"Currency {index}"}
+    if kind == 2:
+        return {"type": "string", "pattern": "^[A-Z0-9]{8,}$", "description": f"Account {index}"}
+    return {"type": "boolean", "description": f"Flag {index}"}
+
+
+def property_value(index: int, rng: random.Random) -> Any:
+    kind = index % 4
+    if kind == 0:
+        return round(rng.uniform(0, 10000), 2)
+    if kind == 1:
+        return rng.choice(CURRENCIES)
+    if kind == 2:
+        return f"ACCT{rng.randrange(10 ** 8):08d}"
+    return rng.random() < 0.5
+
+
+def condition_term(index: int, rng: random.Random) -> str:
+    kind = index % 4
+    if kind == 0:
+        return f"data.p{index} {rng.choice(['>', '>=', '<', '<='])} {rng.randrange(10000)}"
+    if kind == 1:
+        return f"data.p{index} {rng.choice(['===', '!=='])} '{rng.choice(CURRENCIES)}'"
+    if kind == 2:
+        return f"data.p{index} !== null"
+    return f"data.p{index} === {rng.choice(['true', 'false'])}"
+
+
+def make_condition(terms: int, schema_properties: int, rng: random.Random) -> str:
+    """``terms`` comparisons over the schema properties joined by ``&&``/``||``; ``"true"`` for none."""
+    if terms <= 0 or schema_properties <= 0:
+        return "true"
+    parts = [condition_term(rng.randrange(schema_properties), rng) for _ in range(terms)]
+    condition = parts[0]
+    for part in parts[1:]:
+        condition += f" {rng.choice(['&&', '||'])} {part}"
+    return condition
+
+
+def generate_definition(states: int = 100, transitions: Optional[int] = None, branching: int = 2,
+                        condition_terms: int = 1, schema_properties: int = 5, any_transitions: int = 1,
+                        action_every: int = 3, seed: int = 0) -> Dict[str, Any]:
+    """Build a synthetic definition.
+
+    ``states`` includes the initial state and two final states (``done``,
+    ``failed``). Every task state gets an edge to the next one, so all states
+    are reachable; further edges up to ``transitions`` (default ``states *
+    branching``) go to random states, mostly forward. ``condition_terms``
+    comparisons over the ``schema_properties`` properties of each state's
+    schema guard the branches, and ``any_transitions`` transitions leave
+    from ``"any"``. ``transitions`` cannot be below the ``states - 2``
+    spine edges plus the ``any_transitions``.
+    """
+    if states < 3:
+        raise ValueError("a definition needs at least 3 states")
+    if transitions is not None and transitions < states - 2 + any_transitions:
+        raise ValueError(f"{transitions} transitions cannot connect {states} states: at least "
+                         f"{states - 2 + any_transitions} are needed ({states - 2} along the spine and "
+                         f"{any_transitions} from \"any\")")
+    rng = random.Random(seed)
+    properties = {f"p{i}": property_schema(i) for i in range(schema_properties)}
+
+    definition_states = []
+    for i in range(states - 2):
+        base_type, state_type = ("initial", "setup") if i == 0 else INTERMEDIATE_TYPES[i % len(INTERMEDIATE_TYPES)]
+        state = {"stateId": f"s{i}", "name": f"Task {i}", "description": f"Synthetic task {i}.",
+                 "baseStateType": base_type, "stateType": state_type}
+        if schema_properties:
+            required = sorted(rng.sample(sorted(properties), k=max(1, schema_properties // 2)))
+            state["data"] = {"schema": {"$schema": "http://json-schema.org/draft-07/schema#", "type": "object",
+                                        "properties": properties, "required": required}}
+        if action_every and i % action_every == 0:
+            state["entryActions"] = [{
+                "actionId": f"a{i}", "name": f"Action {i}", "description": f"Entry action of task {i}.",
+                "trigger": {"webhook": {"url": f"http://example.com/task/{i}", "method": "POST",
+                                        "payload": {"transferId": "$data.transferId", "step": i}}},
+                "retryCount": 3, "retryDelay": "PT5S", "timeout": "PT30S",
+            }]
+        definition_states.append(state)
+    definition_states.append({"stateId": "done", "name": "Done", "description": "Completed.",
+                              "baseStateType": "final", "stateType": "completion"})
+    definition_states.append({"stateId": "failed", "name": "Failed", "description": "Failed.",
+                              "baseStateType": "final", "stateType": "error"})
+
+    task_ids = [state["stateId"] for state in definition_states[:-2]]
+    target = transitions if transitions is not None else states * branching
+    definition_transitions = []
+
+    def add(source: Any, target_id: str, condition: str, event: Optional[str]):
+        transition = {"transitionId": f"t{len(definition_transitions)}", "fromStateId": source,
+                      "toStateId": target_id, "name": f"To {target_id}", "condition": condition}
+        if event is not None:
+            transition["event"] = [{"eventId": event, "name": event, "trigger": "manual"}]
+        definition_transitions.append(transition)
+
+    for i, state_id in enumerate(task_ids):
+        following = task_ids[i + 1] if i + 1 < len(task_ids) else "done"
+        # Alternate event-driven and automatic steps along the spine.
+        add(state_id, following, make_condition(condition_terms, schema_properties, rng),
+            f"next{i}" if i % 2 == 0 else None)
+    for k in range(any_transitions):
+        add("any", "failed", "true", f"abort{k}")
+    while len(definition_transitions) < target:
+        i = rng.randrange(len(task_ids))
+        if rng.random() < 0.8:
+            target_id = rng.choice(task_ids[i + 1:] + ["done", "failed"])
+        else:
+            target_id = task_ids[rng.randrange(i + 1)]
+        add(task_ids[i], target_id, make_condition(condition_terms, schema_properties, rng),
+            f"branch{len(definition_transitions)}" if rng.random() < 0.5 else None)
+
+    return {
+        "stateMachineId": f"synthetic{states}",
+        "name": f"Synthetic {states} states",
+        "description": "Generated by tools/generators/workload_generator.py",
+        "version": 1,
+        "globalCallbackHandler": {"webhook": {"url": "http://example.com/global-callback", "method": "POST",
+                                              "expectedResponse": "200 OK"}},
+        "globalErrorHandler": {"onError": "retry", "onTimeout": "notify"},
+        "states": definition_states,
+        "transitions": definition_transitions,
+    }
+
+
+def generate_instance(definition: Dict[str, Any], index: int, rng: random.Random,
+                      max_visits: int = 10, data_dir: Optional[str] = None) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """An instance that walked up to ``max_visits`` states along the definition's transitions.
+
+    Each visit sets the properties its state's schema requires plus up to
+    two random ones, so the data validates against the definition. With
+    ``data_dir`` every history entry gets a ``dataRef`` into it and the
+    matching state-data documents are returned alongside the instance.
+    """
+    outgoing: Dict[str, List[str]] = {}
+    for transition in definition["transitions"]:
+        sources = transition["fromStateId"]
+        for source in ([sources] if isinstance(sources, str) else sources):
+            if source != "any":
+                outgoing.setdefault(source, []).append(transition["toStateId"])
+    properties = sorted(next((state["data"]["schema"]["properties"] for state in definition["states"]
+                              if "data" in state), {}))
+    required = {state["stateId"]: state["data"]["schema"].get("required", [])
+                for state in definition["states"] if "data" in state}
+
+    instance_id = f"wl-{index:08d}-{rng.randrange(16 ** 8):08x}"
+    started = EPOCH + timedelta(seconds=index)
+    state_id = definition["states"][0]["stateId"]
+    history, documents = [], []
+    consolidated = {"transferId": f"tr-{instance_id}", "timestamp": format_timestamp(started)}
+    at = started
+    for visit in range(rng.randint(1, max_visits)):
+        names = set(required.get(state_id, ())).union(rng.sample(properties, min(2, len(properties))))
+        data = {name: property_value(int(name[1:]), rng) for name in sorted(names, key=lambda name: int(name[1:]))}
+        if visit == 0:
+            data.update(consolidated)
+        consolidated.update(data)
+        entry = {"stateId": state_id, "enteredAt": format_timestamp(at)}
+        if data_dir is not None:
+            entry["dataRef"] = f"{data_dir}/{instance_id}-{visit}-{state_id}.json"
+            documents.append({"stateId": state_id, "instanceId": instance_id, "enteredAt": entry["enteredAt"],
+                              "data": data, "actions": []})
+        history.append(entry)
+        targets = outgoing.get(state_id)
+        if not targets:
+            break
+        at += timedelta(seconds=rng.randint(1, 300))
+        state_id = rng.choice(targets)
+    for entry, following in zip(history, history[1:]):
+        entry["exitedAt"] = following["enteredAt"]
+    for document, entry in zip(documents, history):
+        if "exitedAt" in entry:
+            document["exitedAt"] = entry["exitedAt"]
+
+    instance = {
+        "instanceId": instance_id,
+        "stateMachineId": definition["stateMachineId"],
+        "currentState": history[-1]["stateId"],
+        "startedAt": format_timestamp(started),
+        "lastUpdated": history[-1]["enteredAt"],
+        "consolidatedData": consolidated,
+        "stateHistory": history,
+    }
+    return instance, documents
+
+
+def generate_instances(definition: Dict[str, Any], count: int, seed: int = 0, max_visits: int = 10,
+                       data_dir: Optional[str] = None) -> Iterator[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    rng = random.Random(seed)
+    for index in range(count):
+        yield generate_instance(definition, index, rng, max_visits, data_dir)
+
+
+def write_workload(output_dir: str, definition: Dict[str, Any], instances: int, seed: int = 0,
+                   max_visits: int = 10, state_data: bool = False) -> Dict[str, int]:
+    """Write ``definitions/``, ``instances/`` and optionally ``instances/state-data/`` under ``output_dir``.
+
+    ``dataRef`` paths are relative to ``output_dir``, as the repository's are
+    relative to its root.
+    """
+    definitions_dir = os.path.join(output_dir, "definitions")
+    instances_dir = os.path.join(output_dir, "instances")
+    os.makedirs(definitions_dir, exist_ok=True)
+    os.makedirs(instances_dir, exist_ok=True)
+    with open(os.path.join(definitions_dir, f"{definition['stateMachineId']}-definition.json"), 'w') as f:
+        json.dump(definition, f, indent=2)
+
+    data_dir = "instances/state-data" if state_data else None
+    if data_dir:
+        os.makedirs(os.path.join(output_dir, data_dir), exist_ok=True)
+    documents_written = 0
+    for instance, documents in generate_instances(definition, instances, seed, max_visits, data_dir):
+        with open(os.path.join(instances_dir, f"{instance['instanceId']}.json"), 'w') as f:
+            json.dump(instance, f, indent=2)
+        for document, entry in zip(documents, instance["stateHistory"]):
+            with open(os.path.join(output_dir, entry["dataRef"]), 'w') as f:
+                json.dump(document, f, indent=2)
+        documents_written += len(documents)
+    return {"states": len(definition["states"]), "transitions": len(definition["transitions"]),
+            "instances": instances, "stateData": documents_written}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic definition and a matching instance population')
+    parser.add_argument('output_dir', help='Directory to write definitions/ and instances/ into')
+    parser.add_argument('--states', type=int, default=100, help='States, including initial and finals (default: 100)')
+    parser.add_argument('--transitions', type=int, default=None, help='Transitions (default: states x branching)')
+    parser.add_argument('--branching', type=int, default=2, help='Average outgoing transitions per state (default: 2)')
+    parser.add_argument('--condition-terms', type=int, default=1,
+                        help='Comparisons per transition condition; 0 for "true" (default: 1)')
+    parser.add_argument('--schema-properties', type=int, default=5, help='Properties per state schema (default: 5)')
+    parser.add_argument('--any-transitions', type=int, default=1, help='Transitions from "any" (default: 1)')
+    parser.add_argument('--instances', type=int, default=100, help='Instances to generate (default: 100)')
+    parser.add_argument('--max-visits', type=int, default=10, help='Longest instance history (default: 10)')
+    parser.add_argument('--state-data', action='store_true', help='Also write state-data files with dataRef links')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+
+    args = parser.parse_args()
+    try:
+        definition = generate_definition(args.states, args.transitions, args.branching, args.condition_terms,
+                                         args.schema_properties, args.any_transitions, seed=args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+    summary = write_workload(args.output_dir, definition, args.instances, args.seed, args.max_visits, args.state_data)
+    print(f"Wrote {summary['states']} states, {summary['transitions']} transitions, "
+          f"{summary['instances']} instances and {summary['stateData']} state data files to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
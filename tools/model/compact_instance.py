@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+
+import calendar
+import sys
+import time
+from array import array
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+# History timestamp sentinels: no exitedAt yet, or a value kept verbatim in the visit's extras.
+NO_TIME = -(2 ** 63)
+VERBATIM_TIME = NO_TIME + 1
+
+VISIT_STRIDE = 4
+
+# dataRef codes below zero; codes >= 0 index StateTable.data_ref_prefixes.
+NO_DATA_REF = -1
+VERBATIM_DATA_REF = -2
+
+TOP_LEVEL_FIELDS = ("instanceId", "stateMachineId", "currentState", "startedAt", "lastUpdated",
+                    "consolidatedData", "stateHistory")
+VISIT_FIELDS = ("stateId", "enteredAt", "exitedAt", "dataRef")
+
+Timestamp = Union[int, str, None]
+
+# Marks a top-level field that the source document did not have.
+ABSENT = object()
+
+
+def parse_timestamp(value: Optional[str]) -> Timestamp:
+    """Epoch seconds for a canonical ``YYYY-MM-DDTHH:MM:SSZ`` string; anything else is kept as given."""
+    if isinstance(value, str) and len(value) == 20 and value[10] == "T" and value[19] == "Z":
+        try:
+            epoch = calendar.timegm((int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                                     int(value[11:13]), int(value[14:16]), int(value[17:19])))
+        except ValueError:
+            return value
+        if format_timestamp(epoch) == value:
+            return epoch
+    return value
+
+
+def format_timestamp(value: Timestamp) -> Optional[str]:
+    if isinstance(value, int):
+        return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(value))
+    return value
+
+
+class StateTable:
+    """Interned integer ids for the states of one definition version.
+
+    States are numbered in declaration order; ids met in instances but
+    missing from the definition are appended, so nothing is lost. Common
+    ``dataRef`` prefixes are interned here too.
+    """
+
+    def __init__(self, definition: Dict[str, Any]):
+        self.state_machine_id = definition.get("stateMachineId")
+        self.version = definition.get("version")
+        self.state_ids: List[str] = []
+        self.index: Dict[str, int] = {}
+        for state in definition.get("states", []):
+            self.intern(state["stateId"])
+        self.data_ref_prefixes: List[str] = []
+        self._prefix_index: Dict[str, int] = {}
+
+    def intern(self, state_id: str) -> int:
+        number = self.index.get(state_id)
+        if number is None:
+            number = self.index[state_id] = len(self.state_ids)
+            self.state_ids.append(sys.intern(state_id))
+        return number
+
+    def data_ref_code(self, data_ref: Optional[str], instance_id: str, state_id: str) -> int:
+        """Code for ``<prefix><instanceId>-<stateId>.json`` references; VERBATIM_DATA_REF otherwise."""
+        if data_ref is None:
+            return NO_DATA_REF
+        suffix = f"{instance_id}-{state_id}.json"
+        if not isinstance(data_ref, str) or not data_ref.endswith(suffix):
+            return VERBATIM_DATA_REF
+        prefix = data_ref[:-len(suffix)]
+        code = self._prefix_index.get(prefix)
+        if code is None:
+            if len(self.data_ref_prefixes) >= 127:
+                return VERBATIM_DATA_REF
+            code = self._prefix_index[prefix] = len(self.data_ref_prefixes)
+            self.data_ref_prefixes.append(prefix)
+        return code
+
+
+_table_cache: Dict[Tuple[str, Any], StateTable] = {}
+
+
+def get_state_table(definition: Dict[str, Any]) -> StateTable:
+    """Return the state table for a definition, building it once per version."""
+    key = (definition["stateMachineId"], definition.get("version"))
+    table = _table_cache.get(key)
+    if table is None:
+        table = _table_cache[key] = StateTable(definition)
+    return table
+
+
+# consolidatedData is stored as a values tuple plus an interned tuple of keys shared by
+# every instance whose data has the same keys in the same order.
+_shapes: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+def _shape(keys: Tuple[str, ...]) -> Tuple[str, ...]:
+    shape = _shapes.get(keys)
+    if shape is None:
+        shape = _shapes[keys] = tuple(sys.intern(key) for key in keys)
+    return shape
+
+
+class CompactInstance:
+    """Memory-lean form of an instance document.
+
+    State ids are integers from a shared :class:`StateTable`, canonical UTC
+    timestamps are epoch seconds, and the state history is one flat integer
+    array. Anything without a compact form (other timestamp formats, extra
+    visit or top-level fields, unusual ``dataRef`` values) is kept verbatim
+    on the side, so :meth:`to_json` gives back an equal document.
+    """
+
+    __slots__ = ("instance_id", "table", "current", "started_at", "last_updated", "data_shape", "data_values",
+                 "visits", "visit_extras", "extras")
+
+    def __init__(self, instance_id: str, table: StateTable):
+        self.instance_id = instance_id
+        self.table = table
+        self.current = -1
+        self.started_at: Timestamp = None
+        self.last_updated: Timestamp = None
+        self.data_shape: Optional[Tuple[str, ...]] = None
+        self.data_values: Tuple[Any, ...] = ()
+        # VISIT_STRIDE values per visit: state number, enteredAt, exitedAt, dataRef code
+        self.visits = array('q')
+        # visit index -> {field: value} for fields kept verbatim
+        self.visit_extras: Optional[Dict[int, Dict[str, Any]]] = None
+        # top-level fields kept verbatim (or ABSENT), including a stateMachineId other than the table's
+        self.extras: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_json(cls, document: Dict[str, Any], table: StateTable) -> "CompactInstance":
+        instance = cls(document["instanceId"], table)
+        extras = {key: value for key, value in document.items() if key not in TOP_LEVEL_FIELDS}
+        for key in TOP_LEVEL_FIELDS[1:]:
+            if key not in document:
+                extras[key] = ABSENT
+        if "stateMachineId" in document and document["stateMachineId"] != table.state_machine_id:
+            extras["stateMachineId"] = document["stateMachineId"]
+
+        current = document.get("currentState")
+        if isinstance(current, str):
+            instance.current = table.intern(current)
+        elif "currentState" in document:
+            extras["currentState"] = current
+        instance.started_at = parse_timestamp(document.get("startedAt"))
+        instance.last_updated = parse_timestamp(document.get("lastUpdated"))
+
+        data = document.get("consolidatedData")
+        if isinstance(data, dict):
+            instance.data = data
+        elif "consolidatedData" in document:
+            extras["consolidatedData"] = data
+        history = document.get("stateHistory")
+        if isinstance(history, list):
+            for visit in history:
+                instance._append_visit(visit)
+        elif "stateHistory" in document:
+            extras["stateHistory"] = history
+        instance.extras = extras or None
+        return instance
+
+    def _append_visit(self, visit: Dict[str, Any]):
+        index = self.visit_count
+        state_id = visit["stateId"]
+        row = [self.table.intern(state_id)]
+        verbatim = {key: value for key, value in visit.items() if key not in VISIT_FIELDS}
+        for key in ("enteredAt", "exitedAt"):
+            value = parse_timestamp(visit.get(key))
+            if key not in visit:
+                row.append(NO_TIME)
+            elif isinstance(value, int):
+                row.append(value)
+            else:
+                row.append(VERBATIM_TIME)
+                verbatim[key] = value
+        code = self.table.data_ref_code(visit.get("dataRef"), self.instance_id, state_id)
+        if code == VERBATIM_DATA_REF or (code == NO_DATA_REF and "dataRef" in visit):
+            verbatim["dataRef"] = visit["dataRef"]
+            code = VERBATIM_DATA_REF
+        row.append(code)
+        self.visits.extend(row)
+        if verbatim:
+            self._visit_verbatim(index).update(verbatim)
+
+    @property
+    def visit_count(self) -> int:
+        return len(self.visits) // VISIT_STRIDE
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        return dict(zip(self.data_shape, self.data_values)) if self.data_shape is not None else {}
+
+    @data.setter
+    def data(self, data: Dict[str, Any]):
+        self.data_shape = _shape(tuple(data))
+        self.data_values = tuple(data.values())
+        self._replace_verbatim("consolidatedData")
+
+    def update_data(self, changes: Dict[str, Any]):
+        data = self.data
+        data.update(changes)
+        self.data = data
+
+    @property
+    def current_state(self) -> Optional[str]:
+        return self.table.state_ids[self.current] if self.current >= 0 else None
+
+    def enter(self, state_id: str, at: Timestamp):
+        """Record a transition into ``state_id``, closing the open visit (as the engine does)."""
+        if isinstance(at, str):
+            at = parse_timestamp(at)
+        epoch = at if isinstance(at, int) else VERBATIM_TIME
+        if self.visits and self.visits[-2] == NO_TIME:
+            self.visits[-2] = epoch
+            if epoch == VERBATIM_TIME:
+                self._visit_verbatim(self.visit_count - 1)["exitedAt"] = at
+        self.current = self.table.intern(state_id)
+        self.visits.extend((self.current, epoch, NO_TIME, NO_DATA_REF))
+        if epoch == VERBATIM_TIME:
+            self._visit_verbatim(self.visit_count - 1)["enteredAt"] = at
+        self.last_updated = at
+        self._replace_verbatim("currentState", "lastUpdated", "stateHistory")
+
+    def _replace_verbatim(self, *keys: str):
+        """Forget verbatim top-level values that the compact fields now hold."""
+        if self.extras:
+            for key in keys:
+                self.extras.pop(key, None)
+
+    def _visit_verbatim(self, index: int) -> Dict[str, Any]:
+        if self.visit_extras is None:
+            self.visit_extras = {}
+        return self.visit_extras.setdefault(index, {})
+
+    def visit(self, index: int) -> Dict[str, Any]:
+        state, entered, exited, code = self.visits[index * VISIT_STRIDE:(index + 1) * VISIT_STRIDE]
+        state_id = self.table.state_ids[state]
+        verbatim = self.visit_extras.get(index, {}) if self.visit_extras else {}
+        entry = {"stateId": state_id}
+        for key, value in (("enteredAt", entered), ("exitedAt", exited)):
+            if value == VERBATIM_TIME:
+                entry[key] = verbatim[key]
+            elif value != NO_TIME:
+                entry[key] = format_timestamp(value)
+        if code >= 0:
+            entry["dataRef"] = f"{self.table.data_ref_prefixes[code]}{self.instance_id}-{state_id}.json"
+        for key, value in verbatim.items():
+            if key not in entry:
+                entry[key] = value
+        return entry
+
+    def to_json(self) -> Dict[str, Any]:
+        extras = self.extras or {}
+        fields = (
+            ("stateMachineId", lambda: self.table.state_machine_id),
+            ("currentState", lambda: self.current_state),
+            ("startedAt", lambda: format_timestamp(self.started_at)),
+            ("lastUpdated", lambda: format_timestamp(self.last_updated)),
+            ("consolidatedData", lambda: self.data),
+            ("stateHistory", lambda: [self.visit(i) for i in range(self.visit_count)]),
+        )
+        document = {"instanceId": self.instance_id}
+        for key, value in fields:
+            if key not in extras:
+                document[key] = value()
+            elif extras[key] is not ABSENT:
+                document[key] = extras[key]
+        for key, value in extras.items():
+            if key not in TOP_LEVEL_FIELDS:
+                document[key] = value
+        return document
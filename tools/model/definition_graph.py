@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+from typing import Dict, List, Any, Optional
+
+ANY_SOURCE = "any"
+
+# Base state types that an "any" source transition does not fan out from.
+NON_ANY_SOURCE_TYPES = ("initial", "final", "error")
+
+
+class DefinitionGraph:
+    """Indexed view of a state machine definition.
+
+    The state map, adjacency lists and source expansion are built once so that
+    tools walking the definition do not rescan ``states``/``transitions`` on
+    every lookup.
+    """
+
+    def __init__(self, json_data: Dict[str, Any]):
+        self.data = json_data
+        self.states: Dict[str, Dict] = {}
+        self.state_ids: List[str] = []
+        self.transitions: List[Dict] = json_data.get("transitions", [])
+        self.transitions_by_id: Dict[str, Dict] = {}
+
+        # Expanded adjacency: list-valued and "any" sources fanned out.
+        self.outgoing: Dict[str, List[Dict]] = {}
+        self.incoming: Dict[str, List[Dict]] = {}
+
+        # Adjacency restricted to transitions declaring a single source state.
+        self.declared_outgoing: Dict[str, List[Dict]] = {}
+        self.declared_incoming: Dict[str, List[Dict]] = {}
+
+        for state in json_data.get("states", []):
+            state_id = state["stateId"]
+            self.states[state_id] = state
+            self.state_ids.append(state_id)
+            self.outgoing[state_id] = []
+            self.incoming[state_id] = []
+            self.declared_outgoing[state_id] = []
+            self.declared_incoming[state_id] = []
+
+        self.any_sources: List[str] = [
+            state_id for state_id in self.state_ids
+            if self.states[state_id].get("baseStateType") not in NON_ANY_SOURCE_TYPES
+        ]
+
+        self.transition_sources: Dict[str, List[str]] = {}
+        for transition in self.transitions:
+            transition_id = transition["transitionId"]
+            sources = self._expand(transition.get("fromStateId"))
+            self.transitions_by_id[transition_id] = transition
+            self.transition_sources[transition_id] = sources
+
+            to_state_id = transition["toStateId"]
+            for source_id in sources:
+                self.outgoing.setdefault(source_id, []).append(transition)
+            self.incoming.setdefault(to_state_id, []).append(transition)
+
+            from_state_id = transition.get("fromStateId")
+            if isinstance(from_state_id, str) and from_state_id != ANY_SOURCE:
+                self.declared_outgoing.setdefault(from_state_id, []).append(transition)
+                self.declared_incoming.setdefault(to_state_id, []).append(transition)
+
+    def _expand(self, from_state_id: Any) -> List[str]:
+        if isinstance(from_state_id, list):
+            return list(from_state_id)
+        if from_state_id == ANY_SOURCE:
+            return list(self.any_sources)
+        if from_state_id is None:
+            return []
+        return [from_state_id]
+
+    def get_state(self, state_id: str) -> Optional[Dict]:
+        """Get state by its ID."""
+        return self.states.get(state_id)
+
+    def expand_sources(self, transition: Dict[str, Any]) -> List[str]:
+        """Return the concrete source state IDs of a transition."""
+        if self.transitions_by_id.get(transition.get("transitionId")) is transition:
+            return self.transition_sources[transition["transitionId"]]
+        return self._expand(transition.get("fromStateId"))
+
+    def is_decision_point(self, state_id: str) -> bool:
+        """Check if a state declares multiple outgoing transitions of its own."""
+        return len(self.declared_outgoing.get(state_id, ())) > 1
+
+    def find_attached_task(self, error_state_id: str) -> Optional[str]:
+        """Find the state an error boundary event should be attached to."""
+        for transition in self.declared_incoming.get(error_state_id, ()):
+            if transition["fromStateId"] in self.states:
+                return transition["fromStateId"]
+        return None
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+
+import re
+from functools import lru_cache
+from typing import Optional
+
+# ISO 8601 durations as used by retryDelay/timeout, e.g. PT10S, PT1M, P1DT2H.
+DURATION_PATTERN = re.compile(
+    r"^P(?:(?P<weeks>\d+(?:\.\d+)?)W)?(?:(?P<days>\d+(?:\.\d+)?)D)?"
+    r"(?:T(?:(?P<hours>\d+(?:\.\d+)?)H)?(?:(?P<minutes>\d+(?:\.\d+)?)M)?(?:(?P<seconds>\d+(?:\.\d+)?)S)?)?$"
+)
+
+UNIT_SECONDS = {"weeks": 604800, "days": 86400, "hours": 3600, "minutes": 60, "seconds": 1}
+
+
+@lru_cache(maxsize=1024)
+def parse_duration(value: str) -> float:
+    """Parse an ISO 8601 duration (without years/months) into seconds."""
+    match = DURATION_PATTERN.match(value or "")
+    if not match or value in ("P", "PT") or value.endswith("T"):
+        raise ValueError(f"Invalid ISO 8601 duration: {value!r}")
+    return float(sum(float(amount) * UNIT_SECONDS[unit] for unit, amount in match.groupdict().items() if amount))
+
+
+def duration_or_none(value: Optional[str]) -> Optional[float]:
+    """Parse an optional duration field."""
+    return None if value is None else parse_duration(value)
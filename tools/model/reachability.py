@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import sys
+from typing import Dict, Iterable, List, Any, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tools.model.definition_graph import DefinitionGraph
+
+# States an instance may legitimately stop in.
+TERMINAL_STATE_TYPES = ("final", "error")
+
+
+class ReachabilityIndex:
+    """Transitive closure of a definition over interned integer state ids.
+
+    States are numbered in declaration order. Strongly connected components
+    are found with Tarjan's algorithm and each component gets a bitset (a
+    Python int) of the states reachable from it, so the closure costs one
+    OR per condensation edge. Reachability is reflexive: every state reaches
+    itself. List-valued and ``"any"`` sources are expanded.
+
+    :meth:`can_reach` is O(1): the first query for a target builds a
+    per-target byte column from the bitsets, and later queries index it.
+    """
+
+    def __init__(self, definition: Dict[str, Any]):
+        graph = DefinitionGraph(definition)
+        self.state_ids: List[str] = list(graph.state_ids)
+        self.index: Dict[str, int] = {state_id: i for i, state_id in enumerate(self.state_ids)}
+        self.base_types: List[Optional[str]] = [graph.states[s].get("baseStateType") for s in self.state_ids]
+
+        self.successors: List[List[int]] = [[] for _ in self.state_ids]
+        self.self_loops = set()
+        for transition in graph.transitions:
+            target = self.index.get(transition["toStateId"])
+            if target is None:
+                continue
+            for source_id in graph.expand_sources(transition):
+                source = self.index.get(source_id)
+                if source is None:
+                    continue
+                if source == target:
+                    self.self_loops.add(source)
+                elif target not in self.successors[source]:
+                    self.successors[source].append(target)
+
+        self.component_of, self.components = self._strongly_connected_components()
+        self.component_reach = self._close()
+        self.terminal_mask = self._mask(i for i, base in enumerate(self.base_types) if base in TERMINAL_STATE_TYPES)
+        self.initial_mask = self._mask(i for i, base in enumerate(self.base_types) if base == "initial")
+        self._columns: Dict[int, bytearray] = {}
+        self._can_terminate = bytearray(
+            1 if self.component_reach[self.component_of[i]] & self.terminal_mask else 0 for i in range(len(self.state_ids)))
+
+    @staticmethod
+    def _mask(indexes: Iterable[int]) -> int:
+        mask = 0
+        for i in indexes:
+            mask |= 1 << i
+        return mask
+
+    def _strongly_connected_components(self) -> Tuple[List[int], List[List[int]]]:
+        """Iterative Tarjan; components come out in reverse topological order."""
+        count = len(self.state_ids)
+        order = [-1] * count
+        low = [0] * count
+        on_stack = [False] * count
+        component_of = [-1] * count
+        components: List[List[int]] = []
+        stack: List[int] = []
+        counter = 0
+        for root in range(count):
+            if order[root] != -1:
+                continue
+            work = [(root, 0)]
+            while work:
+                node, edge = work.pop()
+                if edge == 0:
+                    order[node] = low[node] = counter
+                    counter += 1
+                    stack.append(node)
+                    on_stack[node] = True
+                successors = self.successors[node]
+                while edge < len(successors):
+                    target = successors[edge]
+                    edge += 1
+                    if order[target] == -1:
+                        work.append((node, edge))
+                        work.append((target, 0))
+                        break
+                    if on_stack[target]:
+                        low[node] = min(low[node], order[target])
+                else:
+                    if low[node] == order[node]:
+                        members = []
+                        while True:
+                            member = stack.pop()
+                            on_stack[member] = False
+                            component_of[member] = len(components)
+                            members.append(member)
+                            if member == node:
+                                break
+                        components.append(members)
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+        return component_of, components
+
+    def _close(self) -> List[int]:
+        reach = []
+        for members in self.components:
+            mask = self._mask(members)
+            for member in members:
+                for target in self.successors[member]:
+                    component = self.component_of[target]
+                    if component != len(reach):
+                        # Successor components were finished earlier (reverse topological order).
+                        mask |= reach[component]
+            reach.append(mask)
+        return reach
+
+    def reachable_mask(self, state_id: str) -> int:
+        """Bitset of the states reachable from ``state_id``, including itself."""
+        return self.component_reach[self.component_of[self.index[state_id]]]
+
+    def reachable_from(self, state_id: str) -> List[str]:
+        mask = self.reachable_mask(state_id)
+        return [s for i, s in enumerate(self.state_ids) if mask >> i & 1]
+
+    def can_reach(self, state_id: str, target_id: str) -> bool:
+        target = self.index[target_id]
+        column = self._columns.get(target)
+        if column is None:
+            bit = 1 << target
+            by_component = [1 if mask & bit else 0 for mask in self.component_reach]
+            column = self._columns[target] = bytearray(by_component[c] for c in self.component_of)
+        return bool(column[self.index[state_id]])
+
+    def can_terminate(self, state_id: str) -> bool:
+        """Whether a final (or error) state is still reachable from ``state_id``."""
+        return bool(self._can_terminate[self.index[state_id]])
+
+    def instance_can_reach(self, instance: Dict[str, Any], target_id: str) -> bool:
+        return self.can_reach(instance["currentState"], target_id)
+
+    def analyze(self) -> Dict[str, Any]:
+        """Static findings: unreachable and trap states, cycles, missing initial/final states."""
+        from_initial = 0
+        for i in range(len(self.state_ids)):
+            if self.initial_mask >> i & 1:
+                from_initial |= self.component_reach[self.component_of[i]]
+
+        unreachable = [s for i, s in enumerate(self.state_ids) if self.initial_mask and not from_initial >> i & 1]
+        traps = [s for i, s in enumerate(self.state_ids)
+                 if not self._can_terminate[i] and self.base_types[i] not in TERMINAL_STATE_TYPES]
+        dead_ends = [s for i, s in enumerate(self.state_ids)
+                     if not self.successors[i] and i not in self.self_loops
+                     and self.base_types[i] not in TERMINAL_STATE_TYPES]
+        cycles = [sorted((self.state_ids[m] for m in members), key=self.index.get)
+                  for members in reversed(self.components)
+                  if len(members) > 1 or members[0] in self.self_loops]
+        return {
+            "states": len(self.state_ids),
+            "missingInitial": not self.initial_mask,
+            "missingFinal": not any(base == "final" for base in self.base_types),
+            "unreachable": unreachable,
+            "traps": traps,
+            "deadEnds": dead_ends,
+            "cycles": cycles,
+        }
+
+
+_index_cache: Dict[Tuple[str, Any], ReachabilityIndex] = {}
+
+
+def get_index(definition: Dict[str, Any]) -> ReachabilityIndex:
+    """Return the reachability index for a definition, building it once per version."""
+    key = (definition["stateMachineId"], definition.get("version"))
+    index = _index_cache.get(key)
+    if index is None:
+        index = _index_cache[key] = ReachabilityIndex(definition)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Static reachability analysis of a state machine definition')
+    parser.add_argument('definition_file', help='State machine definition JSON file')
+    parser.add_argument('--instance', action='append', default=[],
+                        help='Instance JSON file to check; may be repeated')
+    parser.add_argument('--target', default=None, help='With --instance: state that must stay reachable')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    args = parser.parse_args()
+
+    with open(args.definition_file, 'r') as f:
+        definition = json.load(f)
+    index = get_index(definition)
+    report = index.analyze()
+
+    for path in args.instance:
+        with open(path, 'r') as f:
+            instance = json.load(f)
+        state_id = instance.get("currentState")
+        if state_id not in index.index:
+            reachable = None
+        elif args.target:
+            reachable = index.instance_can_reach(instance, args.target)
+        else:
+            reachable = index.can_terminate(state_id)
+        report.setdefault("instances", []).append({"file": path, "currentState": state_id, "canFinish": reachable})
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['states']} states")
+        if report["missingInitial"]:
+            print("No initial state")
+        if report["missingFinal"]:
+            print("No final state")
+        for key, label in (("unreachable", "Unreachable"), ("traps", "Cannot reach a final state"),
+                           ("deadEnds", "No outgoing transitions")):
+            if report[key]:
+                print(f"{label}: {', '.join(report[key])}")
+        for cycle in report["cycles"]:
+            print(f"Cycle: {' -> '.join(cycle)}")
+        for result in report.get("instances", []):
+            status = "unknown state" if result["canFinish"] is None else (
+                "can finish" if result["canFinish"] else "cannot finish")
+            target = f" ({args.target})" if args.target else ""
+            print(f"{result['file']}: {result['currentState']}: {status}{target}")
+
+    problems = report["missingInitial"] or report["missingFinal"] or report["unreachable"] or report["traps"]
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import sys
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+# Keys are spread over a power-of-two number of dict buckets by hash; the map
+# widens once buckets average more than GROW_LOAD keys.
+BUCKET_LOAD = 8
+GROW_LOAD = 16
+
+# Views of at most this many keys stay plain dicts: copying one is cheaper than touching a trie.
+SMALL_MAP = 32
+
+_MISSING = object()
+
+
+def _width_for(size: int) -> int:
+    width = 1
+    while width * BUCKET_LOAD < size:
+        width *= 2
+    return width
+
+
+class PersistentMap(Mapping):
+    """Immutable mapping whose updates share structure with the original.
+
+    A one-level hash trie: keys live in ``2**k`` plain dict buckets chosen by
+    hash. :meth:`update` copies the bucket tuple and only the buckets it
+    touches (around ``BUCKET_LOAD`` keys each), so every historical version
+    can be kept for little more than its changes, and both copying and
+    lookups run at dict speed. Nested dicts and lists are copied on the way
+    in, so later changes to the caller's objects never leak into a stored
+    version; values handed out are shared, so treat them as immutable.
+    """
+
+    __slots__ = ("_buckets", "_mask", "_size")
+
+    def __init__(self, items: Any = None):
+        self._fill({key: _owned(value) for key, value in dict(items or ()).items()})
+
+    def _fill(self, data: Dict[Any, Any]):
+        self._size = len(data)
+        self._mask = _width_for(self._size) - 1
+        if not self._mask:
+            self._buckets = (data,)
+        else:
+            buckets = [{} for _ in range(self._mask + 1)]
+            for key, value in data.items():
+                buckets[hash(key) & self._mask][key] = value
+            self._buckets = tuple(buckets)
+
+    @classmethod
+    def _from_owned(cls, data: Dict[Any, Any]) -> "PersistentMap":
+        instance = cls.__new__(cls)
+        instance._fill(data)
+        return instance
+
+    @classmethod
+    def _make(cls, buckets: tuple, mask: int, size: int) -> "PersistentMap":
+        if size > (mask + 1) * GROW_LOAD:
+            return cls._from_owned({key: value for bucket in buckets for key, value in bucket.items()})
+        instance = cls.__new__(cls)
+        instance._buckets = buckets
+        instance._mask = mask
+        instance._size = size
+        return instance
+
+    def __getitem__(self, key):
+        return self._buckets[hash(key) & self._mask][key]
+
+    def get(self, key, default=None):
+        return self._buckets[hash(key) & self._mask].get(key, default)
+
+    def __contains__(self, key) -> bool:
+        return key in self._buckets[hash(key) & self._mask]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator:
+        for bucket in self._buckets:
+            yield from bucket
+
+    def pairs(self) -> Iterator[Tuple[Any, Any]]:
+        for bucket in self._buckets:
+            yield from bucket.items()
+
+    def to_dict(self) -> Dict[Any, Any]:
+        if not self._mask:
+            return dict(self._buckets[0])
+        merged = {}
+        for bucket in self._buckets:
+            merged.update(bucket)
+        return merged
+
+    def set(self, key, value) -> "PersistentMap":
+        return self.merge({key: value})[0]
+
+    def update(self, changes: Any) -> "PersistentMap":
+        """New map with every pair of ``changes`` (a mapping or pairs) set."""
+        return self.merge(changes if isinstance(changes, Mapping) else dict(changes))[0]
+
+    def merge(self, changes: Mapping) -> Tuple["PersistentMap", Dict[Any, Any]]:
+        """New map with ``changes`` set, and the part of ``changes`` that differed.
+
+        Values equal to the current ones (see :func:`same_value`) are left
+        in place, so an unchanged key costs no copy.
+        """
+        buckets, mask = self._buckets, self._mask
+        if not mask:
+            bucket = buckets[0]
+            delta = _changes(bucket, changes)
+            if not delta:
+                return self, delta
+            merged = dict(bucket)
+            merged.update(delta)
+            return self._make((merged,), 0, len(merged)), delta
+
+        delta, copied, size = {}, {}, self._size
+        for key, value in changes.items():
+            index = hash(key) & mask
+            current = buckets[index].get(key, _MISSING)
+            if same_value(current, value):
+                continue
+            bucket = copied.get(index)
+            if bucket is None:
+                bucket = copied[index] = dict(buckets[index])
+            bucket[key] = delta[key] = _owned(value)
+            size += current is _MISSING
+        if not delta:
+            return self, delta
+        replaced = list(buckets)
+        for index, bucket in copied.items():
+            replaced[index] = bucket
+        return self._make(tuple(replaced), mask, size), delta
+
+    def discard(self, key) -> "PersistentMap":
+        """New map without ``key``; the same map if it was absent."""
+        index = hash(key) & self._mask
+        if key not in self._buckets[index]:
+            return self
+        bucket = dict(self._buckets[index])
+        del bucket[key]
+        buckets = list(self._buckets)
+        buckets[index] = bucket
+        return self._make(tuple(buckets), self._mask, self._size - 1)
+
+    def __repr__(self) -> str:
+        return f"PersistentMap({self.to_dict()!r})"
+
+
+def _owned(value: Any) -> Any:
+    """A copy of nested containers, so a stored view cannot change under the caller's mutations."""
+    kind = type(value)
+    if kind is dict:
+        return {key: _owned(item) for key, item in value.items()}
+    if kind is list:
+        return [_owned(item) for item in value]
+    return value
+
+
+_CONTAINERS = (dict, list)
+
+
+def _changes(current: Mapping, changes: Mapping) -> Dict[Any, Any]:
+    """The pairs of ``changes`` that differ from ``current`` (see :func:`same_value`), nested containers copied."""
+    get = current.get
+    delta = {key: value for key, value in changes.items()
+             if (existing := get(key, _MISSING)) is not value
+             and (type(existing) is not type(value) or existing != value
+                  or (type(value) in _CONTAINERS and not same_value(existing, value)))}
+    for key, value in delta.items():
+        if type(value) in _CONTAINERS:
+            delta[key] = _owned(value)
+    return delta
+
+
+def same_value(left: Any, right: Any) -> bool:
+    """JSON-aware equality: ``1``, ``1.0`` and ``True`` are different values, at any depth."""
+    kind = type(left)
+    if kind is not type(right):
+        return False
+    if left is right:
+        return True
+    if kind is dict:
+        if len(left) != len(right) or left != right:
+            return False
+        for key, value in left.items():
+            other = right[key]
+            if other is not value and (type(other) in _CONTAINERS or type(other) is not type(value)) \
+                    and not same_value(value, other):
+                return False
+        return True
+    if kind is list:
+        if len(left) != len(right) or left != right:
+            return False
+        for value, other in zip(left, right):
+            if other is not value and (type(other) in _CONTAINERS or type(other) is not type(value)) \
+                    and not same_value(value, other):
+                return False
+        return True
+    return left == right
+
+
+def new_view(data: Optional[Mapping] = None, shared: bool = True) -> Mapping:
+    """An immutable view of ``data``: a plain dict when small (or not ``shared``), a :class:`PersistentMap` otherwise."""
+    owned = dict(data or {})
+    for key, value in owned.items():
+        if type(value) in _CONTAINERS:
+            owned[key] = _owned(value)
+    return owned if len(owned) <= SMALL_MAP or not shared else PersistentMap._from_owned(owned)
+
+
+def _grown(merged: Dict[Any, Any]) -> Mapping:
+    return merged if len(merged) <= SMALL_MAP else PersistentMap._from_owned(merged)
+
+
+def merge_view(view: Mapping, changes: Mapping) -> Tuple[Mapping, Dict[Any, Any]]:
+    """New view with ``changes`` set, and the part of ``changes`` that differed (see :meth:`PersistentMap.merge`)."""
+    if isinstance(view, PersistentMap):
+        return view.merge(changes)
+    delta = _changes(view, changes)
+    if not delta:
+        return view, delta
+    merged = dict(view)
+    merged.update(delta)
+    return _grown(merged), delta
+
+
+def discard_keys(view: Mapping, keys: Iterable[Any]) -> Mapping:
+    """New view without ``keys``."""
+    keys = [key for key in keys if key in view]
+    if not keys:
+        return view
+    if isinstance(view, PersistentMap):
+        for key in keys:
+            view = view.discard(key)
+        return view
+    return {key: value for key, value in view.items() if key not in keys}
+
+
+def replace_view(view: Mapping, data: Mapping, shared: bool = True) -> Tuple[Mapping, Dict[Any, Any], List[Any]]:
+    """New view holding exactly ``data``, with what it sets and which keys of ``view`` it drops.
+
+    With ``shared=False`` the view is always a plain dict, for callers that
+    keep only the latest version and so gain nothing from sharing.
+    """
+    if isinstance(view, dict) and not (view.keys() - data.keys()):
+        removed = []
+    else:
+        removed = [key for key in view if key not in data]
+    if shared:
+        view, delta = merge_view(view, data)
+        return discard_keys(view, removed), delta, removed
+    delta = _changes(view, data)
+    view = dict(view)
+    for key in removed:
+        del view[key]
+    view.update(delta)
+    return view, delta, removed
+
+
+def apply_delta(base: Mapping, changes: Mapping, removed: Iterable[Any] = ()) -> Dict[str, Any]:
+    """Plain dict of ``base`` with ``removed`` keys dropped and ``changes`` set; the inverse of :func:`replace_view`."""
+    removed = set(removed)
+    data = {key: _owned(value) for key, value in base.items() if key not in removed}
+    data.update(changes)
+    return data
+
+
+class DataHistory:
+    """Consolidated data after each visit of an instance, as deltas over persistent views.
+
+    Visit ``i`` stores only the keys whose values differ from the view
+    before it (plus keys it removed); :meth:`view` returns the full view
+    after any visit in O(1). Views of up to ``SMALL_MAP`` keys are plain
+    dict copies, larger ones share structure with their neighbours.
+    """
+
+    def __init__(self, base: Optional[Dict[str, Any]] = None):
+        self.base = new_view(base)
+        self.states: List[str] = []
+        self.deltas: List[Dict[str, Any]] = []
+        self.removals: List[Tuple[str, ...]] = []
+        self.views: List[Mapping] = []
+
+    @property
+    def current(self) -> Mapping:
+        return self.views[-1] if self.views else self.base
+
+    def __len__(self) -> int:
+        return len(self.views)
+
+    def record(self, state_id: str, data: Dict[str, Any], removed: Iterable[str] = ()) -> Mapping:
+        """Add a visit whose data is merged over the current view; returns the new view."""
+        view, delta = merge_view(self.current, data)
+        gone = tuple(key for key in removed if key in view and key not in delta) if removed else ()
+        view = discard_keys(view, gone)
+        self.states.append(state_id)
+        self.deltas.append(delta)
+        self.removals.append(gone)
+        self.views.append(view)
+        return view
+
+    def view(self, index: int) -> Mapping:
+        """Consolidated data as it was after visit ``index``."""
+        return self.views[index]
+
+    def delta(self, index: int) -> Dict[str, Any]:
+        """What visit ``index`` changed."""
+        return self.deltas[index]
+
+    def to_json(self) -> Dict[str, Any]:
+        visits = []
+        for state_id, delta, gone in zip(self.states, self.deltas, self.removals):
+            visit = {"stateId": state_id, "set": delta}
+            if gone:
+                visit["unset"] = list(gone)
+            visits.append(visit)
+        return {"base": dict(self.base), "visits": visits}
+
+    @classmethod
+    def from_json(cls, document: Dict[str, Any]) -> "DataHistory":
+        history = cls(document.get("base"))
+        for visit in document.get("visits", []):
+            history.record(visit["stateId"], visit.get("set", {}), visit.get("unset", ()))
+        return history
+
+    @classmethod
+    def from_state_data(cls, documents: Iterable[Dict[str, Any]]) -> "DataHistory":
+        """Build from state-data documents (``stateId`` and full ``data``) in visit order."""
+        history = cls()
+        for document in documents:
+            history.record(document["stateId"], document.get("data", {}))
+        return history
+
+
+def main():
+    from tools.storage.migrate_instances import resolve_data_ref
+
+    parser = argparse.ArgumentParser(description='Delta-encode the state data of an instance')
+    parser.add_argument('instance_file', help='Instance JSON file whose stateHistory has dataRef entries')
+    parser.add_argument('--base-dir', action='append', default=[],
+                        help='Directory dataRef paths are relative to (default: current directory)')
+    parser.add_argument('--output', default=None, help='Write the delta-encoded history to this file')
+
+    args = parser.parse_args()
+
+    with open(args.instance_file, 'r') as f:
+        instance = json.load(f)
+    documents, full_bytes = [], 0
+    for entry in instance.get("stateHistory", []):
+        path = entry.get("dataRef") and resolve_data_ref(entry["dataRef"], args.instance_file,
+                                                        args.base_dir or [os.getcwd()])
+        if not path:
+            continue
+        with open(path, 'r') as f:
+            document = json.load(f)
+        documents.append(document)
+        full_bytes += len(json.dumps(document.get("data", {}), separators=(",", ":")))
+
+    history = DataHistory.from_state_data(documents)
+    encoded = json.dumps(history.to_json(), separators=(",", ":"))
+    print(f"{len(documents)} state data file(s): {full_bytes} bytes of data as full copies, "
+          f"{len(encoded)} bytes as deltas")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(history.to_json(), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Any, Optional, Tuple
+
+from tools.model.durations import duration_or_none
+from tools.runtime.delivery import DeliveryPipeline
+from tools.runtime.instrumentation import Instrumentation
+from tools.runtime.http_client import HTTPClient, HTTPError
+from tools.runtime.payload_templates import PayloadTemplate, compile_payloads
+from tools.runtime.timing_wheel import TimerScheduler
+
+logger = logging.getLogger(__name__)
+
+# What to do after an error or a timeout; see globalErrorHandler in the README.
+RETRYING_STRATEGIES = ("retry",)
+PROCEEDING_STRATEGIES = ("proceed", "ignore")
+NOTIFYING_STRATEGIES = ("notify", "escalate")
+
+ActionHandler = Callable[[Dict[str, Any], Dict[str, Any]], Awaitable[Any]]
+
+
+def utc_timestamp() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class WebhookFailure(Exception):
+    """A webhook answered, but not with a success status."""
+
+    def __init__(self, status_line: str):
+        super().__init__(status_line)
+        self.status_line = status_line
+
+
+class ActionExecutor:
+    """Runs entry/exit actions of a definition on asyncio.
+
+    Webhook triggers and callbacks go through a pooled keep-alive
+    :class:`HTTPClient`. ``max_concurrency`` bounds the actions in flight
+    overall and ``max_per_host`` the requests in flight to any single host.
+    Retries wait with ``asyncio.sleep`` (``retryDelay`` growing by ``backoff``
+    per attempt), so a waiting action never holds a thread or a connection.
+    With a running :class:`TimerScheduler`, retry delays and timeouts become
+    timing-wheel entries instead of one event-loop timer per action.
+    With a :class:`DeliveryPipeline`, callbacks and notifications are
+    queued to it and posted in batches instead of one request each;
+    :meth:`close` flushes it, but closing it is left to its owner. A
+    ``client`` passed in is likewise not closed.
+    With an :class:`Instrumentation`, attempt outcomes, retries and
+    (sampled) action latency are recorded per action.
+
+    ``timeout`` applies to each attempt; what happens next follows the
+    action's ``onTimeout``/``onError``, falling back to ``globalErrorHandler``.
+    Results are dictionaries shaped like the ``actions`` entries of a
+    state-data file.
+    """
+
+    def __init__(self, definition: Dict[str, Any], max_concurrency: int = 256, max_per_host: int = 16,
+                 backoff: float = 2.0, max_retry_delay: Optional[float] = None,
+                 handlers: Optional[Dict[str, ActionHandler]] = None, client: Optional[HTTPClient] = None,
+                 scheduler: Optional[TimerScheduler] = None, delivery: Optional[DeliveryPipeline] = None,
+                 metrics: Optional[Instrumentation] = None):
+        self.definition = definition
+        self.states = {state["stateId"]: state for state in definition.get("states", [])}
+        self.global_callback = (definition.get("globalCallbackHandler") or {}).get("webhook")
+        self.global_error_handler = definition.get("globalErrorHandler") or {}
+        self.backoff = backoff
+        self.max_retry_delay = max_retry_delay
+        self.handlers = handlers or {}
+        self.payloads = compile_payloads(definition)
+        self.client = client or HTTPClient(max_per_host=max_per_host)
+        self._owns_client = client is None
+        self._limit = asyncio.Semaphore(max_concurrency)
+        self._sleep = scheduler.sleep if scheduler is not None else asyncio.sleep
+        self._wait_for = scheduler.wait_for if scheduler is not None else asyncio.wait_for
+        self.delivery = delivery
+        self.metrics = metrics
+        # Actions of self.definition, which stay alive, by id(): an action id may repeat across states.
+        self._metric_labels: Dict[int, Tuple[Dict[str, Any], tuple]] = {
+            id(action): (action, self._action_labels(state_id, action))
+            for state_id, state in self.states.items() for kind in ("entryActions", "exitActions")
+            for action in state.get(kind, [])} if metrics is not None else {}
+
+    def strategy(self, action: Dict[str, Any], kind: str) -> Optional[str]:
+        """Resolve onError/onTimeout for an action, falling back to the global handler."""
+        return action.get(kind) or self.global_error_handler.get(kind)
+
+    async def run_entry_actions(self, state_id: str, data: Dict[str, Any],
+                                instance_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        return await self.run_actions(self.states[state_id].get("entryActions", []), data, instance_id)
+
+    async def run_exit_actions(self, state_id: str, data: Dict[str, Any],
+                               instance_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        return await self.run_actions(self.states[state_id].get("exitActions", []), data, instance_id)
+
+    async def run_actions(self, actions: List[Dict[str, Any]], data: Dict[str, Any],
+                          instance_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Run actions in declaration order, stopping after an aborted one."""
+        results = []
+        for action in actions:
+            result = await self.run_action(action, data, instance_id)
+            results.append(result)
+            if result["status"] == "aborted":
+                break
+        return results
+
+    async def run_action(self, action: Dict[str, Any], data: Dict[str, Any],
+                         instance_id: Optional[str] = None) -> Dict[str, Any]:
+        async with self._limit:
+            return await self._run(action, data, instance_id)
+
+    async def _run(self, action: Dict[str, Any], data: Dict[str, Any], instance_id: Optional[str]) -> Dict[str, Any]:
+        result = {"actionId": action.get("actionId"), "startedAt": utc_timestamp()}
+        webhook = (action.get("trigger") or {}).get("webhook")
+        handler = self.handlers.get(action.get("type"))
+        if webhook is None and handler is None:
+            result.update(status="skipped", completedAt=utc_timestamp())
+            return result
+
+        labels = self._labels(action) if self.metrics is not None else None
+        started = time.perf_counter() if labels is not None and self.metrics.sampled() else None
+        attempts = 1 + int(action.get("retryCount", 0) or 0)
+        retry_delay = duration_or_none(action.get("retryDelay")) or 0.0
+        timeout = duration_or_none(action.get("timeout"))
+
+        attempt = 0
+        while True:
+            attempt += 1
+            outcome, strategy, detail = "completed", None, None
+            try:
+                call = self._call_webhook(webhook, data) if webhook is not None else handler(action, data)
+                value = await self._wait_for(call, timeout) if timeout else await call
+            except asyncio.TimeoutError:
+                outcome, strategy, detail = "timedOut", self.strategy(action, "onTimeout"), f"no response within {timeout}s"
+            except (WebhookFailure, HTTPError, OSError) as e:
+                outcome, strategy, detail = "failed", self.strategy(action, "onError"), str(e)
+            if labels is not None:
+                self.metrics.action_attempt(labels, outcome)
+
+            if outcome == "completed":
+                result.update(status="completed", result=value)
+                break
+            if strategy in RETRYING_STRATEGIES and attempt < attempts:
+                delay = retry_delay * (self.backoff ** (attempt - 1))
+                if self.max_retry_delay is not None:
+                    delay = min(delay, self.max_retry_delay)
+                await self._sleep(delay)
+                continue
+
+            result["error"] = detail
+            if strategy == "abort":
+                result["status"] = "aborted"
+            elif strategy in PROCEEDING_STRATEGIES:
+                result["status"] = "proceeded"
+            else:
+                result["status"] = outcome
+            if strategy in NOTIFYING_STRATEGIES:
+                await self._notify(action, result, instance_id, strategy)
+            break
+
+        result["attempts"] = attempt
+        result["completedAt"] = utc_timestamp()
+        if labels is not None:
+            self.metrics.action_finished(labels, None if started is None else time.perf_counter() - started, attempt)
+        if result["status"] == "completed":
+            await self._callback(action, result, instance_id)
+        return result
+
+    def _action_labels(self, state_id: str, action: Dict[str, Any]) -> tuple:
+        return (("stateMachineId", self.definition.get("stateMachineId", "")), ("stateId", state_id),
+                ("actionId", action.get("actionId") or ""))
+
+    def _labels(self, action: Dict[str, Any]) -> tuple:
+        entry = self._metric_labels.get(id(action))
+        if entry is not None and entry[0] is action:
+            return entry[1]
+        # Not an action of this definition's states, so it has no state to report.
+        return self._action_labels("", action)
+
+    async def _call_webhook(self, webhook: Dict[str, Any], data: Dict[str, Any]) -> Any:
+        body = None
+        if "payload" in webhook:
+            # The compiled templates belong to webhooks of self.definition, which stay alive;
+            # a template whose payload is not this webhook's means another dict reused the id.
+            template = self.payloads.get(id(webhook))
+            if template is None or template.template is not webhook["payload"]:
+                template = PayloadTemplate(webhook["payload"])
+            body = template.render(data)
+        response = await self.client.request(webhook.get("method", "POST"), webhook["url"], body,
+                                             {"Content-Type": "application/json"} if body is not None else None)
+        if not 200 <= response.status < 300:
+            raise WebhookFailure(response.status_line)
+        try:
+            return response.json()
+        except ValueError:
+            return response.body.decode("utf-8", "replace")
+
+    async def _post(self, webhook: Dict[str, Any], message: Dict[str, Any]) -> bool:
+        response = await self.client.request(webhook.get("method", "POST"), webhook["url"],
+                                             json.dumps(message).encode("utf-8"),
+                                             {"Content-Type": "application/json"})
+        expected = webhook.get("expectedResponse")
+        return response.status_line == expected if expected else 200 <= response.status < 300
+
+    async def _callback(self, action: Dict[str, Any], result: Dict[str, Any], instance_id: Optional[str]):
+        """Deliver a completed action to its callback, or to the global callback handler."""
+        webhook = (action.get("callback") or {}).get("webhook") or self.global_callback
+        if webhook is None:
+            return
+        message = {"instanceId": instance_id, "actionId": result["actionId"], "status": result["status"],
+                   "result": result.get("result")}
+        if self.delivery is not None:
+            await self.delivery.webhook(webhook).put(instance_id, message)
+            return
+        try:
+            if not await self._post(webhook, message):
+                logger.warning("Callback for action %s was not acknowledged", result["actionId"])
+        except (HTTPError, OSError, asyncio.TimeoutError) as e:
+            logger.warning("Callback for action %s failed: %s", result["actionId"], e)
+
+    async def _notify(self, action: Dict[str, Any], result: Dict[str, Any], instance_id: Optional[str], strategy: str):
+        if self.global_callback is None:
+            logger.warning("Action %s %s (%s) and no global callback is configured",
+                           result["actionId"], result["status"], strategy)
+            return
+        message = {"instanceId": instance_id, "actionId": result["actionId"], "status": result["status"],
+                   "strategy": strategy, "error": result.get("error")}
+        if self.delivery is not None:
+            await self.delivery.webhook(self.global_callback).put(instance_id, message)
+            return
+        try:
+            await self._post(self.global_callback, message)
+        except (HTTPError, OSError, asyncio.TimeoutError) as e:
+            logger.warning("Notification for action %s failed: %s", result["actionId"], e)
+
+    async def close(self):
+        """Deliver queued callbacks and close the connections this executor opened."""
+        if self.delivery is not None:
+            await self.delivery.flush()
+        if self._owns_client:
+            await self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
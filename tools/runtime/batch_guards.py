@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+from tools.runtime.conditions import compile_condition, parse_condition, resolve_path
+from tools.runtime.engine import AUTOMATIC, StateMachineEngine
+
+SWAPPED_OPERATORS = {"<": ">", "<=": ">=", ">": "<", ">=": "<=", "===": "===", "!==": "!==", "==": "==", "!=": "!="}
+
+
+class NotVectorizable(Exception):
+    """Raised for condition constructs that have no columnar form."""
+
+
+class Column:
+    """Typed views over one ``data.*`` path across a batch of records.
+
+    ``numbers`` holds numeric (and boolean) values with NaN elsewhere, and
+    ``strings`` holds string values with an empty string elsewhere; the masks
+    say which records actually carry a value of each kind.
+    """
+
+    __slots__ = ("numbers", "strings", "string_mask", "true_mask", "false_mask", "none_mask")
+
+    def __init__(self, values: Sequence[Any]):
+        if isinstance(values, np.ndarray) and values.dtype.kind in "biufU":
+            self._from_typed_array(values)
+            return
+        count = len(values)
+        objects = np.fromiter(values, dtype=object, count=count)
+        kinds = np.fromiter(map(type, values), dtype=object, count=count)
+        bool_mask = kinds == bool
+        self.true_mask = np.zeros(count, dtype=bool)
+        self.true_mask[bool_mask] = objects[bool_mask].astype(bool)
+        self.false_mask = bool_mask & ~self.true_mask
+        self.none_mask = kinds == type(None)
+        self.string_mask = kinds == str
+        numeric_mask = (kinds == int) | (kinds == float) | bool_mask
+        self.numbers = np.full(count, np.nan)
+        self.numbers[numeric_mask] = objects[numeric_mask].astype(float)
+        self.strings = np.where(self.string_mask, objects, "")
+
+    def _from_typed_array(self, values: np.ndarray):
+        count = len(values)
+        self.none_mask = np.zeros(count, dtype=bool)
+        if values.dtype.kind == "U":
+            self.strings = values.astype(object)
+            self.string_mask = np.ones(count, dtype=bool)
+            self.numbers = np.full(count, np.nan)
+            self.true_mask = np.zeros(count, dtype=bool)
+            self.false_mask = np.zeros(count, dtype=bool)
+            return
+        self.strings = np.full(count, "", dtype=object)
+        self.string_mask = np.zeros(count, dtype=bool)
+        self.numbers = values.astype(float)
+        if values.dtype.kind == "b":
+            self.true_mask = values.copy()
+            self.false_mask = ~values
+        else:
+            self.true_mask = np.zeros(count, dtype=bool)
+            self.false_mask = np.zeros(count, dtype=bool)
+            # NaN marks a missing value in a float column
+            self.none_mask = np.isnan(self.numbers)
+
+    @property
+    def bool_mask(self) -> np.ndarray:
+        return self.true_mask | self.false_mask
+
+
+class ColumnarBatch:
+    """A batch of ``consolidatedData`` records with columns built on demand.
+
+    A batch can also be created from already columnar data with
+    :meth:`from_columns`, e.g. ``{"amount": float64 array, "verificationStatus":
+    str array}``, in which case no per-record work is done for those fields.
+    """
+
+    def __init__(self, records: Optional[Sequence[Dict[str, Any]]] = None,
+                 columns: Optional[Dict[str, np.ndarray]] = None):
+        self.columns: Dict[Tuple[str, ...], Column] = {}
+        self.arrays = columns or {}
+        for key, values in self.arrays.items():
+            self.columns[(key,)] = Column(values)
+        if records is not None:
+            self.size = len(records)
+        else:
+            self.size = len(next(iter(self.arrays.values()))) if self.arrays else 0
+        self._records = records
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray]) -> "ColumnarBatch":
+        return cls(columns=columns)
+
+    @property
+    def records(self) -> Sequence[Dict[str, Any]]:
+        """Per-record view, materialised from the columns when the batch has none."""
+        if self._records is None:
+            keys = list(self.arrays)
+            arrays = [self.arrays[key].tolist() for key in keys]
+            self._records = [dict(zip(keys, row)) for row in zip(*arrays)]
+        return self._records
+
+    def column(self, keys: Sequence[str]) -> Column:
+        keys = tuple(keys)
+        column = self.columns.get(keys)
+        if column is None:
+            if len(keys) == 1:
+                key = keys[0]
+                values = [record.get(key) for record in self.records]
+            else:
+                values = [resolve_path(record, keys) for record in self.records]
+            column = self.columns[keys] = Column(values)
+        return column
+
+
+def _compare(column: Column, operator: str, value: Any) -> np.ndarray:
+    if isinstance(value, bool):
+        mask = column.true_mask if value else column.false_mask
+        if operator == "===":
+            return mask
+        if operator == "!==":
+            return ~mask
+        raise NotVectorizable(operator)
+    if value is None:
+        if operator in ("===", "=="):
+            return column.none_mask
+        if operator in ("!==", "!="):
+            return ~column.none_mask
+        return np.zeros(len(column.none_mask), dtype=bool)
+    if isinstance(value, str):
+        if operator in ("===", "=="):
+            return column.string_mask & (column.strings == value)
+        if operator in ("!==", "!="):
+            return ~(column.string_mask & (column.strings == value))
+        raise NotVectorizable(operator)
+    if isinstance(value, (int, float)):
+        numbers = column.numbers
+        with np.errstate(invalid="ignore"):
+            if operator == "===":
+                return (numbers == value) & ~column.bool_mask
+            if operator == "!==":
+                return ~((numbers == value) & ~column.bool_mask)
+            if operator == "<":
+                return numbers < value
+            if operator == "<=":
+                return numbers <= value
+            if operator == ">":
+                return numbers > value
+            if operator == ">=":
+                return numbers >= value
+    raise NotVectorizable(operator)
+
+
+def _vectorize(node, batch: ColumnarBatch) -> np.ndarray:
+    kind = node[0]
+    if kind == "const":
+        return np.full(batch.size, bool(node[1]))
+    if kind == "not":
+        return ~_vectorize(node[1], batch)
+    if kind == "and":
+        return _vectorize(node[1], batch) & _vectorize(node[2], batch)
+    if kind == "or":
+        return _vectorize(node[1], batch) | _vectorize(node[2], batch)
+    if kind == "path":
+        raise NotVectorizable("truthiness of a data path")
+
+    left, right = node[1], node[2]
+    if left[0] == "path" and right[0] == "const":
+        return _compare(batch.column(left[1]), kind, right[1])
+    if left[0] == "const" and right[0] == "path":
+        return _compare(batch.column(right[1]), SWAPPED_OPERATORS[kind], left[1])
+    raise NotVectorizable("comparison between two data paths")
+
+
+def evaluate_guard_batch(condition: Optional[str], batch: ColumnarBatch) -> np.ndarray:
+    """Evaluate one condition over a batch, returning a boolean mask.
+
+    Conditions that cannot be expressed on columns fall back to the compiled
+    per-record guard.
+    """
+    if condition is None or condition.strip() == "true":
+        return np.ones(batch.size, dtype=bool)
+    try:
+        return _vectorize(parse_condition(condition), batch)
+    except NotVectorizable:
+        guard = compile_condition(condition)
+        return np.fromiter((guard(record) for record in batch.records), dtype=bool, count=batch.size)
+
+
+class BatchGuardEvaluator:
+    """Chooses the enabled transition for many instances in the same state at once."""
+
+    def __init__(self, engine: StateMachineEngine):
+        self.engine = engine
+
+    def select(self, state_id: str, records: Sequence[Dict[str, Any]],
+               event_id: Optional[str] = AUTOMATIC) -> np.ndarray:
+        """Return the chosen ``transitionId`` per record, or None where no guard holds.
+
+        ``records`` are the instances' ``consolidatedData`` dicts. Candidates
+        are tried in definition order, matching :meth:`StateMachineEngine.select`.
+        """
+        batch = records if isinstance(records, ColumnarBatch) else ColumnarBatch(records)
+        candidates = self.engine.candidates(state_id, event_id)
+        chosen = np.full(batch.size, -1, dtype=np.int32)
+        for index, candidate in enumerate(candidates):
+            undecided = chosen == -1
+            if not undecided.any():
+                break
+            chosen[undecided & evaluate_guard_batch(candidate.condition, batch)] = index
+
+        transition_ids = np.array([candidate.transition_id for candidate in candidates] + [None], dtype=object)
+        return transition_ids[chosen]
+
+    def select_instances(self, instances: List[Dict[str, Any]],
+                         event_id: Optional[str] = AUTOMATIC) -> Dict[str, np.ndarray]:
+        """Group instances by ``currentState`` and select transitions per group.
+
+        Returns a mapping of stateId to the chosen transition IDs, in the order
+        the instances of that state appear in ``instances``.
+        """
+        by_state: Dict[str, List[Dict[str, Any]]] = {}
+        for instance in instances:
+            by_state.setdefault(instance["currentState"], []).append(instance.get("consolidatedData", {}))
+        return {state_id: self.select(state_id, records, event_id) for state_id, records in by_state.items()}
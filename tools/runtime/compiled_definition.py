@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+
+import argparse
+import contextlib
+import gc
+import glob
+import hashlib
+import json
+import marshal
+import mmap
+import os
+import struct
+import sys
+from typing import Dict, Any, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tools.batch.batch_runner import DEFAULT_CACHE_DIR, tool_version
+from tools.model import definition_graph
+from tools.model.definition_graph import DefinitionGraph
+from tools.runtime import conditions as conditions_module, engine as engine_module
+from tools.runtime.conditions import ConditionSyntaxError, parse_condition, preload_conditions
+from tools.runtime.engine import StateMachineEngine, plan_dispatch
+
+# Artifact layout: magic, artifact format, marshal format, fingerprint of the compiling code,
+# then the marshalled payload.
+ARTIFACT_MAGIC = b"FSMC"
+ARTIFACT_FORMAT = 2
+ARTIFACT_HEADER = struct.Struct("<4sII16s")
+ARTIFACT_SUFFIX = ".fsmc"
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()[:16]
+
+
+_code_version: Optional[bytes] = None
+
+
+def get_code_version() -> bytes:
+    """Fingerprint of the modules whose data layout an artifact stores, so upgrades invalidate old artifacts."""
+    global _code_version
+    if _code_version is None:
+        _code_version = tool_version(__file__, definition_graph.__file__, conditions_module.__file__,
+                                     engine_module.__file__).encode("ascii")
+    return _code_version
+
+
+@contextlib.contextmanager
+def gc_paused():
+    """Loading creates many long-lived containers at once; collection passes meanwhile find nothing to free."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class CompiledDefinition:
+    """A definition together with the work its consumers would otherwise redo at startup.
+
+    Holds the parsed definition, the engine's dispatch plan (transition
+    sources already expanded) and the parsed syntax tree of every transition
+    condition. Everything is plain data so it can be stored with ``marshal``.
+    """
+
+    def __init__(self, payload: Dict[str, Any]):
+        self.state_machine_id = payload["stateMachineId"]
+        self.version = payload["version"]
+        self.hash = payload["hash"]
+        self.definition: Dict[str, Any] = payload["definition"]
+        self.dispatch_plan = payload["dispatch"]
+        self.conditions: Dict[str, Any] = payload["conditions"]
+
+    @classmethod
+    def compile(cls, definition: Dict[str, Any], digest: str) -> "CompiledDefinition":
+        graph = DefinitionGraph(definition)
+        conditions = {}
+        for transition in graph.transitions:
+            condition = transition.get("condition", "true")
+            if isinstance(condition, str) and condition.strip() != "true" and condition not in conditions:
+                try:
+                    conditions[condition] = parse_condition(condition)
+                except ConditionSyntaxError:
+                    # Left for the engine to report when it compiles the guard.
+                    pass
+        return cls({
+            "stateMachineId": definition["stateMachineId"],
+            "version": definition.get("version"),
+            "hash": digest,
+            "definition": definition,
+            "dispatch": plan_dispatch(graph),
+            "conditions": conditions,
+        })
+
+    def payload(self) -> Dict[str, Any]:
+        return {"stateMachineId": self.state_machine_id, "version": self.version, "hash": self.hash,
+                "definition": self.definition, "dispatch": self.dispatch_plan, "conditions": self.conditions}
+
+    def engine(self, instance_index=None) -> StateMachineEngine:
+        preload_conditions(self.conditions)
+        with gc_paused():
+            return StateMachineEngine(self.definition, instance_index, dispatch_plan=self.dispatch_plan)
+
+
+def write_artifact(path: str, compiled: CompiledDefinition):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, 'wb') as f:
+        f.write(ARTIFACT_HEADER.pack(ARTIFACT_MAGIC, ARTIFACT_FORMAT, marshal.version, get_code_version()))
+        marshal.dump(compiled.payload(), f)
+    os.replace(temporary, path)
+
+
+def read_artifact(path: str) -> Optional[CompiledDefinition]:
+    """Load an artifact through a memory map; None if it is missing, stale or damaged."""
+    try:
+        with open(path, 'rb') as f:
+            view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        if len(view) < ARTIFACT_HEADER.size or \
+                ARTIFACT_HEADER.unpack_from(view) != (ARTIFACT_MAGIC, ARTIFACT_FORMAT, marshal.version,
+                                                      get_code_version()):
+            return None
+        try:
+            with gc_paused(), memoryview(view) as body:
+                payload = marshal.loads(body[ARTIFACT_HEADER.size:])
+        except (EOFError, ValueError, TypeError):
+            return None
+        return CompiledDefinition(payload)
+    finally:
+        view.close()
+
+
+class DefinitionCache:
+    """Compiled definitions stored as ``<cache_dir>/definitions/<stateMachineId>/<version>-<hash>.fsmc``.
+
+    The hash covers the definition file's bytes, so an edited definition
+    never loads a stale artifact even when its version was not bumped.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.root = os.path.join(cache_dir, "definitions")
+
+    def path_for(self, state_machine_id: str, version: Any, digest: str) -> str:
+        return os.path.join(self.root, state_machine_id, f"{version}-{digest}{ARTIFACT_SUFFIX}")
+
+    def load(self, definition_file: str) -> CompiledDefinition:
+        """Load the artifact for a definition file, compiling and storing it on a miss."""
+        with open(definition_file, 'rb') as f:
+            content = f.read()
+        digest = content_hash(content)
+        for path in glob.glob(os.path.join(glob.escape(self.root), "*", f"*-{digest}{ARTIFACT_SUFFIX}")):
+            compiled = read_artifact(path)
+            if compiled is not None and compiled.hash == digest:
+                return compiled
+        compiled = CompiledDefinition.compile(json.loads(content), digest)
+        write_artifact(self.path_for(compiled.state_machine_id, compiled.version, digest), compiled)
+        return compiled
+
+    def find(self, state_machine_id: str, version: Any) -> Optional[CompiledDefinition]:
+        """Most recently written artifact for a definition version, when the file itself is not at hand."""
+        pattern = os.path.join(glob.escape(os.path.join(self.root, state_machine_id)),
+                               f"{glob.escape(str(version))}-*{ARTIFACT_SUFFIX}")
+        for path in sorted(glob.glob(pattern), key=os.path.getmtime, reverse=True):
+            compiled = read_artifact(path)
+            if compiled is not None:
+                return compiled
+        return None
+
+
+def load_engine_cached(definition_file: str, cache_dir: str = DEFAULT_CACHE_DIR) -> StateMachineEngine:
+    """Like :func:`tools.runtime.engine.load_engine`, going through the compiled definition cache."""
+    return DefinitionCache(cache_dir).load(definition_file).engine()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile state machine definitions into cached startup artifacts')
+    parser.add_argument('definition_files', nargs='+', help='State machine definition JSON files')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help=f'Cache directory (default: {DEFAULT_CACHE_DIR})')
+
+    args = parser.parse_args()
+    cache = DefinitionCache(args.cache_dir)
+    for definition_file in args.definition_files:
+        compiled = cache.load(definition_file)
+        print(f"{definition_file}: {cache.path_for(compiled.state_machine_id, compiled.version, compiled.hash)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+
+import operator
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List, Any, Tuple
+
+# Transition conditions use a small JavaScript-like dialect, e.g.
+#   data.amount > 0
+#   data.userConfirmed === true && data.verificationStatus !== 'failed'
+#   data.balance >= -100
+
+TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<number>-?\d+(?:\.\d+)?)
+      | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+      | (?P<name>[A-Za-z_$][A-Za-z0-9_$]*(?:\.[A-Za-z_$][A-Za-z0-9_$]*)*)
+      | (?P<op>===|!==|==|!=|<=|>=|&&|\|\||[<>!()])
+    )""", re.VERBOSE)
+
+LITERALS = {"true": True, "false": False, "null": None, "undefined": None}
+
+COMPARISON_OPERATORS = ("===", "!==", "==", "!=", "<", "<=", ">", ">=")
+
+ORDERING_OPERATORS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+# Upper bound on distinct condition strings kept compiled at once.
+CONDITION_CACHE_SIZE = 4096
+
+# Syntax trees parsed ahead of time (e.g. loaded from a compiled definition artifact), waiting to be
+# compiled; bounded like the compiled cache, oldest first out.
+_preparsed: Dict[str, Any] = {}
+
+
+class ConditionSyntaxError(ValueError):
+    """Raised when a transition condition cannot be parsed."""
+
+
+def tokenize(expression: str) -> List[Tuple[str, str]]:
+    """Split a condition into (kind, text) tokens."""
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = TOKEN_PATTERN.match(expression, position)
+        if not match or match.end() == position:
+            raise ConditionSyntaxError(f"Unexpected input at {position} in condition: {expression!r}")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive descent parser producing a tuple-based syntax tree.
+
+    Nodes are ``("const", value)``, ``("path", [keys])``, ``("not", node)``,
+    ``("and", left, right)``, ``("or", left, right)`` and ``(operator, left, right)``
+    for comparisons.
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.tokens = tokenize(expression)
+        self.position = 0
+
+    def peek(self) -> Tuple[str, str]:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return ("end", "")
+
+    def advance(self) -> Tuple[str, str]:
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse(self):
+        node = self.parse_or()
+        if self.peek()[0] != "end":
+            raise ConditionSyntaxError(f"Unexpected token {self.peek()[1]!r} in condition: {self.expression!r}")
+        return node
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.peek() == ("op", "||"):
+            self.advance()
+            node = ("or", node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_comparison()
+        while self.peek() == ("op", "&&"):
+            self.advance()
+            node = ("and", node, self.parse_comparison())
+        return node
+
+    def parse_comparison(self):
+        node = self.parse_unary()
+        kind, text = self.peek()
+        if kind == "op" and text in COMPARISON_OPERATORS:
+            self.advance()
+            node = (text, node, self.parse_unary())
+        return node
+
+    def parse_unary(self):
+        if self.peek() == ("op", "!"):
+            self.advance()
+            return ("not", self.parse_unary())
+        return self.parse_primary()
+
+    def parse_primary(self):
+        kind, text = self.advance()
+        if kind == "number":
+            return ("const", float(text) if "." in text else int(text))
+        if kind == "string":
+            return ("const", _unquote(text))
+        if kind == "name":
+            if text in LITERALS:
+                return ("const", LITERALS[text])
+            keys = text.split(".")
+            if keys[0] != "data":
+                raise ConditionSyntaxError(f"Only data.* paths are supported, got {text!r} in condition: {self.expression!r}")
+            return ("path", keys[1:])
+        if (kind, text) == ("op", "("):
+            node = self.parse_or()
+            if self.advance() != ("op", ")"):
+                raise ConditionSyntaxError(f"Missing ')' in condition: {self.expression!r}")
+            return node
+        raise ConditionSyntaxError(f"Unexpected token {text!r} in condition: {self.expression!r}")
+
+
+def _unquote(text: str) -> str:
+    return re.sub(r"\\(.)", r"\1", text[1:-1])
+
+
+def parse_condition(expression: str):
+    """Parse a condition into its syntax tree."""
+    return _Parser(expression).parse()
+
+
+def preload_conditions(trees: Dict[str, Any]):
+    """Let :func:`compile_condition` use already parsed syntax trees instead of parsing again.
+
+    A tree is dropped once its condition is compiled, and at most
+    ``CONDITION_CACHE_SIZE`` wait at a time, so long-lived workers loading
+    many definitions do not accumulate them.
+    """
+    _preparsed.update(trees)
+    while len(_preparsed) > CONDITION_CACHE_SIZE:
+        _preparsed.pop(next(iter(_preparsed)), None)
+
+
+def resolve_path(data: Dict[str, Any], keys: List[str]) -> Any:
+    """Look up a data.* path, returning None when any segment is missing."""
+    value = data
+    for key in keys:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def strict_equals(left: Any, right: Any) -> bool:
+    """JavaScript ``===``: booleans never equal numbers."""
+    if isinstance(left, bool) or isinstance(right, bool):
+        return type(left) is type(right) and left == right
+    return left == right
+
+
+def compare(operator: str, left: Any, right: Any) -> bool:
+    """Apply a comparison operator; ordering against missing or mismatched values is false."""
+    if operator == "===":
+        return strict_equals(left, right)
+    if operator == "!==":
+        return not strict_equals(left, right)
+    if operator == "==":
+        return left == right
+    if operator == "!=":
+        return left != right
+    try:
+        if left is None or right is None:
+            return False
+        if operator == "<":
+            return left < right
+        if operator == "<=":
+            return left <= right
+        if operator == ">":
+            return left > right
+        return left >= right
+    except TypeError:
+        return False
+
+
+def _evaluate(node, data: Dict[str, Any]) -> Any:
+    kind = node[0]
+    if kind == "const":
+        return node[1]
+    if kind == "path":
+        return resolve_path(data, node[1])
+    if kind == "not":
+        return not _evaluate(node[1], data)
+    if kind == "and":
+        return _evaluate(node[1], data) and _evaluate(node[2], data)
+    if kind == "or":
+        return _evaluate(node[1], data) or _evaluate(node[2], data)
+    return compare(kind, _evaluate(node[1], data), _evaluate(node[2], data))
+
+
+def evaluate_condition(expression: str, data: Dict[str, Any]) -> bool:
+    """Parse and evaluate a transition condition against instance data."""
+    if expression is None:
+        return True
+    return bool(_evaluate(parse_condition(expression), data))
+
+
+def always_true(data: Dict[str, Any]) -> bool:
+    return True
+
+
+def _compile(node) -> Callable[[Dict[str, Any]], Any]:
+    kind = node[0]
+    if kind == "const":
+        value = node[1]
+        return lambda data: value
+    if kind == "path":
+        keys = node[1]
+        if len(keys) == 1:
+            key = keys[0]
+            return lambda data: data.get(key)
+        return lambda data: resolve_path(data, keys)
+    if kind == "not":
+        operand = _compile(node[1])
+        return lambda data: not operand(data)
+
+    left, right = _compile(node[1]), _compile(node[2])
+    if kind == "and":
+        return lambda data: left(data) and right(data)
+    if kind == "or":
+        return lambda data: left(data) or right(data)
+
+    if node[2][0] == "const":
+        # Comparisons against a literal are by far the common case.
+        value = node[2][1]
+        if kind in ("===", "!==") and (isinstance(value, bool) or value is None):
+            if kind == "===":
+                return lambda data: left(data) is value
+            return lambda data: left(data) is not value
+        if kind == "===" and isinstance(value, str):
+            return lambda data: left(data) == value
+        if kind == "!==" and isinstance(value, str):
+            return lambda data: left(data) != value
+        if kind in ORDERING_OPERATORS:
+            order = ORDERING_OPERATORS[kind]
+
+            def ordered(data):
+                actual = left(data)
+                if actual is None:
+                    return False
+                try:
+                    return order(actual, value)
+                except TypeError:
+                    return False
+            return ordered
+        return lambda data: compare(kind, left(data), value)
+    return lambda data: compare(kind, left(data), right(data))
+
+
+@lru_cache(maxsize=CONDITION_CACHE_SIZE)
+def compile_condition(expression: str) -> Callable[[Dict[str, Any]], bool]:
+    """Compile a condition into a guard callable, cached by expression text.
+
+    Parsing happens once per distinct expression; the ``"true"`` guard (and a
+    missing condition) compile to a constant.
+    """
+    if expression is None or expression.strip() == "true":
+        return always_true
+    node = _preparsed.pop(expression, None) or parse_condition(expression)
+    if node[0] == "const":
+        return always_true if node[1] else lambda data: False
+    evaluate = _compile(node)
+    return lambda data: bool(evaluate(data))
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+
+import asyncio
+import json
+import logging
+import os
+from collections import deque
+from typing import Deque, Dict, List, Any, Optional, Tuple
+
+from tools.runtime.http_client import HTTPClient
+from tools.runtime.instrumentation import Histogram, Instrumentation
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMITS = {"linger": 0.005, "max_batch": 500, "max_bytes": 1 << 20}
+
+
+class DeliveryError(Exception):
+    """A sink refused a batch."""
+
+
+class Sink:
+    """Destination of a :class:`SinkBatcher`.
+
+    ``send`` gets the JSON-encoded messages of one batch, in order, with the
+    instance id of each; it returns once the destination has accepted all of
+    them and raises :class:`DeliveryError`, ``HTTPError`` or ``OSError``
+    otherwise.
+    """
+
+    async def send(self, items: List[bytes], keys: List[Optional[str]]):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class WebhookSink(Sink):
+    """Posts each batch as one JSON array to a webhook of a definition.
+
+    Acceptance follows the webhook's ``expectedResponse`` when it has one,
+    any 2xx status otherwise, as for unbatched callbacks.
+    """
+
+    def __init__(self, webhook: Dict[str, Any], client: Optional[HTTPClient] = None):
+        self.webhook = webhook
+        self.client = client or HTTPClient()
+        self._owns_client = client is None
+
+    async def send(self, items: List[bytes], keys: List[Optional[str]]):
+        response = await self.client.request(self.webhook.get("method", "POST"), self.webhook["url"],
+                                             b"[" + b",".join(items) + b"]",
+                                             {"Content-Type": "application/json", "X-Batch-Size": str(len(items))})
+        expected = self.webhook.get("expectedResponse")
+        if not (response.status_line == expected if expected else 200 <= response.status < 300):
+            raise DeliveryError(response.status_line)
+
+    async def close(self):
+        if self._owns_client:
+            await self.client.close()
+
+
+class BrokerSink(Sink):
+    """Produces each batch to a topic in one call, keyed by instance id.
+
+    ``producer.produce(topic, records)`` takes ``(key, value)`` byte pairs
+    and may return an awaitable; a Kafka client is adapted to that call.
+    Keying by instance id keeps one instance on one partition, so the
+    broker preserves the order this pipeline delivers in.
+    """
+
+    def __init__(self, producer: Any, topic: str):
+        self.producer = producer
+        self.topic = topic
+
+    async def send(self, items: List[bytes], keys: List[Optional[str]]):
+        result = self.producer.produce(self.topic, [((key or "").encode("utf-8"), item)
+                                                    for key, item in zip(keys, items)])
+        if asyncio.iscoroutine(result) or isinstance(result, asyncio.Future):
+            await result
+
+
+class FileSink(Sink):
+    """Appends each batch to a JSON-lines file with a single write.
+
+    Writes run in a worker thread; with ``fsync`` every batch is on disk
+    before it counts as delivered.
+    """
+
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def _write(self, data: bytes):
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self._fd, view):]
+        if self.fsync:
+            os.fsync(self._fd)
+
+    async def send(self, items: List[bytes], keys: List[Optional[str]]):
+        await asyncio.to_thread(self._write, b"\n".join(items) + b"\n")
+
+    async def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class _Lane:
+    """Messages of the instances hashed to one lane, delivered one batch at a time."""
+
+    __slots__ = ("messages", "bytes", "wakeup", "space", "idle", "task")
+
+    def __init__(self):
+        self.messages: Deque[Tuple[bytes, Optional[str], float]] = deque()
+        self.bytes = 0
+        self.wakeup = asyncio.Event()
+        self.space = asyncio.Event()
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.task: Optional[asyncio.Task] = None
+
+
+class SinkBatcher:
+    """Coalesces messages for one sink into batches.
+
+    A batch goes out when it reaches ``max_batch`` messages or ``max_bytes``
+    of encoded JSON, or ``linger`` seconds after its first message arrived.
+    Instances are hashed onto ``lanes``; each lane has at most one batch in
+    flight, so messages of one instance are delivered in the order they
+    were put while different lanes proceed in parallel. A failed batch is
+    retried ``retries`` times (``retry_delay`` doubling per attempt) before
+    it is dropped and logged. :meth:`put` waits while a lane already holds
+    ``max_pending`` messages.
+
+    Delivery latency, from :meth:`put` until the sink accepted the batch,
+    goes into an :class:`~tools.runtime.instrumentation.Histogram`; with
+    ``metrics`` that is the ``fsm_delivery_latency_seconds`` series of the
+    sink, so it is exported with the engine and action series.
+    """
+
+    def __init__(self, sink: Sink, linger: float = DEFAULT_LIMITS["linger"],
+                 max_batch: int = DEFAULT_LIMITS["max_batch"], max_bytes: int = DEFAULT_LIMITS["max_bytes"],
+                 lanes: int = 4, max_pending: int = 100_000, retries: int = 3, retry_delay: float = 0.05,
+                 name: Optional[str] = None, metrics: Optional[Instrumentation] = None):
+        self.sink = sink
+        self.linger = linger
+        self.max_batch = max_batch
+        self.max_bytes = max_bytes
+        self.max_pending = max_pending
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.name = name or type(sink).__name__
+        self._lanes = [_Lane() for _ in range(lanes)]
+        self._closing = False
+        self._flushing = 0
+
+        self.delivered = 0
+        self.failed = 0
+        self.batches = 0
+        self.latency_max = 0.0
+        self.latency = Histogram() if metrics is None else metrics.histogram(
+            "fsm_delivery_latency_seconds", "Time from queueing a message until its sink accepted it",
+            (("sink", self.name),))
+
+    def _lane(self, instance_id: Optional[str]) -> _Lane:
+        lane = self._lanes[hash(instance_id) % len(self._lanes)]
+        if lane.task is None:
+            lane.task = asyncio.get_running_loop().create_task(self._run(lane))
+        return lane
+
+    async def put(self, instance_id: Optional[str], message: Any):
+        """Queue a JSON-serialisable message of an instance."""
+        if self._closing:
+            raise RuntimeError(f"{self.name} is closed")
+        lane = self._lane(instance_id)
+        while len(lane.messages) >= self.max_pending:
+            lane.space.clear()
+            await lane.space.wait()
+        item = json.dumps(message, separators=(",", ":")).encode("utf-8")
+        lane.messages.append((item, instance_id, asyncio.get_running_loop().time()))
+        lane.bytes += len(item)
+        lane.idle.clear()
+        if len(lane.messages) == 1 or len(lane.messages) >= self.max_batch or lane.bytes >= self.max_bytes:
+            lane.wakeup.set()
+
+    def _take(self, lane: _Lane) -> List[Tuple[bytes, Optional[str], float]]:
+        batch, size = [], 0
+        messages = lane.messages
+        while messages and len(batch) < self.max_batch and (not batch or size + len(messages[0][0]) <= self.max_bytes):
+            entry = messages.popleft()
+            size += len(entry[0])
+            batch.append(entry)
+        lane.bytes -= size
+        lane.space.set()
+        return batch
+
+    async def _run(self, lane: _Lane):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not lane.messages:
+                lane.idle.set()
+                if self._closing:
+                    return
+                lane.wakeup.clear()
+                await lane.wakeup.wait()
+                continue
+            wait = lane.messages[0][2] + self.linger - loop.time()
+            full = len(lane.messages) >= self.max_batch or lane.bytes >= self.max_bytes
+            if wait > 0 and not full and not (self._closing or self._flushing):
+                lane.wakeup.clear()
+                try:
+                    await asyncio.wait_for(lane.wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._deliver(self._take(lane), loop)
+
+    async def _deliver(self, batch: List[Tuple[bytes, Optional[str], float]], loop: asyncio.AbstractEventLoop):
+        items = [entry[0] for entry in batch]
+        keys = [entry[1] for entry in batch]
+        attempt = 0
+        while True:
+            try:
+                await self.sink.send(items, keys)
+                break
+            except Exception as e:
+                # Whatever the sink raised, the lane task must survive to deliver later batches.
+                if attempt >= self.retries:
+                    self.failed += len(batch)
+                    logger.warning("Dropped a batch of %d message(s) for %s: %s", len(batch), self.name, e)
+                    return
+                await asyncio.sleep(self.retry_delay * (2 ** attempt))
+                attempt += 1
+        now = loop.time()
+        self.batches += 1
+        self.delivered += len(batch)
+        observe = self.latency.observe
+        for entry in batch:
+            observe(now - entry[2])
+        # The first message of a batch waited longest.
+        self.latency_max = max(self.latency_max, now - batch[0][2])
+
+    async def flush(self):
+        """Send everything queued now, without waiting for the linger time."""
+        lanes = [lane for lane in self._lanes if lane.task is not None]
+        self._flushing += 1
+        try:
+            for lane in lanes:
+                lane.wakeup.set()
+            await asyncio.gather(*(lane.idle.wait() for lane in lanes))
+        finally:
+            self._flushing -= 1
+
+    def pending(self) -> int:
+        return sum(len(lane.messages) for lane in self._lanes)
+
+    def metrics(self) -> Dict[str, Any]:
+        counts, total = self.latency.snapshot()
+        return {
+            "pending": self.pending(),
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "batches": self.batches,
+            "meanBatchSize": self.delivered / self.batches if self.batches else 0.0,
+            "latencyMs": {
+                "mean": total * 1000 / self.delivered if self.delivered else 0.0,
+                "max": self.latency_max * 1000,
+                "buckets": {f"le{bound * 1000:g}": count for bound, count in zip(self.latency.bounds, counts)},
+                "over": counts[-1],
+            },
+        }
+
+    async def close(self):
+        """Deliver what is queued, stop the lanes and close the sink."""
+        self._closing = True
+        for lane in self._lanes:
+            lane.wakeup.set()
+        await asyncio.gather(*(lane.task for lane in self._lanes if lane.task is not None))
+        await self.sink.close()
+
+
+class DeliveryPipeline:
+    """Named :class:`SinkBatcher` instances sharing default limits.
+
+    ``limits`` maps a sink name to keyword overrides of ``defaults`` (for
+    example ``{"audit-file": {"linger": 0.05, "max_bytes": 4 << 20}}``).
+    Webhooks of a definition get a batcher each, named ``"<METHOD> <url>"``,
+    on first use through :meth:`webhook`; they share ``client``, which
+    :meth:`close` only closes when the pipeline created it. Every batcher
+    records its latency into ``metrics`` when given.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Dict[str, Any]]] = None, client: Optional[HTTPClient] = None,
+                 metrics: Optional[Instrumentation] = None, **defaults):
+        self.limits = limits or {}
+        self.defaults = defaults
+        # Not ``self.metrics``, which would hide the metrics() report.
+        self.instrumentation = metrics
+        self.client = client
+        self._owns_client = False
+        self.batchers: Dict[str, SinkBatcher] = {}
+
+    def add(self, name: str, sink: Sink, **limits) -> SinkBatcher:
+        options = dict(self.defaults)
+        options.update(self.limits.get(name, {}))
+        options.update(limits)
+        batcher = self.batchers[name] = SinkBatcher(sink, name=name, metrics=self.instrumentation, **options)
+        return batcher
+
+    def webhook(self, webhook: Dict[str, Any]) -> SinkBatcher:
+        name = f"{webhook.get('method', 'POST').upper()} {webhook['url']}"
+        batcher = self.batchers.get(name)
+        if batcher is None:
+            if self.client is None:
+                self.client = HTTPClient()
+                self._owns_client = True
+            batcher = self.add(name, WebhookSink(webhook, self.client))
+        return batcher
+
+    async def put(self, name: str, instance_id: Optional[str], message: Any):
+        await self.batchers[name].put(instance_id, message)
+
+    async def flush(self):
+        await asyncio.gather(*(batcher.flush() for batcher in self.batchers.values()))
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        return {name: batcher.metrics() for name, batcher in self.batchers.items()}
+
+    async def close(self):
+        await asyncio.gather(*(batcher.close() for batcher in self.batchers.values()))
+        if self._owns_client:
+            await self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+import json
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Any, Optional, Tuple
+
+from tools.model.definition_graph import DefinitionGraph
+from tools.runtime.conditions import compile_condition
+
+# Dispatch key for transitions that declare no event and fire automatically.
+AUTOMATIC = None
+
+_MISSING = object()
+
+
+class CompiledTransition:
+    """A candidate transition in the dispatch table."""
+
+    __slots__ = ("transition_id", "to_state_id", "condition", "guard", "transition")
+
+    def __init__(self, transition: Dict[str, Any], guard: Callable[[Dict[str, Any]], bool]):
+        self.transition_id = transition["transitionId"]
+        self.to_state_id = transition["toStateId"]
+        self.condition = transition.get("condition", "true")
+        self.guard = guard
+        self.transition = transition
+
+
+def plan_dispatch(graph: DefinitionGraph) -> List[Tuple[str, Optional[str], Tuple[int, ...]]]:
+    """Dispatch table as ``(stateId, eventId, transition indexes)`` rows.
+
+    Plain data, so a compiled definition artifact can store it and skip the
+    source expansion on load.
+    """
+    plan: Dict[Tuple[str, Optional[str]], List[int]] = {}
+    for index, transition in enumerate(graph.transitions):
+        event_ids = [event.get("eventId") for event in transition.get("event") or []] or [AUTOMATIC]
+        for source_id in graph.expand_sources(transition):
+            for event_id in event_ids:
+                plan.setdefault((source_id, event_id), []).append(index)
+    return [(state_id, event_id, tuple(indexes)) for (state_id, event_id), indexes in plan.items()]
+
+
+def utc_timestamp() -> str:
+    """Current time in the ISO 8601 form used by instance documents."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class StateMachineEngine:
+    """Executes a state machine definition against instance documents.
+
+    The definition is compiled once into a dispatch table keyed by
+    ``(stateId, eventId)``; transitions without an ``event`` are keyed by
+    ``(stateId, None)`` and taken by :meth:`advance`. Each entry holds the
+    candidate transitions in definition order, so firing an event is a single
+    dictionary lookup followed by guard evaluation.
+
+    An optional :class:`~tools.storage.instance_index.InstanceIndex` is
+    updated on every transition and for every new instance. A precomputed
+    ``dispatch_plan`` (see :func:`plan_dispatch`) skips building the
+    definition graph, which is then only built if :attr:`graph` is used.
+    """
+
+    def __init__(self, definition: Dict[str, Any], instance_index=None,
+                 dispatch_plan: Optional[List[Tuple[str, Optional[str], Tuple[int, ...]]]] = None):
+        self.definition = definition
+        self.instance_index = instance_index
+        self.state_machine_id = definition["stateMachineId"]
+        self.initial_state = next((state["stateId"] for state in definition.get("states", [])
+                                   if state.get("baseStateType") == "initial"), None)
+        self._graph = None if dispatch_plan is not None else DefinitionGraph(definition)
+        self.dispatch: Dict[Tuple[str, Optional[str]], Tuple[CompiledTransition, ...]] = self._compile(
+            dispatch_plan if dispatch_plan is not None else plan_dispatch(self._graph))
+
+    @property
+    def graph(self) -> DefinitionGraph:
+        if self._graph is None:
+            self._graph = DefinitionGraph(self.definition)
+        return self._graph
+
+    def compile_guard(self, condition: Optional[str]) -> Callable[[Dict[str, Any]], bool]:
+        """Build the guard callable for a transition condition."""
+        return compile_condition(condition)
+
+    def _compile(self, plan) -> Dict[Tuple[str, Optional[str]], Tuple[CompiledTransition, ...]]:
+        compiled = [CompiledTransition(transition, self.compile_guard(transition.get("condition", "true")))
+                    for transition in self.definition.get("transitions", [])]
+        pick = compiled.__getitem__
+        return {(state_id, event_id): tuple(map(pick, indexes)) for state_id, event_id, indexes in plan}
+
+    def candidates(self, state_id: str, event_id: Optional[str] = AUTOMATIC) -> Tuple[CompiledTransition, ...]:
+        """Return the ordered candidate transitions for a state and event."""
+        return self.dispatch.get((state_id, event_id), ())
+
+    def select(self, state_id: str, event_id: Optional[str], data: Dict[str, Any]) -> Optional[CompiledTransition]:
+        """Return the first candidate whose guard holds, if any."""
+        for candidate in self.dispatch.get((state_id, event_id), ()):
+            if candidate.guard(data):
+                return candidate
+        return None
+
+    def fire(self, instance: Dict[str, Any], event_id: Optional[str], data: Optional[Dict[str, Any]] = None,
+             timestamp: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Fire an event on an instance.
+
+        ``data`` is merged into ``consolidatedData`` before guards are
+        evaluated. Returns the transition taken, or None if no candidate was
+        enabled, in which case the instance is left unchanged.
+        """
+        if instance.get("stateMachineId", self.state_machine_id) != self.state_machine_id:
+            raise ValueError(f"Instance {instance.get('instanceId')} belongs to {instance['stateMachineId']}, "
+                             f"not {self.state_machine_id}")
+
+        consolidated = instance.setdefault("consolidatedData", {})
+        if data:
+            # Merge in place and keep only the replaced values to undo, instead of copying the whole dict.
+            undo = {key: consolidated.get(key, _MISSING) for key in data}
+            consolidated.update(data)
+            candidate = None
+            try:
+                candidate = self.select(instance["currentState"], event_id, consolidated)
+            finally:
+                if candidate is None:
+                    for key, value in undo.items():
+                        if value is _MISSING:
+                            del consolidated[key]
+                        else:
+                            consolidated[key] = value
+        else:
+            candidate = self.select(instance["currentState"], event_id, consolidated)
+        if candidate is None:
+            return None
+
+        self._enter(instance, candidate.to_state_id, timestamp or utc_timestamp())
+        return candidate.transition
+
+    def advance(self, instance: Dict[str, Any], data: Optional[Dict[str, Any]] = None,
+                timestamp: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Take an enabled automatic (event-less) transition, if any."""
+        return self.fire(instance, AUTOMATIC, data, timestamp)
+
+    def _enter(self, instance: Dict[str, Any], state_id: str, timestamp: str):
+        history = instance.setdefault("stateHistory", [])
+        if history and "exitedAt" not in history[-1]:
+            history[-1]["exitedAt"] = timestamp
+        history.append({"stateId": state_id, "enteredAt": timestamp})
+        instance["currentState"] = state_id
+        instance["lastUpdated"] = timestamp
+        if self.instance_index is not None:
+            self.instance_index.update(instance["instanceId"], state_id, timestamp)
+
+    def new_instance(self, instance_id: str, data: Optional[Dict[str, Any]] = None,
+                     timestamp: Optional[str] = None) -> Dict[str, Any]:
+        """Create an instance document positioned at the initial state."""
+        initial = self.initial_state
+        if initial is None:
+            raise ValueError(f"State machine {self.state_machine_id} has no initial state")
+        timestamp = timestamp or utc_timestamp()
+        if self.instance_index is not None:
+            self.instance_index.update(instance_id, initial, timestamp)
+        return {
+            "instanceId": instance_id,
+            "stateMachineId": self.state_machine_id,
+            "currentState": initial,
+            "startedAt": timestamp,
+            "lastUpdated": timestamp,
+            "consolidatedData": dict(data or {}),
+            "stateHistory": [{"stateId": initial, "enteredAt": timestamp}]
+        }
+
+
+def load_engine(definition_file: str) -> StateMachineEngine:
+    """Load a definition file and compile it into an engine."""
+    with open(definition_file, 'r') as f:
+        return StateMachineEngine(json.load(f))
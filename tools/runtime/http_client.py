@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+import asyncio
+import json
+import ssl
+from typing import Dict, List, Any, Optional, Tuple
+from urllib.parse import urlsplit
+
+HostKey = Tuple[str, str, int]
+
+
+class HTTPError(Exception):
+    """Raised for malformed responses or broken connections."""
+
+
+def _has_body(method: str, status: int) -> bool:
+    """Whether a response carries a body at all (RFC 7230, section 3.3.3)."""
+    return method != "HEAD" and status >= 200 and status not in (204, 304)
+
+
+class Response:
+    __slots__ = ("status", "reason", "headers", "body")
+
+    def __init__(self, status: int, reason: str, headers: Dict[str, str], body: bytes):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+    @property
+    def status_line(self) -> str:
+        return f"{self.status} {self.reason}".strip()
+
+    def json(self) -> Any:
+        return json.loads(self.body) if self.body else None
+
+
+class _Connection:
+    __slots__ = ("reader", "writer")
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    def close(self):
+        self.writer.close()
+
+
+class HTTPClient:
+    """Minimal asyncio HTTP/1.1 client with keep-alive connection pools per host.
+
+    At most ``max_per_host`` requests are in flight to one host at a time and
+    up to that many idle connections are kept open for reuse.
+    """
+
+    def __init__(self, max_per_host: int = 16, connect_timeout: float = 10.0,
+                 ssl_context: Optional[ssl.SSLContext] = None):
+        self.max_per_host = max_per_host
+        self.connect_timeout = connect_timeout
+        self.ssl_context = ssl_context
+        self._idle: Dict[HostKey, List[_Connection]] = {}
+        self._limits: Dict[HostKey, asyncio.Semaphore] = {}
+        self.connections_opened = 0
+
+    def _limit(self, key: HostKey) -> asyncio.Semaphore:
+        limit = self._limits.get(key)
+        if limit is None:
+            limit = self._limits[key] = asyncio.Semaphore(self.max_per_host)
+        return limit
+
+    async def _acquire(self, key: HostKey) -> Tuple[_Connection, bool]:
+        idle = self._idle.get(key)
+        while idle:
+            connection = idle.pop()
+            if not connection.reader.at_eof() and not connection.writer.is_closing():
+                return connection, True
+            connection.close()
+        scheme, host, port = key
+        context = (self.ssl_context or ssl.create_default_context()) if scheme == "https" else None
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port, ssl=context),
+                                                self.connect_timeout)
+        self.connections_opened += 1
+        return _Connection(reader, writer), False
+
+    def _release(self, key: HostKey, connection: _Connection):
+        idle = self._idle.setdefault(key, [])
+        if len(idle) < self.max_per_host:
+            idle.append(connection)
+        else:
+            connection.close()
+
+    async def request(self, method: str, url: str, body: Optional[bytes] = None,
+                      headers: Optional[Dict[str, str]] = None) -> Response:
+        """Send a request, reusing a pooled connection to the host when one is idle."""
+        parts = urlsplit(url)
+        scheme = parts.scheme or "http"
+        key = (scheme, parts.hostname, parts.port or (443 if scheme == "https" else 80))
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+
+        lines = [f"{method.upper()} {target} HTTP/1.1", f"Host: {parts.netloc}", "Connection: keep-alive",
+                 f"Content-Length: {len(body or b'')}"]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        message = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b"")
+
+        async with self._limit(key):
+            connection, reused = await self._acquire(key)
+            try:
+                try:
+                    connection.writer.write(message)
+                    await connection.writer.drain()
+                    response, keep_alive = await self._read_response(connection.reader, method.upper())
+                except (HTTPError, ConnectionError):
+                    if not reused:
+                        raise
+                    # The server closed an idle keep-alive connection; retry once on a fresh one.
+                    connection.close()
+                    connection, _ = await self._acquire_fresh(key)
+                    connection.writer.write(message)
+                    await connection.writer.drain()
+                    response, keep_alive = await self._read_response(connection.reader, method.upper())
+            except BaseException:
+                connection.close()
+                raise
+            if keep_alive:
+                self._release(key, connection)
+            else:
+                connection.close()
+            return response
+
+    async def _acquire_fresh(self, key: HostKey) -> Tuple[_Connection, bool]:
+        # The other idle connections to the host are as old as the one that failed.
+        for connection in self._idle.pop(key, []):
+            connection.close()
+        return await self._acquire(key)
+
+    async def _read_response(self, reader: asyncio.StreamReader, method: str = "GET") -> Tuple[Response, bool]:
+        """Read one response; truncated or unparsable ones raise :class:`HTTPError`."""
+        try:
+            while True:
+                response, version = await self._read_head(reader)
+                # Interim 1xx responses (100 Continue and the like) precede the real one.
+                if not 100 <= response.status < 200 or response.status == 101:
+                    break
+            keep_alive = response.headers.get("connection", "").lower() != "close" and version != "HTTP/1.0"
+            headers = response.headers
+            if _has_body(method, response.status):
+                if headers.get("transfer-encoding", "").lower() == "chunked":
+                    chunks = []
+                    while True:
+                        size = int((await reader.readline()).split(b";")[0].strip(), 16)
+                        if size == 0:
+                            await reader.readline()
+                            break
+                        chunks.append(await reader.readexactly(size))
+                        await reader.readexactly(2)
+                    response.body = b"".join(chunks)
+                elif "content-length" in headers:
+                    response.body = await reader.readexactly(int(headers["content-length"]))
+                elif not keep_alive:
+                    # Without a length the body runs until the server closes the connection.
+                    response.body = await reader.read()
+                else:
+                    # No length on a connection the server keeps open: nothing tells where a body would
+                    # end, so take none and do not reuse the connection.
+                    keep_alive = False
+        except asyncio.IncompleteReadError as e:
+            raise HTTPError(f"connection closed after {len(e.partial)} of {e.expected} bytes") from e
+        except (ValueError, asyncio.LimitOverrunError) as e:
+            raise HTTPError(f"malformed response: {e}") from e
+        return response, keep_alive
+
+    async def _read_head(self, reader: asyncio.StreamReader) -> Tuple[Response, str]:
+        status_line = await reader.readline()
+        if not status_line:
+            raise HTTPError("connection closed before a response was received")
+        parts = status_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+        if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+            raise HTTPError(f"malformed status line: {status_line!r}")
+        try:
+            status = int(parts[1])
+        except ValueError:
+            raise HTTPError(f"malformed status line: {status_line!r}") from None
+        reason = parts[2] if len(parts) > 2 else ""
+
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return Response(status, reason, headers, b""), parts[0]
+
+    async def close(self):
+        for connections in self._idle.values():
+            for connection in connections:
+                connection.close()
+        self._idle.clear()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+
+import itertools
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Any, Optional, Tuple
+
+# Upper bounds of the latency histogram buckets in seconds; an open +Inf bucket follows.
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RETRY_BUCKETS = (0, 1, 2, 3, 5, 10)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[Tuple[str, str], ...]
+Sampler = Callable[[], bool]
+
+
+class Histogram:
+    """Fixed-bucket histogram recorded without locks.
+
+    Each thread records into its own shard (bucket counts followed by the
+    running sum), so concurrent observers never contend or lose updates;
+    :meth:`snapshot` adds the shards up.
+    """
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self._local = threading.local()
+        self._shards: List[List[float]] = []
+
+    def _new_shard(self) -> List[float]:
+        shard = self._local.shard = [0] * (len(self.bounds) + 1) + [0.0]
+        self._shards.append(shard)
+        return shard
+
+    def observe(self, value: float):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[bisect_left(self.bounds, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """Per-bucket counts (the last one is +Inf) and the sum of observed values."""
+        counts = [0] * (len(self.bounds) + 1)
+        total = 0.0
+        for shard in list(self._shards):
+            for index in range(len(counts)):
+                counts[index] += shard[index]
+            total += shard[-1]
+        return counts, total
+
+
+class Counter:
+    """Monotonic counter with per-thread shards, like :class:`Histogram`."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[List[float]] = []
+
+    def inc(self, amount: float = 1):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._local.shard = [0]
+            self._shards.append(shard)
+        shard[0] += amount
+
+    def value(self) -> float:
+        return sum(shard[0] for shard in list(self._shards))
+
+
+def rate_sampler(rate: float, rng: Optional[random.Random] = None) -> Sampler:
+    """Samples each event with probability ``rate``."""
+    draw = (rng or random.Random()).random
+    return lambda: draw() < rate
+
+
+def every_nth_sampler(n: int) -> Sampler:
+    """Samples one event in ``n``, deterministically."""
+    counter = itertools.count()
+    return lambda: next(counter) % n == 0
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Instrumentation:
+    """Latency histograms and outcome counters for the engine, actions and persistence.
+
+    Series are keyed by ``stateMachineId``, ``stateId``, ``transitionId`` and
+    ``actionId`` labels. ``sampler`` decides per transition, action or call
+    whether it is timed (every one by default); retry counts and attempt
+    outcomes are always counted. Nothing is instrumented until
+    :meth:`instrument_engine`, :meth:`instrument_store` or
+    ``ActionExecutor(metrics=...)`` attach it, so code running without an
+    :class:`Instrumentation` pays nothing.
+    """
+
+    def __init__(self, sampler: Optional[Sampler] = None, latency_buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.sampler = sampler
+        self.latency_buckets = latency_buckets
+        # name -> (type, help, {labels: Histogram or Counter})
+        self._families: Dict[str, Tuple[str, str, Dict[Labels, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def _series(self, name: str, kind: str, help_text: str, labels: Labels, factory: Callable[[], Any]):
+        family = self._families.get(name)
+        series = family[2].get(labels) if family is not None else None
+        if series is None:
+            # Creating a series is rare; only this takes the lock, recording never does.
+            with self._lock:
+                family = self._families.setdefault(name, (kind, help_text, {}))
+                series = family[2].setdefault(labels, factory())
+        return series
+
+    def histogram(self, name: str, help_text: str, labels: Labels,
+                  bounds: Optional[Tuple[float, ...]] = None) -> Histogram:
+        return self._series(name, "histogram", help_text, labels,
+                            lambda: Histogram(bounds or self.latency_buckets))
+
+    def counter(self, name: str, help_text: str, labels: Labels) -> Counter:
+        return self._series(name, "counter", help_text, labels, Counter)
+
+    def sampled(self) -> bool:
+        return self.sampler is None or self.sampler()
+
+    def instrument_engine(self, engine):
+        """Time every (sampled) :meth:`fire` of an engine, ``advance`` included."""
+        fire = type(engine).fire.__get__(engine)
+        state_machine_id = engine.state_machine_id
+        sampler = self.sampler
+        clock = time.perf_counter
+        series: Dict[Tuple[Optional[str], str], Histogram] = {}
+
+        def timed_fire(instance, event_id, data=None, timestamp=None):
+            if sampler is not None and not sampler():
+                return fire(instance, event_id, data, timestamp)
+            state_id = instance.get("currentState")
+            start = clock()
+            transition = fire(instance, event_id, data, timestamp)
+            elapsed = clock() - start
+            key = (state_id, transition["transitionId"] if transition is not None else "none")
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = self.histogram(
+                    "fsm_transition_duration_seconds", "Time to select and take a transition",
+                    (("stateMachineId", state_machine_id), ("stateId", key[0] or ""), ("transitionId", key[1])))
+            histogram.observe(elapsed)
+            return transition
+
+        engine.fire = timed_fire
+        return engine
+
+    @staticmethod
+    def uninstrument_engine(engine):
+        engine.__dict__.pop("fire", None)
+        return engine
+
+    def instrument_store(self, store, operations: Tuple[str, ...] = ("append", "sync", "load")):
+        """Time persistence calls of an event log store (or any object with these methods)."""
+        for operation in operations:
+            method = getattr(type(store), operation).__get__(store)
+            histogram = self.histogram("fsm_persistence_duration_seconds", "Time spent in persistence calls",
+                                       (("operation", operation),))
+            setattr(store, operation, self._timed(method, histogram))
+        return store
+
+    def _timed(self, function: Callable, histogram: Histogram) -> Callable:
+        sampler = self.sampler
+        clock = time.perf_counter
+
+        def timed(*args, **kwargs):
+            if sampler is not None and not sampler():
+                return function(*args, **kwargs)
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(clock() - start)
+
+        return timed
+
+    def action_attempt(self, labels: Labels, outcome: str):
+        self.counter("fsm_action_attempts_total", "Action attempts by outcome (completed, failed, timedOut)",
+                     labels + (("outcome", outcome),)).inc()
+
+    def action_finished(self, labels: Labels, seconds: Optional[float], attempts: int):
+        self.histogram("fsm_action_retries", "Retries an action needed", labels, RETRY_BUCKETS).observe(attempts - 1)
+        if seconds is not None:
+            self.histogram("fsm_action_duration_seconds", "Action latency including retries", labels).observe(seconds)
+
+    def render_prometheus(self) -> str:
+        """All series in the Prometheus text exposition format."""
+        with self._lock:
+            families = [(name, kind, help_text, dict(series))
+                        for name, (kind, help_text, series) in sorted(self._families.items())]
+        lines = []
+        for name, kind, help_text, series in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in sorted(series.items()):
+                if kind == "counter":
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(metric.value())}")
+                    continue
+                counts, total = metric.snapshot()
+                cumulative = 0
+                for bound, count in zip(metric.bounds + ("+Inf",), counts):
+                    cumulative += count
+                    le = 'le="%s"' % (bound if isinstance(bound, str) else f"{bound:g}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, le)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """Write the exposition atomically, e.g. for node_exporter's textfile collector."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        text = self.render_prometheus()
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'w') as f:
+            f.write(text)
+        os.replace(temporary, path)
+
+    def serve_prometheus(self, port: int = 9464, host: str = "127.0.0.1"):
+        """Serve ``/metrics`` from a daemon thread; call ``shutdown()`` on the result to stop."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
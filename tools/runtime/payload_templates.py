@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+import json
+from typing import Callable, Dict, List, Any, Optional, Tuple
+
+DATA_PREFIX = "$data."
+
+
+def resolve_payload(template: Any, data: Dict[str, Any]) -> Any:
+    """Substitute ``$data.<path>`` strings in a payload template."""
+    if isinstance(template, dict):
+        return {key: resolve_payload(value, data) for key, value in template.items()}
+    if isinstance(template, list):
+        return [resolve_payload(value, data) for value in template]
+    if isinstance(template, str) and template.startswith(DATA_PREFIX):
+        return resolve_path(data, template[len(DATA_PREFIX):].split("."))
+    return template
+
+
+def resolve_path(data: Dict[str, Any], keys: List[str]) -> Any:
+    value = data
+    for key in keys:
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def _getter(keys: List[str]) -> Callable[[Dict[str, Any]], Any]:
+    if len(keys) == 1:
+        key = keys[0]
+        return lambda data: data.get(key)
+    return lambda data: resolve_path(data, keys)
+
+
+def _has_slots(template: Any) -> bool:
+    if isinstance(template, dict):
+        return any(_has_slots(value) for value in template.values())
+    if isinstance(template, list):
+        return any(_has_slots(value) for value in template)
+    return isinstance(template, str) and template.startswith(DATA_PREFIX)
+
+
+class PayloadTemplate:
+    """A payload template compiled into JSON byte fragments and ``$data.`` slots.
+
+    Constant subtrees are serialized once at compile time; :meth:`render`
+    only encodes the slot values and joins them with the prepared fragments.
+    The output is byte-for-byte what ``json.dumps(resolve_payload(...))``
+    produces.
+    """
+
+    __slots__ = ("template", "parts", "slots", "whole_slot")
+
+    def __init__(self, template: Any):
+        self.template = template
+        fragments: List[Any] = []
+        self._emit(template, fragments)
+
+        # Merge adjacent constant fragments; remember where each slot goes.
+        self.parts: List[Optional[bytes]] = []
+        self.slots: List[Tuple[int, Callable[[Dict[str, Any]], Any]]] = []
+        for fragment in fragments:
+            if isinstance(fragment, bytes):
+                if self.parts and self.parts[-1] is not None:
+                    self.parts[-1] += fragment
+                else:
+                    self.parts.append(fragment)
+            else:
+                self.slots.append((len(self.parts), fragment))
+                self.parts.append(None)
+        # A payload that is a single "$data." string has no body when the value is missing.
+        self.whole_slot = isinstance(template, str) and template.startswith(DATA_PREFIX)
+
+    def _emit(self, template: Any, fragments: List[Any]):
+        if not _has_slots(template):
+            fragments.append(json.dumps(template).encode("utf-8"))
+        elif isinstance(template, dict):
+            fragments.append(b"{")
+            for index, (key, value) in enumerate(template.items()):
+                if index:
+                    fragments.append(b", ")
+                fragments.append(json.dumps(str(key)).encode("utf-8") + b": ")
+                self._emit(value, fragments)
+            fragments.append(b"}")
+        elif isinstance(template, list):
+            fragments.append(b"[")
+            for index, value in enumerate(template):
+                if index:
+                    fragments.append(b", ")
+                self._emit(value, fragments)
+            fragments.append(b"]")
+        else:
+            fragments.append(_getter(template[len(DATA_PREFIX):].split(".")))
+
+    def render(self, data: Dict[str, Any]) -> Optional[bytes]:
+        """JSON body for ``data``, or None when the payload resolves to null."""
+        if not self.slots:
+            return self.parts[0] if self.parts[0] != b"null" else None
+        if self.whole_slot:
+            value = self.slots[0][1](data)
+            return None if value is None else json.dumps(value).encode("utf-8")
+        parts = self.parts[:]
+        for index, getter in self.slots:
+            parts[index] = json.dumps(getter(data)).encode("utf-8")
+        return b"".join(parts)
+
+    def resolve(self, data: Dict[str, Any]) -> Any:
+        return resolve_payload(self.template, data)
+
+
+def compile_payloads(definition: Dict[str, Any]) -> Dict[int, PayloadTemplate]:
+    """Compile every trigger payload of a definition, keyed by ``id()`` of its webhook dict.
+
+    The keys are only meaningful while the definition is alive and unchanged;
+    look-ups should check that ``template.template`` is the webhook's payload.
+    """
+    templates = {}
+    for state in definition.get("states", []):
+        for action in state.get("entryActions", []) + state.get("exitActions", []):
+            webhook = (action.get("trigger") or {}).get("webhook")
+            if webhook is not None and "payload" in webhook:
+                templates[id(webhook)] = PayloadTemplate(webhook["payload"])
+    return templates
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+
+import json
+import multiprocessing
+import struct
+import time
+import zlib
+from multiprocessing import shared_memory
+from typing import Dict, Iterator, List, Any, Optional, Tuple
+
+from tools.runtime.engine import StateMachineEngine
+
+# Ring header: consumer position at 0 and producer position at 64 (separate cache lines), capacity at 8.
+RING_HEADER = 128
+HEAD_OFFSET = 0
+CAPACITY_OFFSET = 8
+TAIL_OFFSET = 64
+POSITION = struct.Struct("<Q")
+LENGTH = struct.Struct("<I")
+
+DEFAULT_RING_BYTES = 4 * 1024 * 1024
+DEFAULT_BATCH_SIZE = 256
+
+# Command batches, results and final instance documents go in messages of at most this share of the ring.
+MESSAGE_SHARE = 4
+
+
+def shard_for(instance_id: str, shards: int) -> int:
+    """Shard owning an instance; CRC32 is stable across processes, unlike ``hash``."""
+    return zlib.crc32(instance_id.encode("utf-8")) % shards
+
+
+class SharedRing:
+    """Single-producer, single-consumer queue of byte messages in shared memory.
+
+    Positions only grow; the producer owns the tail and the consumer the
+    head. Each message is a length prefix and its bytes, wrapping around the
+    end of the buffer. The producer publishes the tail after copying a
+    message in, and the consumer the head after copying messages out.
+
+    Both positions are read and written only while holding ``lock`` (a
+    ``multiprocessing.Lock`` shared by the two processes). Taking and
+    releasing it are full memory barriers, so a consumer that sees a new
+    tail also sees the message bytes before it, whatever order the CPU
+    would otherwise make stores visible in. The lock covers the position
+    update only, never the copying, so it is held for a few instructions
+    once per batch.
+    """
+
+    def __init__(self, memory: shared_memory.SharedMemory, lock, create: bool = False):
+        self.memory = memory
+        self.buffer = memory.buf
+        self.lock = lock
+        if create:
+            POSITION.pack_into(self.buffer, CAPACITY_OFFSET, memory.size - RING_HEADER)
+            POSITION.pack_into(self.buffer, HEAD_OFFSET, 0)
+            POSITION.pack_into(self.buffer, TAIL_OFFSET, 0)
+        with lock:
+            self.capacity = POSITION.unpack_from(self.buffer, CAPACITY_OFFSET)[0]
+            self.head = POSITION.unpack_from(self.buffer, HEAD_OFFSET)[0]
+            self.tail = POSITION.unpack_from(self.buffer, TAIL_OFFSET)[0]
+
+    @classmethod
+    def create(cls, capacity: int, context=multiprocessing) -> "SharedRing":
+        memory = shared_memory.SharedMemory(create=True, size=RING_HEADER + capacity)
+        return cls(memory, context.Lock(), create=True)
+
+    def _load(self, offset: int) -> int:
+        with self.lock:
+            return POSITION.unpack_from(self.buffer, offset)[0]
+
+    def _publish(self, offset: int, position: int):
+        with self.lock:
+            POSITION.pack_into(self.buffer, offset, position)
+
+    def try_put(self, payload: bytes) -> bool:
+        """Append one message; False if there is not room for it yet."""
+        size = LENGTH.size + len(payload)
+        if size > self.capacity:
+            raise ValueError(f"Message of {len(payload)} bytes does not fit a {self.capacity} byte ring")
+        head = self._load(HEAD_OFFSET)
+        if self.capacity - (self.tail - head) < size:
+            return False
+        self._copy_in(self.tail, LENGTH.pack(len(payload)))
+        self._copy_in(self.tail + LENGTH.size, payload)
+        self.tail += size
+        self._publish(TAIL_OFFSET, self.tail)
+        return True
+
+    def get_all(self) -> List[bytes]:
+        """Remove and return every message published so far."""
+        tail = self._load(TAIL_OFFSET)
+        messages = []
+        head = self.head
+        while head < tail:
+            length = LENGTH.unpack(self._copy_out(head, LENGTH.size))[0]
+            messages.append(self._copy_out(head + LENGTH.size, length))
+            head += LENGTH.size + length
+        if messages:
+            self.head = head
+            self._publish(HEAD_OFFSET, head)
+        return messages
+
+    def _copy_in(self, position: int, data: bytes):
+        start = position % self.capacity
+        first = min(len(data), self.capacity - start)
+        self.buffer[RING_HEADER + start:RING_HEADER + start + first] = data[:first]
+        if first < len(data):
+            self.buffer[RING_HEADER:RING_HEADER + len(data) - first] = data[first:]
+
+    def _copy_out(self, position: int, length: int) -> bytes:
+        start = position % self.capacity
+        first = min(length, self.capacity - start)
+        data = bytes(self.buffer[RING_HEADER + start:RING_HEADER + start + first])
+        if first < length:
+            data += bytes(self.buffer[RING_HEADER:RING_HEADER + length - first])
+        return data
+
+    def close(self, unlink: bool = False):
+        self.buffer = None
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
+
+
+class Backoff:
+    """Polling delay for an empty or full ring: yield first, then sleep up to ``limit`` seconds."""
+
+    def __init__(self, limit: float = 0.001):
+        self.limit = limit
+        self.delay = 0.0
+
+    def wait(self):
+        time.sleep(self.delay)
+        self.delay = min(self.limit, self.delay * 2 or 0.00005)
+
+    def reset(self):
+        self.delay = 0.0
+
+
+_engine_cache: Dict[Tuple[str, Any], StateMachineEngine] = {}
+
+
+def get_engine(definition: Dict[str, Any]) -> StateMachineEngine:
+    """Return this process's compiled engine for a definition, building it once per version."""
+    key = (definition["stateMachineId"], definition.get("version"))
+    engine = _engine_cache.get(key)
+    if engine is None:
+        engine = _engine_cache[key] = StateMachineEngine(definition)
+    return engine
+
+
+def _send(ring: SharedRing, payload: bytes, backoff: Backoff):
+    while not ring.try_put(payload):
+        backoff.wait()
+    backoff.reset()
+
+
+def _batches(items: List[Any], limit: int) -> Iterator[Tuple[bytes, int]]:
+    """Encode ``items`` as JSON arrays of at most ``limit`` bytes, yielding each with its item count.
+
+    A batch that comes out too large is halved until it fits, so the usual
+    case costs one ``json.dumps``. Raises ValueError, after yielding the
+    items before it, on an item too large on its own.
+    """
+    start = 0
+    while start < len(items):
+        count = len(items) - start
+        payload = json.dumps(items[start:], separators=(",", ":")).encode("utf-8")
+        while len(payload) > limit and count > 1:
+            count = (count + 1) // 2
+            payload = json.dumps(items[start:start + count], separators=(",", ":")).encode("utf-8")
+        if len(payload) > limit:
+            raise ValueError(f"{len(payload)} byte message exceeds the {limit} byte limit")
+        yield payload, count
+        start += count
+
+
+def _send_instances(ring: SharedRing, documents, backoff: Backoff):
+    limit = ring.capacity // MESSAGE_SHARE
+    chunk, size = [], 0
+    for document in documents:
+        encoded = json.dumps(document).encode("utf-8")
+        if chunk and size + len(encoded) > limit:
+            _send(ring, b'[["instances",[' + b",".join(chunk) + b"]]]", backoff)
+            chunk, size = [], 0
+        chunk.append(encoded)
+        size += len(encoded) + 1
+    if chunk:
+        _send(ring, b'[["instances",[' + b",".join(chunk) + b"]]]", backoff)
+
+
+def _send_results(ring: SharedRing, results: List[list], backoff: Backoff):
+    for payload, _ in _batches(results, ring.capacity // MESSAGE_SHARE):
+        _send(ring, payload, backoff)
+
+
+def run_shard(shard: int, definition: Dict[str, Any], inbound: SharedRing, outbound: SharedRing, collect: bool):
+    """Worker loop: apply the shard's commands in arrival order until told to stop.
+
+    Commands (JSON arrays, batched into one ring message):
+      ["create", instanceId, data, timestamp]
+      ["fire", instanceId, eventId, data, timestamp]   (eventId null = automatic)
+      ["stop", returnInstances]
+    """
+    engine = get_engine(definition)
+    instances: Dict[str, Dict[str, Any]] = {}
+    events = transitions = rejected = 0
+    backoff = Backoff()
+    while True:
+        messages = inbound.get_all()
+        if not messages:
+            backoff.wait()
+            continue
+        backoff.reset()
+        for message in messages:
+            results = []
+            for command in json.loads(message):
+                op = command[0]
+                if op == "fire":
+                    _, instance_id, event_id, data, timestamp = command
+                    events += 1
+                    instance = instances.get(instance_id)
+                    transition = engine.fire(instance, event_id, data, timestamp) if instance is not None else None
+                    if transition is not None:
+                        transitions += 1
+                    elif instance is None:
+                        rejected += 1
+                    if collect:
+                        results.append(["result", instance_id, event_id,
+                                        transition["transitionId"] if transition else None,
+                                        instance["currentState"] if instance else None])
+                elif op == "create":
+                    _, instance_id, data, timestamp = command
+                    instances[instance_id] = engine.new_instance(instance_id, data, timestamp)
+                elif op == "stop":
+                    if results:
+                        _send_results(outbound, results, backoff)
+                        results = []
+                    if command[1]:
+                        _send_instances(outbound, instances.values(), backoff)
+                    states: Dict[str, int] = {}
+                    for instance in instances.values():
+                        states[instance["currentState"]] = states.get(instance["currentState"], 0) + 1
+                    summary = {"shard": shard, "instances": len(instances), "events": events,
+                               "transitions": transitions, "rejected": rejected, "states": states}
+                    _send(outbound, json.dumps([["stopped", summary]]).encode("utf-8"), backoff)
+                    return
+                else:
+                    raise ValueError(f"Unknown shard command {op!r}")
+            if results:
+                _send_results(outbound, results, backoff)
+
+
+def _worker_main(shard: int, definition: Dict[str, Any], inbound_name: str, inbound_lock,
+                 outbound_name: str, outbound_lock, collect: bool):
+    inbound = SharedRing(shared_memory.SharedMemory(name=inbound_name), inbound_lock)
+    outbound = SharedRing(shared_memory.SharedMemory(name=outbound_name), outbound_lock)
+    try:
+        run_shard(shard, definition, inbound, outbound, collect)
+    finally:
+        inbound.close()
+        outbound.close()
+
+
+class ShardedExecutor:
+    """Runs instances of one definition across worker processes, partitioned by instanceId.
+
+    Every instance lives in exactly one worker (``shard_for``), and each
+    worker compiles the definition into its own engine. Commands go to a
+    worker through a shared-memory ring and results come back through a
+    second one; commands are buffered per shard and sent ``batch_size`` at a
+    time as one JSON message, split further where it would exceed a quarter
+    of the ring. A command too large for that is dropped with ValueError
+    and the rest of its batch kept. A single producer and in-order rings
+    keep the events of each instance in the order they were submitted.
+
+    With ``collect=True`` each fired event yields a result
+    ``["result", instanceId, eventId, transitionId, currentState]`` from
+    :meth:`drain`; otherwise workers only report a summary on :meth:`stop`.
+    """
+
+    def __init__(self, definition: Dict[str, Any], workers: int = None, ring_bytes: int = DEFAULT_RING_BYTES,
+                 batch_size: int = DEFAULT_BATCH_SIZE, collect: bool = False):
+        self.definition = definition
+        self.workers = workers or multiprocessing.cpu_count()
+        self.ring_bytes = ring_bytes
+        self.batch_size = batch_size
+        self.collect = collect
+        self.inbound: List[SharedRing] = []
+        self.outbound: List[SharedRing] = []
+        self.pending: List[List[list]] = [[] for _ in range(self.workers)]
+        self.processes = []
+        self.results: List[list] = []
+        self.instances: Dict[str, Dict[str, Any]] = {}
+        self.summaries: List[Optional[Dict[str, Any]]] = [None] * self.workers
+        self._backoff = Backoff()
+
+    def start(self) -> "ShardedExecutor":
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        for shard in range(self.workers):
+            inbound = SharedRing.create(self.ring_bytes, context)
+            outbound = SharedRing.create(self.ring_bytes, context)
+            self.inbound.append(inbound)
+            self.outbound.append(outbound)
+            process = context.Process(target=_worker_main, name=f"shard-{shard}", daemon=True,
+                                      args=(shard, self.definition, inbound.memory.name, inbound.lock,
+                                            outbound.memory.name, outbound.lock, self.collect))
+            process.start()
+            self.processes.append(process)
+        return self
+
+    # Submitting
+
+    def create(self, instance_id: str, data: Optional[Dict[str, Any]] = None, timestamp: Optional[str] = None):
+        self._submit(instance_id, ["create", instance_id, data, timestamp])
+
+    def fire(self, instance_id: str, event_id: Optional[str], data: Optional[Dict[str, Any]] = None,
+             timestamp: Optional[str] = None):
+        self._submit(instance_id, ["fire", instance_id, event_id, data, timestamp])
+
+    def advance(self, instance_id: str, data: Optional[Dict[str, Any]] = None, timestamp: Optional[str] = None):
+        self._submit(instance_id, ["fire", instance_id, None, data, timestamp])
+
+    def _submit(self, instance_id: str, command: list):
+        shard = shard_for(instance_id, self.workers)
+        pending = self.pending[shard]
+        pending.append(command)
+        if len(pending) >= self.batch_size:
+            self._flush_shard(shard)
+
+    def flush(self):
+        """Send every buffered command."""
+        for shard in range(self.workers):
+            if self.pending[shard]:
+                self._flush_shard(shard)
+
+    def _flush_shard(self, shard: int):
+        pending = self.pending[shard]
+        ring = self.inbound[shard]
+        sent = 0
+        try:
+            for payload, count in _batches(pending, ring.capacity // MESSAGE_SHARE):
+                while not ring.try_put(payload):
+                    # A worker blocked on a full result ring cannot drain its commands; keep reading results.
+                    if not self._receive():
+                        self._check_workers()
+                        self._backoff.wait()
+                self._backoff.reset()
+                sent += count
+        except ValueError as e:
+            # Drop only the command that can never fit; the ones after it stay pending.
+            command = pending.pop(sent)
+            raise ValueError(f"{command[0]} command for {command[1]!r} does not fit a shard ring: {e}") from None
+        finally:
+            # Commands leave the buffer only once the ring holds them.
+            del pending[:sent]
+
+    # Receiving
+
+    def _receive(self) -> bool:
+        received = False
+        for shard, ring in enumerate(self.outbound):
+            for message in ring.get_all():
+                received = True
+                for item in json.loads(message):
+                    if item[0] == "result":
+                        self.results.append(item)
+                    elif item[0] == "instances":
+                        for document in item[1]:
+                            self.instances[document["instanceId"]] = document
+                    elif item[0] == "stopped":
+                        self.summaries[shard] = item[1]
+        return received
+
+    def _check_workers(self):
+        for shard, process in enumerate(self.processes):
+            if self.summaries[shard] is None and not process.is_alive():
+                raise RuntimeError(f"Shard worker {shard} exited with code {process.exitcode}")
+
+    def drain(self) -> List[list]:
+        """Flush commands and return the results received so far."""
+        self.flush()
+        self._receive()
+        results, self.results = self.results, []
+        return results
+
+    def stop(self, return_instances: bool = False) -> List[Dict[str, Any]]:
+        """Finish every submitted command, stop the workers and return their summaries.
+
+        With ``return_instances`` the final documents are left in :attr:`instances`.
+        """
+        for shard in range(self.workers):
+            self.pending[shard].append(["stop", return_instances])
+        self.flush()
+        while any(summary is None for summary in self.summaries):
+            if not self._receive():
+                self._check_workers()
+                self._backoff.wait()
+        for process in self.processes:
+            process.join()
+        self.close()
+        return self.summaries
+
+    def close(self):
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        for ring in self.inbound + self.outbound:
+            ring.close(unlink=True)
+        self.inbound, self.outbound, self.processes = [], [], []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        if self.processes:
+            self.close()
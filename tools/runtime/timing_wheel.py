@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+
+import asyncio
+import itertools
+import json
+import logging
+import math
+import os
+import time
+from typing import Callable, Dict, List, Any, Optional
+
+from tools.model.durations import parse_duration
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the lateness histogram buckets; the last bucket is open.
+LATENESS_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class Timer:
+    """A pending timer. ``due`` is an absolute time in epoch seconds."""
+
+    __slots__ = ("timer_id", "due", "due_tick", "payload", "callback", "bucket")
+
+    def __init__(self, timer_id: str, due: float, payload: Any = None, callback: Optional[Callable] = None):
+        self.timer_id = timer_id
+        self.due = due
+        self.due_tick = 0
+        self.payload = payload
+        self.callback = callback
+        self.bucket: Optional[Dict[str, "Timer"]] = None
+
+
+class TimingWheel:
+    """Hierarchical timing wheel with O(1) insert and cancel.
+
+    ``levels`` wheels of ``slots`` buckets each; level ``n`` buckets span
+    ``slots ** n`` ticks. With the defaults (10 ms ticks, 4 x 256 slots) the
+    wheel covers about 497 days before timers go to an overflow bucket. Each
+    bucket is a dict keyed by timer id, and a timer remembers its bucket, so
+    cancel is a single dict delete. Timers cascade to lower levels as the wheel
+    turns and fire from level 0.
+    """
+
+    def __init__(self, tick: float = 0.01, slots: int = 256, levels: int = 4, now: Optional[float] = None):
+        if slots & (slots - 1):
+            raise ValueError("slots must be a power of two")
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.bits = slots.bit_length() - 1
+        self.mask = slots - 1
+        self.origin = time.time() if now is None else now
+        self.current_tick = 0
+        # (span, shift) per level: a timer less than ``span`` ticks away goes to that level.
+        self._spans = [(1 << (self.bits * (level + 1)), self.bits * level) for level in range(levels)]
+        self.wheels: List[List[Dict[str, Timer]]] = [[{} for _ in range(slots)] for _ in range(levels)]
+        self.overflow: Dict[str, Timer] = {}
+        self.ready: Dict[str, Timer] = {}
+        self.timers: Dict[str, Timer] = {}
+        self._ids = itertools.count()
+
+        self.fired = 0
+        self.cancelled = 0
+        self.lateness_buckets = [0] * (len(LATENESS_BUCKETS_MS) + 1)
+        self.lateness_total = 0.0
+        self.lateness_max = 0.0
+
+    def _tick_of(self, when: float) -> int:
+        return math.ceil((when - self.origin) / self.tick - 1e-9)
+
+    def _place(self, timer: Timer):
+        delta = timer.due_tick - self.current_tick
+        if delta <= 0:
+            bucket = self.ready
+        else:
+            for wheel, (span, shift) in zip(self.wheels, self._spans):
+                if delta < span:
+                    bucket = wheel[(timer.due_tick >> shift) & self.mask]
+                    break
+            else:
+                bucket = self.overflow
+        bucket[timer.timer_id] = timer
+        timer.bucket = bucket
+
+    def schedule(self, due: float, payload: Any = None, callback: Optional[Callable] = None,
+                 timer_id: Optional[str] = None) -> Timer:
+        """Schedule a timer at an absolute epoch time; replaces a pending timer with the same id."""
+        if timer_id is None:
+            timer_id = f"t{next(self._ids)}"
+        elif timer_id in self.timers:
+            self.cancel(timer_id)
+        timer = Timer(timer_id, due, payload, callback)
+        timer.due_tick = self._tick_of(due)
+        self.timers[timer_id] = timer
+        self._place(timer)
+        return timer
+
+    def schedule_after(self, delay: float, now: Optional[float] = None, **kwargs) -> Timer:
+        return self.schedule((time.time() if now is None else now) + delay, **kwargs)
+
+    def schedule_duration(self, duration: str, now: Optional[float] = None, **kwargs) -> Timer:
+        """Schedule after an ISO 8601 duration such as a retryDelay or timeout."""
+        return self.schedule_after(parse_duration(duration), now, **kwargs)
+
+    def cancel(self, timer_id: str) -> bool:
+        timer = self.timers.pop(timer_id, None)
+        if timer is None:
+            return False
+        del timer.bucket[timer_id]
+        timer.bucket = None
+        self.cancelled += 1
+        return True
+
+    def _cascade(self, level: int, tick: int):
+        bucket = self.wheels[level][(tick >> (self.bits * level)) & self.mask]
+        if not bucket:
+            return
+        timers = list(bucket.values())
+        bucket.clear()
+        for timer in timers:
+            self._place(timer)
+
+    def advance(self, now: Optional[float] = None) -> List[Timer]:
+        """Turn the wheel up to ``now`` and return the timers that became due."""
+        now = time.time() if now is None else now
+        target = math.floor((now - self.origin) / self.tick + 1e-9)
+        expired = list(self.ready.values())
+        self.ready.clear()
+
+        if target > self.current_tick and len(self.timers) == len(expired):
+            # Nothing is waiting on the wheel; jump straight to the target tick.
+            self.current_tick = target
+        top = 1 << (self.bits * self.levels)
+        while self.current_tick < target:
+            self.current_tick += 1
+            tick = self.current_tick
+            if tick & self.mask == 0:
+                for level in range(1, self.levels):
+                    self._cascade(level, tick)
+                    if (tick >> (self.bits * level)) & self.mask:
+                        break
+                if tick % top == 0 and self.overflow:
+                    timers = list(self.overflow.values())
+                    self.overflow.clear()
+                    for timer in timers:
+                        self._place(timer)
+            bucket = self.wheels[0][tick & self.mask]
+            if bucket:
+                expired.extend(bucket.values())
+                bucket.clear()
+            if self.ready:
+                expired.extend(self.ready.values())
+                self.ready.clear()
+            if len(self.timers) == len(expired):
+                self.current_tick = max(self.current_tick, target)
+                break
+
+        for timer in expired:
+            del self.timers[timer.timer_id]
+            timer.bucket = None
+            self._record_lateness(now - timer.due)
+        self.fired += len(expired)
+        return expired
+
+    def _record_lateness(self, seconds: float):
+        lateness_ms = max(seconds, 0.0) * 1000
+        self.lateness_total += lateness_ms
+        self.lateness_max = max(self.lateness_max, lateness_ms)
+        for index, bound in enumerate(LATENESS_BUCKETS_MS):
+            if lateness_ms <= bound:
+                self.lateness_buckets[index] += 1
+                return
+        self.lateness_buckets[-1] += 1
+
+    def next_due(self) -> Optional[float]:
+        """Earliest pending due time, or None; scans only non-empty level-0 buckets first."""
+        if self.ready:
+            return min(timer.due for timer in self.ready.values())
+        if not self.timers:
+            return None
+        for offset in range(1, self.slots + 1):
+            bucket = self.wheels[0][(self.current_tick + offset) & self.mask]
+            if bucket:
+                return min(timer.due for timer in bucket.values())
+        return min(timer.due for timer in self.timers.values())
+
+    def __len__(self) -> int:
+        return len(self.timers)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Occupancy per level and firing lateness."""
+        return {
+            "pending": len(self.timers),
+            "ready": len(self.ready),
+            "overflow": len(self.overflow),
+            "levels": [{"level": level,
+                        "timers": sum(len(bucket) for bucket in wheel),
+                        "occupiedSlots": sum(1 for bucket in wheel if bucket)}
+                       for level, wheel in enumerate(self.wheels)],
+            "fired": self.fired,
+            "cancelled": self.cancelled,
+            "latenessMs": {
+                "mean": self.lateness_total / self.fired if self.fired else 0.0,
+                "max": self.lateness_max,
+                "buckets": {f"le{bound}": count for bound, count in zip(LATENESS_BUCKETS_MS, self.lateness_buckets)},
+                "over": self.lateness_buckets[-1],
+            },
+        }
+
+
+class TimerStore:
+    """Append-only journal of persistent timers so they survive a restart.
+
+    Records are JSON lines: ``{"op": "add", "id", "due", "payload"}`` and
+    ``{"op": "done", "id"}``. :meth:`load` replays the journal and
+    :meth:`compact` rewrites it with only the pending timers.
+    """
+
+    def __init__(self, path: str, fsync_every: int = 64):
+        self.path = path
+        self.fsync_every = fsync_every
+        self._file = open(path, 'a', encoding='utf-8')
+        self._unsynced = 0
+
+    def _write(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            self.sync()
+
+    def add(self, timer: Timer):
+        self._write({"op": "add", "id": timer.timer_id, "due": timer.due, "payload": timer.payload})
+
+    def done(self, timer_id: str):
+        self._write({"op": "done", "id": timer_id})
+
+    def sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Return pending timers by id."""
+        self._file.flush()
+        pending: Dict[str, Dict[str, Any]] = {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-write.
+                    continue
+                if record["op"] == "add":
+                    pending[record["id"]] = record
+                else:
+                    pending.pop(record["id"], None)
+        return pending
+
+    def compact(self, pending: Optional[Dict[str, Dict[str, Any]]] = None):
+        if pending is None:
+            pending = self.load()
+        temporary = self.path + ".tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            for record in pending.values():
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._file.close()
+        os.replace(temporary, self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        self.sync()
+        self._file.close()
+
+
+class TimerScheduler:
+    """Drives a :class:`TimingWheel` from one asyncio task.
+
+    Persistent timers carry a JSON payload, are journaled to an optional
+    :class:`TimerStore` and are delivered to ``handler(timer)``; on start the
+    journal is replayed so timers due during downtime fire immediately.
+    In-memory timers (:meth:`call_later`, :meth:`sleep`, :meth:`wait_for`)
+    replace one ``asyncio`` timer handle per action with a wheel entry.
+    """
+
+    def __init__(self, handler: Optional[Callable[[Timer], Any]] = None, store: Optional[TimerStore] = None,
+                 wheel: Optional[TimingWheel] = None):
+        self.handler = handler
+        self.store = store
+        self.wheel = wheel or TimingWheel()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def restore(self) -> int:
+        """Re-arm the journaled timers; returns how many were pending."""
+        if self.store is None:
+            return 0
+        pending = self.store.load()
+        for record in pending.values():
+            self.wheel.schedule(record["due"], payload=record["payload"], timer_id=record["id"])
+        self.store.compact(pending)
+        return len(pending)
+
+    def schedule(self, timer_id: str, delay: float, payload: Any) -> Timer:
+        """Schedule a persistent timer delivered to the handler."""
+        timer = self.wheel.schedule_after(delay, payload=payload, timer_id=timer_id)
+        if self.store is not None:
+            self.store.add(timer)
+        return timer
+
+    def schedule_duration(self, timer_id: str, duration: str, payload: Any) -> Timer:
+        return self.schedule(timer_id, parse_duration(duration), payload)
+
+    def cancel(self, timer_id: str) -> bool:
+        cancelled = self.wheel.cancel(timer_id)
+        if cancelled and self.store is not None:
+            self.store.done(timer_id)
+        return cancelled
+
+    def call_later(self, delay: float, callback: Callable[[], Any]) -> Timer:
+        """In-memory timer running ``callback()`` on the wheel's task."""
+        return self.wheel.schedule_after(delay, callback=callback)
+
+    async def sleep(self, delay: float):
+        future = asyncio.get_running_loop().create_future()
+        self.call_later(delay, lambda: future.done() or future.set_result(None))
+        await future
+
+    async def wait_for(self, awaitable, timeout: Optional[float]):
+        """Like ``asyncio.wait_for`` but with the timeout kept on the wheel."""
+        if timeout is None:
+            return await awaitable
+        task = asyncio.ensure_future(awaitable)
+        timed_out = []
+
+        def expire():
+            if not task.done():
+                timed_out.append(True)
+                task.cancel()
+
+        timer = self.call_later(timeout, expire)
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if timed_out:
+                raise asyncio.TimeoutError() from None
+            raise
+        finally:
+            self.wheel.cancel(timer.timer_id)
+
+    def _fire(self, timer: Timer):
+        if timer.callback is not None:
+            timer.callback()
+            return
+        if self.handler is not None:
+            result = self.handler(timer)
+            if asyncio.iscoroutine(result):
+                asyncio.ensure_future(result).add_done_callback(self._handled)
+        if self.store is not None:
+            self.store.done(timer.timer_id)
+
+    @staticmethod
+    def _handled(task: asyncio.Future):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Timer handler failed", exc_info=task.exception())
+
+    async def _run(self):
+        while True:
+            for timer in self.wheel.advance():
+                # One failing handler or journal write must not stop every later timer.
+                try:
+                    self._fire(timer)
+                except Exception:
+                    logger.exception("Timer %s failed", timer.timer_id)
+            await asyncio.sleep(self.wheel.tick)
+
+    def start(self):
+        if self._task is None:
+            self.restore()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.store is not None:
+            self.store.sync()
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+
+import copy
+import json
+import mmap
+import os
+import struct
+import zlib
+from typing import Dict, Iterator, List, Any, Optional, Tuple
+
+from tools.model.snapshots import apply_delta, new_view, replace_view
+
+# Segment record layout: payload length, CRC32 of id+payload, instance id
+# length, then the UTF-8 instance id and the JSON payload. Keeping the id in
+# the header lets segments be indexed without decoding any JSON.
+RECORD_HEADER = struct.Struct("<IIH")
+
+SEGMENT_SUFFIX = ".log"
+SNAPSHOT_PREFIX = "snapshot-"
+SNAPSHOT_SUFFIX = ".jsonl"
+
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+
+# Instances whose last state data is kept in memory to delta-encode the next stateData record.
+DEFAULT_DATA_VIEWS = 65536
+
+
+def apply_record(instance: Optional[Dict[str, Any]], record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Apply one log record to a materialised instance document.
+
+    Record types:
+      create      - ``instance``: the initial document (stateHistory included)
+      transition  - ``toStateId``/``at``, optional ``transitionId``, ``exitedAt``
+                    and ``data`` to merge into consolidatedData
+      exit        - ``at``: closes the current visit without entering another state
+      stateData   - ``stateId``/``data`` for the latest visit of that state, or
+                    ``set``/``unset``: that data as a delta over the visit's
+                    current data, else over the nearest earlier visit's
+      action      - ``stateId``/``action``, replacing an entry with the same actionId
+      set         - ``fields`` overwriting top-level instance fields
+    """
+    kind = record["type"]
+    if kind == "create":
+        return copy.deepcopy(record["instance"])
+    if instance is None:
+        raise ValueError(f"Record of type {kind!r} precedes the create record")
+
+    if kind == "transition":
+        history = instance.setdefault("stateHistory", [])
+        if history and "exitedAt" not in history[-1]:
+            history[-1]["exitedAt"] = record.get("exitedAt", record["at"])
+        history.append({"stateId": record["toStateId"], "enteredAt": record["at"]})
+        instance["currentState"] = record["toStateId"]
+        instance["lastUpdated"] = record["at"]
+        if record.get("data"):
+            instance.setdefault("consolidatedData", {}).update(record["data"])
+    elif kind == "exit":
+        history = instance.get("stateHistory", [])
+        if history:
+            history[-1]["exitedAt"] = record["at"]
+        instance["lastUpdated"] = record["at"]
+    elif kind == "stateData":
+        visit = _latest_visit(instance, record["stateId"])
+        if "data" in record:
+            visit["data"] = record["data"]
+        else:
+            visit["data"] = apply_delta(_base_data(instance, visit), record.get("set", {}), record.get("unset", ()))
+    elif kind == "action":
+        actions = _latest_visit(instance, record["stateId"]).setdefault("actions", [])
+        action = record["action"]
+        for index, existing in enumerate(actions):
+            if existing.get("actionId") == action.get("actionId"):
+                actions[index] = action
+                break
+        else:
+            actions.append(action)
+    elif kind == "set":
+        instance.update(record["fields"])
+    else:
+        raise ValueError(f"Unknown record type {kind!r}")
+    return instance
+
+
+def _latest_visit(instance: Dict[str, Any], state_id: str) -> Dict[str, Any]:
+    for entry in reversed(instance.get("stateHistory", [])):
+        if entry["stateId"] == state_id:
+            return entry
+    raise ValueError(f"Instance {instance.get('instanceId')} never entered state {state_id!r}")
+
+
+def _base_data(instance: Dict[str, Any], visit: Dict[str, Any]) -> Dict[str, Any]:
+    """What a delta-encoded stateData record for ``visit`` applies to."""
+    if "data" in visit:
+        return visit["data"]
+    history = instance.get("stateHistory", [])
+    position = next(index for index, entry in enumerate(history) if entry is visit)
+    for entry in reversed(history[:position]):
+        if "data" in entry:
+            return entry["data"]
+    return {}
+
+
+class Segment:
+    """A sealed or active log segment, read through a memory map."""
+
+    def __init__(self, path: str, number: int):
+        self.path = path
+        self.number = number
+        self._map: Optional[mmap.mmap] = None
+        self._mapped_size = 0
+
+    def view(self) -> Optional[mmap.mmap]:
+        size = os.path.getsize(self.path)
+        if size == 0:
+            return None
+        if self._map is None or self._mapped_size != size:
+            self.close()
+            with open(self.path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapped_size = size
+        return self._map
+
+    def scan(self) -> Iterator[Tuple[int, str, int, int]]:
+        """Yield (offset, instanceId, payload start, payload end) for each intact record."""
+        view = self.view()
+        if view is None:
+            return
+        offset, size = 0, len(view)
+        while offset + RECORD_HEADER.size <= size:
+            length, crc, id_length = RECORD_HEADER.unpack_from(view, offset)
+            id_start = offset + RECORD_HEADER.size
+            payload_start = id_start + id_length
+            end = payload_start + length
+            if end > size or zlib.crc32(view[id_start:end]) != crc:
+                return
+            yield offset, view[id_start:payload_start].decode("utf-8"), payload_start, end
+            offset = end
+
+    def read(self, payload_start: int, end: int) -> Dict[str, Any]:
+        return json.loads(self.view()[payload_start:end])
+
+    def valid_length(self) -> int:
+        end = 0
+        for _, _, _, end in self.scan():
+            pass
+        return end
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+class EventLogStore:
+    """Segmented append-only instance log with compacted snapshots.
+
+    Transitions, state data and action results are appended to the active
+    segment; segments roll over at ``segment_bytes``. :meth:`snapshot`
+    materialises every instance into a snapshot file and deletes the segments
+    it covers. An instance is rebuilt from its snapshot line plus the records
+    appended since, located through an in-memory offset index.
+
+    State data is written as a delta (``set``/``unset``) over the instance's
+    previous state data whenever the store still holds that data as a view
+    (see :mod:`tools.model.snapshots`) for up to ``data_views`` instances;
+    otherwise, and after reopening, the full data is written.
+    """
+
+    def __init__(self, root: str, segment_bytes: int = DEFAULT_SEGMENT_BYTES, fsync_every: int = 256,
+                 snapshot_every_segments: Optional[int] = None, instance_index=None,
+                 data_views: int = DEFAULT_DATA_VIEWS):
+        self.root = root
+        self.segment_bytes = segment_bytes
+        self.fsync_every = fsync_every
+        self.snapshot_every_segments = snapshot_every_segments
+        os.makedirs(root, exist_ok=True)
+
+        self.segments: List[Segment] = []
+        self.index: Dict[str, List[Tuple[int, int, int]]] = {}
+        self.snapshot_path: Optional[str] = None
+        self.snapshot_index: Dict[str, Tuple[int, int]] = {}
+        self._snapshot_map: Optional[mmap.mmap] = None
+        self._active = None
+        self._unsynced = 0
+        # instanceId -> (stateId of the last visit, view of the data a delta would apply to, or None)
+        self.data_views = data_views
+        self._data_views: Dict[str, Tuple[Optional[str], Any]] = {}
+        self._open()
+        # Optional InstanceIndex: rebuilt on open, then fed every appended record.
+        self.instance_index = None
+        if instance_index is not None:
+            self.instance_index = instance_index.rebuild_from_log(self)
+
+    # Opening and indexing
+
+    def _open(self):
+        snapshots = sorted(name for name in os.listdir(self.root)
+                           if name.startswith(SNAPSHOT_PREFIX) and name.endswith(SNAPSHOT_SUFFIX))
+        covered = -1
+        if snapshots:
+            self.snapshot_path = os.path.join(self.root, snapshots[-1])
+            covered = int(snapshots[-1][len(SNAPSHOT_PREFIX):-len(SNAPSHOT_SUFFIX)])
+            self._index_snapshot()
+
+        numbers = sorted(int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(self.root)
+                         if name.endswith(SEGMENT_SUFFIX))
+        for number in numbers:
+            if number <= covered:
+                # Left behind by a compaction that was interrupted after the snapshot was written.
+                os.remove(self._segment_path(number))
+                continue
+            segment = Segment(self._segment_path(number), number)
+            self.segments.append(segment)
+            for offset, instance_id, payload_start, end in segment.scan():
+                self.index.setdefault(instance_id, []).append((len(self.segments) - 1, payload_start, end))
+
+        if self.segments:
+            last = self.segments[-1]
+            valid = last.valid_length()
+            if valid != os.path.getsize(last.path):
+                # Drop a torn record left by a crash mid-append.
+                last.close()
+                with open(last.path, 'r+b') as f:
+                    f.truncate(valid)
+        else:
+            self.segments.append(Segment(self._segment_path(covered + 1), covered + 1))
+            open(self.segments[-1].path, 'ab').close()
+        self._active = open(self.segments[-1].path, 'ab')
+
+    def _index_snapshot(self):
+        with open(self.snapshot_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            self._snapshot_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view, offset = self._snapshot_map, 0
+        while offset < len(view):
+            tab = view.find(b"\t", offset)
+            newline = view.find(b"\n", tab)
+            self.snapshot_index[view[offset:tab].decode("utf-8")] = (tab + 1, newline)
+            offset = newline + 1
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.root, f"{number:010d}{SEGMENT_SUFFIX}")
+
+    # Writing
+
+    def append(self, instance_id: str, record: Dict[str, Any]):
+        """Append one record for an instance."""
+        instance_key = instance_id.encode("utf-8")
+        payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+        header = RECORD_HEADER.pack(len(payload), zlib.crc32(instance_key + payload), len(instance_key))
+
+        position = self._active.tell()
+        self._active.write(header + instance_key + payload)
+        payload_start = position + RECORD_HEADER.size + len(instance_key)
+        self.index.setdefault(instance_id, []).append((len(self.segments) - 1, payload_start,
+                                                       payload_start + len(payload)))
+
+        if self.instance_index is not None:
+            self.instance_index.apply(instance_id, record)
+        self._follow_visits(instance_id, record)
+
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            self.sync()
+        if self._active.tell() >= self.segment_bytes:
+            self._roll()
+
+    def _follow_visits(self, instance_id: str, record: Dict[str, Any]):
+        """Track the latest visit of an instance, so deltas are only written against data readers will see."""
+        kind = record["type"]
+        if kind == "transition":
+            entry = self._data_views.get(instance_id)
+            self._track(instance_id, record["toStateId"], entry[1] if entry is not None else None)
+        elif kind == "create":
+            history = record["instance"].get("stateHistory") or [{}]
+            self._track(instance_id, history[-1].get("stateId"), None)
+        elif kind == "stateData":
+            entry = self._data_views.get(instance_id)
+            if entry is not None:
+                self._data_views[instance_id] = (entry[0], None)
+        elif kind == "set" and "stateHistory" in record["fields"]:
+            self._data_views.pop(instance_id, None)
+
+    def _track(self, instance_id: str, state_id: Optional[str], view: Any):
+        views = self._data_views
+        if instance_id not in views and len(views) >= self.data_views:
+            if not views:
+                return
+            views.pop(next(iter(views)))
+        views[instance_id] = (state_id, view)
+
+    def create_instance(self, instance: Dict[str, Any]):
+        self.append(instance["instanceId"], {"type": "create", "instance": instance})
+
+    def record_transition(self, instance_id: str, to_state_id: str, at: str, transition_id: Optional[str] = None,
+                          data: Optional[Dict[str, Any]] = None, exited_at: Optional[str] = None):
+        record = {"type": "transition", "toStateId": to_state_id, "at": at}
+        if transition_id:
+            record["transitionId"] = transition_id
+        if data:
+            record["data"] = data
+        if exited_at and exited_at != at:
+            record["exitedAt"] = exited_at
+        self.append(instance_id, record)
+
+    def record_exit(self, instance_id: str, at: str):
+        self.append(instance_id, {"type": "exit", "at": at})
+
+    def record_state_data(self, instance_id: str, state_id: str, data: Dict[str, Any]):
+        """Record the data of the latest visit of a state, delta-encoded when that visit is the current one."""
+        record = {"type": "stateData", "stateId": state_id, "data": data}
+        entry = self._data_views.get(instance_id)
+        view = None
+        if entry is not None and entry[0] == state_id:
+            if entry[1] is None:
+                view = new_view(data, shared=False)
+            else:
+                view, changes, removed = replace_view(entry[1], data, shared=False)
+                if len(changes) + len(removed) < len(data):
+                    record = {"type": "stateData", "stateId": state_id, "set": changes}
+                    if removed:
+                        record["unset"] = removed
+        self.append(instance_id, record)
+        if view is not None:
+            self._data_views[instance_id] = (state_id, view)
+
+    def record_action(self, instance_id: str, state_id: str, action: Dict[str, Any]):
+        self.append(instance_id, {"type": "action", "stateId": state_id, "action": action})
+
+    def record_fields(self, instance_id: str, fields: Dict[str, Any]):
+        self.append(instance_id, {"type": "set", "fields": fields})
+
+    def sync(self):
+        """Flush buffered records and fsync the active segment."""
+        self._active.flush()
+        os.fsync(self._active.fileno())
+        self._unsynced = 0
+
+    def _roll(self):
+        self.sync()
+        self._active.close()
+        number = self.segments[-1].number + 1
+        self.segments.append(Segment(self._segment_path(number), number))
+        self._active = open(self.segments[-1].path, 'ab')
+        if self.snapshot_every_segments and len(self.segments) > self.snapshot_every_segments:
+            self.snapshot()
+
+    # Reading
+
+    def instance_ids(self) -> List[str]:
+        ids = dict.fromkeys(self.snapshot_index)
+        ids.update(dict.fromkeys(self.index))
+        return list(ids)
+
+    def load(self, instance_id: str) -> Optional[Dict[str, Any]]:
+        """Rebuild an instance from its snapshot plus the records appended since."""
+        self._active.flush()
+        instance = None
+        location = self.snapshot_index.get(instance_id)
+        if location is not None:
+            instance = json.loads(self._snapshot_map[location[0]:location[1]])
+        for segment_index, payload_start, end in self.index.get(instance_id, ()):
+            instance = apply_record(instance, self.segments[segment_index].read(payload_start, end))
+        return instance
+
+    def iter_instances(self) -> Iterator[Dict[str, Any]]:
+        for instance_id in self.instance_ids():
+            yield self.load(instance_id)
+
+    def iter_records(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (instanceId, record) in log order, snapshot documents first as create records.
+
+        A single sequential pass; records are not replayed into documents.
+        """
+        self._active.flush()
+        for instance_id, (start, end) in self.snapshot_index.items():
+            yield instance_id, {"type": "create", "instance": json.loads(self._snapshot_map[start:end])}
+        for segment in self.segments:
+            for _, instance_id, payload_start, end in segment.scan():
+                yield instance_id, segment.read(payload_start, end)
+
+    # Compaction
+
+    def snapshot(self) -> str:
+        """Write a compacted snapshot of every instance and drop the covered segments."""
+        self.sync()
+        covered = self.segments[-1].number
+        path = os.path.join(self.root, f"{SNAPSHOT_PREFIX}{covered:010d}{SNAPSHOT_SUFFIX}")
+        temporary = path + ".tmp"
+        with open(temporary, 'wb') as f:
+            for instance_id in self.instance_ids():
+                document = json.dumps(self.load(instance_id), separators=(",", ":")).encode("utf-8")
+                f.write(instance_id.encode("utf-8") + b"\t" + document + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+
+        self._active.close()
+        for segment in self.segments:
+            segment.close()
+            os.remove(segment.path)
+        if self._snapshot_map is not None:
+            self._snapshot_map.close()
+            self._snapshot_map = None
+        if self.snapshot_path and self.snapshot_path != path:
+            os.remove(self.snapshot_path)
+
+        self.snapshot_path = path
+        self.snapshot_index = {}
+        self._index_snapshot()
+        self.index = {}
+        self.segments = [Segment(self._segment_path(covered + 1), covered + 1)]
+        self._active = open(self.segments[-1].path, 'ab')
+        return path
+
+    def close(self):
+        self.sync()
+        self._active.close()
+        for segment in self.segments:
+            segment.close()
+        if self._snapshot_map is not None:
+            self._snapshot_map.close()
+            self._snapshot_map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+
+import argparse
+import heapq
+import json
+import os
+import sys
+import time
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tools.model.durations import parse_duration
+
+# Largest block in a SortedKeys before it is split in two.
+BLOCK_SIZE = 512
+
+# Sort key for a missing or unreadable lastUpdated: older than any real time, so such instances count as stale.
+UNKNOWN_TIME = float("-inf")
+
+Key = Tuple[float, str]
+
+
+def timestamp_key(value: Any) -> float:
+    """Epoch seconds for an instance timestamp (or epoch number); naive ISO 8601 values are taken as UTC."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return UNKNOWN_TIME
+    if value.endswith(("Z", "z")):
+        # fromisoformat only accepts the UTC designator from Python 3.11 on.
+        value = value[:-1] + "+00:00"
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        return UNKNOWN_TIME
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+class SortedKeys:
+    """Sorted list of ``(lastUpdated, instanceId)`` keys kept in small blocks.
+
+    Inserting or removing a key moves at most one block, so updates stay
+    cheap when a state holds millions of instances. Transitions normally
+    carry the newest timestamp, which appends to the last block.
+    """
+
+    def __init__(self):
+        self.blocks: List[List[Key]] = []
+        self.maxes: List[Key] = []
+        self.size = 0
+
+    def add(self, key: Key):
+        self.size += 1
+        if not self.blocks:
+            self.blocks.append([key])
+            self.maxes.append(key)
+            return
+        index = bisect_left(self.maxes, key)
+        if index == len(self.maxes):
+            index -= 1
+            block = self.blocks[index]
+            block.append(key)
+            self.maxes[index] = key
+        else:
+            block = self.blocks[index]
+            insort(block, key)
+        if len(block) > BLOCK_SIZE:
+            half = len(block) // 2
+            self.blocks[index:index + 1] = [block[:half], block[half:]]
+            self.maxes[index:index + 1] = [block[half - 1], block[-1]]
+
+    def discard(self, key: Key) -> bool:
+        index = bisect_left(self.maxes, key)
+        if index == len(self.maxes):
+            return False
+        block = self.blocks[index]
+        position = bisect_left(block, key)
+        if position == len(block) or block[position] != key:
+            return False
+        del block[position]
+        self.size -= 1
+        if not block:
+            del self.blocks[index]
+            del self.maxes[index]
+        elif position == len(block):
+            self.maxes[index] = block[-1]
+        return True
+
+    def below(self, bound: float) -> Iterator[Key]:
+        """Keys older than ``bound``, oldest first."""
+        for block in self.blocks:
+            if block[-1][0] < bound:
+                yield from block
+            else:
+                yield from block[:bisect_left(block, (bound,))]
+                return
+
+    def __iter__(self) -> Iterator[Key]:
+        for block in self.blocks:
+            yield from block
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class InstanceIndex:
+    """Secondary indexes over instances: members per current state, ordered by lastUpdated.
+
+    Each state keeps its members sorted by ``lastUpdated``, which serves
+    both "all instances in ``error``" and "instances stuck in ``confirm``
+    since before T" without loading documents; queries across all states
+    merge the per-state orders. The index is kept current through
+    :meth:`update` or :meth:`apply` (one call per transition or log record)
+    and can be rebuilt from an event log or an instances directory in a
+    single streaming pass.
+    """
+
+    def __init__(self):
+        self.by_state: Dict[Optional[str], SortedKeys] = {}
+        self.entries: Dict[str, Tuple[Optional[str], float]] = {}
+
+    def update(self, instance_id: str, state_id: Optional[str], last_updated: Any):
+        """Record an instance's current state and lastUpdated, replacing its previous entry."""
+        updated = timestamp_key(last_updated)
+        previous = self.entries.get(instance_id)
+        if previous is not None:
+            if previous == (state_id, updated):
+                return
+            members = self.by_state[previous[0]]
+            members.discard((previous[1], instance_id))
+            if not members:
+                del self.by_state[previous[0]]
+        self.entries[instance_id] = (state_id, updated)
+        members = self.by_state.get(state_id)
+        if members is None:
+            members = self.by_state[state_id] = SortedKeys()
+        members.add((updated, instance_id))
+
+    def observe(self, instance: Dict[str, Any]):
+        """Index an instance document."""
+        self.update(instance["instanceId"], instance.get("currentState"), instance.get("lastUpdated"))
+
+    def apply(self, instance_id: str, record: Dict[str, Any]):
+        """Follow one event log record (see :func:`tools.storage.event_log.apply_record`)."""
+        kind = record["type"]
+        if kind == "create":
+            instance = record["instance"]
+            self.update(instance_id, instance.get("currentState"), instance.get("lastUpdated"))
+        elif kind == "transition":
+            self.update(instance_id, record["toStateId"], record["at"])
+        elif instance_id not in self.entries:
+            return
+        elif kind == "exit":
+            self.update(instance_id, self.entries[instance_id][0], record["at"])
+        elif kind == "set":
+            fields = record["fields"]
+            if "currentState" in fields or "lastUpdated" in fields:
+                state_id, updated = self.entries[instance_id]
+                self.update(instance_id, fields.get("currentState", state_id),
+                            fields["lastUpdated"] if "lastUpdated" in fields else updated)
+
+    def remove(self, instance_id: str) -> bool:
+        previous = self.entries.pop(instance_id, None)
+        if previous is None:
+            return False
+        members = self.by_state[previous[0]]
+        members.discard((previous[1], instance_id))
+        if not members:
+            del self.by_state[previous[0]]
+        return True
+
+    def clear(self):
+        self.by_state = {}
+        self.entries = {}
+
+    # Queries
+
+    def state_of(self, instance_id: str) -> Optional[str]:
+        entry = self.entries.get(instance_id)
+        return entry[0] if entry else None
+
+    def count(self, state_id: Optional[str] = None) -> int:
+        if state_id is None:
+            return len(self.entries)
+        members = self.by_state.get(state_id)
+        return len(members) if members else 0
+
+    def counts(self) -> Dict[Optional[str], int]:
+        return {state_id: len(members) for state_id, members in self.by_state.items()}
+
+    def in_state(self, state_id: str) -> List[str]:
+        """Instances currently in ``state_id``, least recently updated first."""
+        return [instance_id for _, instance_id in self.by_state.get(state_id, ())]
+
+    def updated_before(self, cutoff: Any, states: Optional[Iterable[str]] = None) -> List[str]:
+        """Instances whose lastUpdated is before ``cutoff`` (epoch seconds or timestamp), oldest first."""
+        bound = timestamp_key(cutoff)
+        selected = list(self.by_state) if states is None else [s for s in states if s in self.by_state]
+        if len(selected) == 1:
+            return [instance_id for _, instance_id in self.by_state[selected[0]].below(bound)]
+        return [instance_id for _, instance_id in heapq.merge(*(self.by_state[s].below(bound) for s in selected))]
+
+    def stale(self, older_than: float, states: Optional[Iterable[str]] = None,
+              now: Optional[float] = None) -> List[str]:
+        """Instances not updated for more than ``older_than`` seconds, e.g. ``stale(600, ["confirm"])``."""
+        return self.updated_before((time.time() if now is None else now) - older_than, states)
+
+    # Rebuilding
+
+    def rebuild_from_log(self, store) -> "InstanceIndex":
+        """Rebuild from an :class:`~tools.storage.event_log.EventLogStore`, streaming its records."""
+        self.clear()
+        for instance_id, record in store.iter_records():
+            self.apply(instance_id, record)
+        return self
+
+    def rebuild_from_files(self, instances_dir: str) -> "InstanceIndex":
+        """Rebuild from instance JSON files, reading one document at a time."""
+        self.clear()
+        for root, _, files in os.walk(instances_dir):
+            for name in sorted(files):
+                if not name.endswith(".json"):
+                    continue
+                with open(os.path.join(root, name), 'r') as f:
+                    try:
+                        document = json.load(f)
+                    except ValueError:
+                        continue
+                if isinstance(document, dict) and "instanceId" in document and "currentState" in document:
+                    self.observe(document)
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query instances by current state and staleness')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--log', help='Event log store directory')
+    source.add_argument('--instances', help='Directory holding instance JSON files')
+    parser.add_argument('--state', action='append', default=None, help='Only instances in this state; may be repeated')
+    parser.add_argument('--older-than', default=None,
+                        help='Only instances not updated for this ISO 8601 duration (e.g. PT10M)')
+    parser.add_argument('--now', default=None, help='Reference time for --older-than (default: current time)')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    args = parser.parse_args()
+
+    index = InstanceIndex()
+    if args.log:
+        from tools.storage.event_log import EventLogStore
+        with EventLogStore(args.log) as store:
+            index.rebuild_from_log(store)
+    else:
+        index.rebuild_from_files(args.instances)
+
+    if args.state is None and args.older_than is None:
+        counts = index.counts()
+        if args.json:
+            print(json.dumps(counts, indent=2))
+        else:
+            for state_id, count in sorted(counts.items(), key=lambda item: (-item[1], str(item[0]))):
+                print(f"{count:>10}  {state_id}")
+        return
+
+    if args.older_than is not None:
+        now = timestamp_key(args.now) if args.now else None
+        matches = index.stale(parse_duration(args.older_than), args.state, now)
+    else:
+        matches = index.updated_before(float("inf"), args.state)
+    if args.json:
+        print(json.dumps([{"instanceId": instance_id, "currentState": index.entries[instance_id][0]}
+                          for instance_id in matches], indent=2))
+    else:
+        for instance_id in matches:
+            print(instance_id)
+
+
+if __name__ == "__main__":
+    main()
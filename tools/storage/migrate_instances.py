@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import sys
+from typing import Dict, Iterator, Any, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tools.storage.event_log import EventLogStore
+
+
+def iter_instance_files(instances_dir: str) -> Iterator[str]:
+    """Yield instance documents: JSON files carrying an instanceId and stateHistory."""
+    for root, _, files in os.walk(instances_dir):
+        for name in sorted(files):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'r') as f:
+                try:
+                    document = json.load(f)
+                except ValueError:
+                    continue
+            if isinstance(document, dict) and "instanceId" in document and "stateHistory" in document:
+                yield path
+
+
+def resolve_data_ref(data_ref: str, instance_file: str, base_dirs) -> Optional[str]:
+    """Find a dataRef file; refs are normally relative to the repository root."""
+    candidates = [data_ref] if os.path.isabs(data_ref) else \
+        [os.path.join(base, data_ref) for base in base_dirs] + [os.path.join(os.path.dirname(instance_file), data_ref)]
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def migrate_instance(store: EventLogStore, instance_file: str, base_dirs) -> Dict[str, Any]:
+    """Append the records reproducing one file-based instance; returns the expected document."""
+    with open(instance_file, 'r') as f:
+        document = json.load(f)
+
+    instance_id = document["instanceId"]
+    history = document.get("stateHistory", [])
+    expected = {key: value for key, value in document.items() if key != "stateHistory"}
+    expected["stateHistory"] = []
+
+    state_documents = []
+    for entry in history:
+        state_document = None
+        if entry.get("dataRef"):
+            path = resolve_data_ref(entry["dataRef"], instance_file, base_dirs)
+            if path is None:
+                raise FileNotFoundError(f"{instance_file}: dataRef {entry['dataRef']} not found")
+            with open(path, 'r') as f:
+                state_document = json.load(f)
+        state_documents.append(state_document)
+
+        visit = {key: value for key, value in entry.items() if key != "dataRef"}
+        if state_document is not None:
+            if "data" in state_document:
+                visit["data"] = state_document["data"]
+            if "actions" in state_document:
+                visit["actions"] = state_document["actions"]
+        expected["stateHistory"].append(visit)
+
+    first = history[0] if history else None
+    initial = {key: value for key, value in document.items() if key != "stateHistory"}
+    initial["stateHistory"] = []
+    if first is not None:
+        initial["currentState"] = first["stateId"]
+        initial["stateHistory"].append({"stateId": first["stateId"], "enteredAt": first["enteredAt"]})
+    store.create_instance(initial)
+
+    for position, entry in enumerate(history):
+        if position > 0:
+            previous = history[position - 1]
+            store.record_transition(instance_id, entry["stateId"], entry["enteredAt"],
+                                    exited_at=previous.get("exitedAt", entry["enteredAt"]))
+        state_document = state_documents[position]
+        if state_document is not None and "data" in state_document:
+            store.record_state_data(instance_id, entry["stateId"], state_document["data"])
+        for action in (state_document or {}).get("actions", []):
+            store.record_action(instance_id, entry["stateId"], action)
+
+    if history and "exitedAt" in history[-1]:
+        store.record_exit(instance_id, history[-1]["exitedAt"])
+
+    # Top-level fields are restored verbatim; in particular consolidatedData is
+    # not assumed to equal the merge of the per-state data files.
+    store.record_fields(instance_id, {key: value for key, value in document.items() if key != "stateHistory"})
+    return expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrate file-based instances and state data into an event log store')
+    parser.add_argument('instances_dir', help='Directory holding instance JSON files (e.g. instances)')
+    parser.add_argument('log_dir', help='Event log store directory to write')
+    parser.add_argument('--base-dir', action='append', default=[],
+                        help='Directory dataRef paths are relative to (default: current directory and the '
+                             'parent of instances_dir)')
+    parser.add_argument('--no-snapshot', action='store_true', help='Do not compact into a snapshot after migrating')
+    parser.add_argument('--verify', action='store_true', help='Rebuild every migrated instance and compare it')
+
+    args = parser.parse_args()
+
+    base_dirs = args.base_dir or [os.getcwd(), os.path.dirname(os.path.abspath(args.instances_dir))]
+    expected = {}
+    with EventLogStore(args.log_dir) as store:
+        for instance_file in iter_instance_files(args.instances_dir):
+            document = migrate_instance(store, instance_file, base_dirs)
+            if args.verify:
+                expected[document["instanceId"]] = document
+        if not args.no_snapshot:
+            store.snapshot()
+
+        mismatches = [instance_id for instance_id, document in expected.items()
+                      if store.load(instance_id) != document]
+
+    if args.verify and mismatches:
+        print(f"Verification failed for {len(mismatches)} instance(s): {', '.join(mismatches[:10])}")
+        sys.exit(1)
+    print(f"Migrated {len(store.instance_ids())} instance(s) into {args.log_dir}")
+
+
+if __name__ == "__main__":
+    main()
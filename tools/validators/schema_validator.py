@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import re
+import sys
+from typing import Callable, Dict, Iterator, List, Any, Optional, Tuple
+
+# A check appends (path, message) violations for the value it is given.
+Violation = Tuple[str, str]
+Check = Callable[[Any, str, List[Violation]], None]
+
+FORMAT_PATTERNS = {
+    "uuid": re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"),
+    "date-time": re.compile(r"^\d{4}-\d{2}-\d{2}[Tt ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:[Zz]|[+-]\d{2}:\d{2})$"),
+    "date": re.compile(r"^\d{4}-\d{2}-\d{2}$"),
+    "time": re.compile(r"^\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:[Zz]|[+-]\d{2}:\d{2})?$"),
+    "email": re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$"),
+}
+
+TYPE_CHECKS = {
+    "string": lambda value: isinstance(value, str),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "integer": lambda value: (isinstance(value, int) and not isinstance(value, bool))
+                             or (isinstance(value, float) and value.is_integer()),
+    "boolean": lambda value: isinstance(value, bool),
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "null": lambda value: value is None,
+}
+
+# Keywords that only annotate a schema and never produce violations.
+ANNOTATION_KEYWORDS = {"$schema", "$id", "$comment", "title", "description", "default", "examples"}
+
+_pattern_cache: Dict[str, "re.Pattern"] = {}
+
+
+def _compiled_pattern(pattern: str) -> "re.Pattern":
+    compiled = _pattern_cache.get(pattern)
+    if compiled is None:
+        compiled = _pattern_cache[pattern] = re.compile(pattern)
+    return compiled
+
+
+def _child_path(path: str, key: Any) -> str:
+    return f"{path}/{key}" if path else f"/{key}"
+
+
+def compile_schema(schema: Dict[str, Any]) -> Check:
+    """Compile a draft-07 schema into a single check function.
+
+    Supported keywords: type, enum, const, properties, required,
+    additionalProperties, items, minItems, maxItems, minimum, maximum,
+    exclusiveMinimum, exclusiveMaximum, minLength, maxLength, pattern and
+    format (uuid, date-time, date, time, email). Unknown keywords raise
+    ValueError so that a schema is never silently under-validated.
+    """
+    if schema is True or schema == {}:
+        return lambda value, path, errors: None
+    if schema is False:
+        return lambda value, path, errors: errors.append((path, "no value is allowed here"))
+
+    checks: List[Check] = []
+    unsupported = set(schema) - ANNOTATION_KEYWORDS - set(_KEYWORD_COMPILERS)
+    if unsupported:
+        raise ValueError(f"Unsupported schema keywords: {', '.join(sorted(unsupported))}")
+
+    for keyword, compiler in _KEYWORD_COMPILERS.items():
+        if keyword in schema:
+            check = compiler(schema[keyword], schema)
+            if check is not None:
+                checks.append(check)
+
+    if len(checks) == 1:
+        return checks[0]
+
+    def validate(value, path, errors):
+        for check in checks:
+            check(value, path, errors)
+    return validate
+
+
+def _compile_type(expected, schema) -> Check:
+    names = expected if isinstance(expected, list) else [expected]
+    predicates = [TYPE_CHECKS[name] for name in names]
+    label = " or ".join(names)
+
+    def check(value, path, errors):
+        for predicate in predicates:
+            if predicate(value):
+                return
+        errors.append((path, f"expected {label}, got {type(value).__name__}"))
+    return check
+
+
+def _compile_enum(allowed, schema) -> Check:
+    allowed_strings = frozenset(item for item in allowed if isinstance(item, str))
+
+    def check(value, path, errors):
+        if isinstance(value, str):
+            found = value in allowed_strings
+        else:
+            found = any(value == item and isinstance(value, bool) == isinstance(item, bool) for item in allowed)
+        if not found:
+            errors.append((path, f"{value!r} is not one of {allowed!r}"))
+    return check
+
+
+def _compile_const(expected, schema) -> Check:
+    def check(value, path, errors):
+        if value != expected:
+            errors.append((path, f"{value!r} is not {expected!r}"))
+    return check
+
+
+def _compile_properties(properties, schema) -> Check:
+    compiled = [(name, compile_schema(subschema)) for name, subschema in properties.items()]
+
+    def check(value, path, errors):
+        if not isinstance(value, dict):
+            return
+        for name, validate in compiled:
+            if name in value:
+                validate(value[name], _child_path(path, name), errors)
+    return check
+
+
+def _compile_required(required, schema) -> Check:
+    def check(value, path, errors):
+        if not isinstance(value, dict):
+            return
+        for name in required:
+            if name not in value:
+                errors.append((path, f"missing required property {name!r}"))
+    return check
+
+
+def _compile_additional_properties(additional, schema) -> Optional[Check]:
+    if additional is True:
+        return None
+    known = frozenset(schema.get("properties", {}))
+    validate = None if additional is False else compile_schema(additional)
+
+    def check(value, path, errors):
+        if not isinstance(value, dict):
+            return
+        for name in value:
+            if name in known:
+                continue
+            if validate is None:
+                errors.append((path, f"additional property {name!r} is not allowed"))
+            else:
+                validate(value[name], _child_path(path, name), errors)
+    return check
+
+
+def _compile_items(items, schema) -> Check:
+    if isinstance(items, list):
+        compiled = [compile_schema(subschema) for subschema in items]
+
+        def check_tuple(value, path, errors):
+            if isinstance(value, list):
+                for index, (item, validate) in enumerate(zip(value, compiled)):
+                    validate(item, _child_path(path, index), errors)
+        return check_tuple
+
+    validate = compile_schema(items)
+
+    def check(value, path, errors):
+        if isinstance(value, list):
+            for index, item in enumerate(value):
+                validate(item, _child_path(path, index), errors)
+    return check
+
+
+def _compile_bound(test, message) -> Callable[[Any, Dict], Check]:
+    def compiler(limit, schema) -> Check:
+        def check(value, path, errors):
+            if TYPE_CHECKS["number"](value) and not test(value, limit):
+                errors.append((path, f"{value!r} {message} {limit!r}"))
+        return check
+    return compiler
+
+
+def _compile_length(test, message, applies) -> Callable[[Any, Dict], Check]:
+    def compiler(limit, schema) -> Check:
+        def check(value, path, errors):
+            if applies(value) and not test(len(value), limit):
+                errors.append((path, f"length {len(value)} {message} {limit}"))
+        return check
+    return compiler
+
+
+def _compile_pattern(pattern, schema) -> Check:
+    search = _compiled_pattern(pattern).search
+
+    def check(value, path, errors):
+        if isinstance(value, str) and search(value) is None:
+            errors.append((path, f"{value!r} does not match {pattern!r}"))
+    return check
+
+
+def _compile_format(name, schema) -> Optional[Check]:
+    pattern = FORMAT_PATTERNS.get(name)
+    if pattern is None:
+        # Unknown formats are annotations in draft-07.
+        return None
+    match = pattern.match
+
+    def check(value, path, errors):
+        if isinstance(value, str) and match(value) is None:
+            errors.append((path, f"{value!r} is not a valid {name}"))
+    return check
+
+
+_KEYWORD_COMPILERS: Dict[str, Callable[[Any, Dict], Optional[Check]]] = {
+    "type": _compile_type,
+    "enum": _compile_enum,
+    "const": _compile_const,
+    "required": _compile_required,
+    "properties": _compile_properties,
+    "additionalProperties": _compile_additional_properties,
+    "items": _compile_items,
+    "minItems": _compile_length(lambda size, limit: size >= limit, "is less than", lambda v: isinstance(v, list)),
+    "maxItems": _compile_length(lambda size, limit: size <= limit, "is greater than", lambda v: isinstance(v, list)),
+    "minLength": _compile_length(lambda size, limit: size >= limit, "is less than", lambda v: isinstance(v, str)),
+    "maxLength": _compile_length(lambda size, limit: size <= limit, "is greater than", lambda v: isinstance(v, str)),
+    "minimum": _compile_bound(lambda v, limit: v >= limit, "is less than"),
+    "maximum": _compile_bound(lambda v, limit: v <= limit, "is greater than"),
+    "exclusiveMinimum": _compile_bound(lambda v, limit: v > limit, "is not greater than"),
+    "exclusiveMaximum": _compile_bound(lambda v, limit: v < limit, "is not less than"),
+    "pattern": _compile_pattern,
+    "format": _compile_format,
+}
+
+
+class DefinitionValidators:
+    """Compiled ``data.schema`` validators for every state of a definition."""
+
+    def __init__(self, definition: Dict[str, Any]):
+        self.state_machine_id = definition["stateMachineId"]
+        self.version = definition.get("version")
+        self.validators: Dict[str, Check] = {}
+        for state in definition["states"]:
+            schema = state.get("data", {}).get("schema")
+            if schema is not None:
+                self.validators[state["stateId"]] = compile_schema(schema)
+
+    def validate(self, state_id: str, data: Any) -> List[Violation]:
+        """Validate state data, returning (JSON pointer, message) violations."""
+        validate = self.validators.get(state_id)
+        if validate is None:
+            return []
+        errors: List[Violation] = []
+        validate(data, "", errors)
+        return errors
+
+
+_definition_cache: Dict[Tuple[str, Any], DefinitionValidators] = {}
+
+
+def get_validators(definition: Dict[str, Any]) -> DefinitionValidators:
+    """Return the compiled validators for a definition, compiling once per version."""
+    key = (definition["stateMachineId"], definition.get("version"))
+    validators = _definition_cache.get(key)
+    if validators is None:
+        validators = _definition_cache[key] = DefinitionValidators(definition)
+    return validators
+
+
+# Bulk validation of instances/state-data files. Each worker process compiles
+# the definition once in its initializer and then validates files by path.
+
+_worker_validators: Optional[DefinitionValidators] = None
+
+
+def _init_worker(definition: Dict[str, Any]):
+    global _worker_validators
+    _worker_validators = get_validators(definition)
+
+
+def validate_state_data_file(file_path: str, validators: Optional[DefinitionValidators] = None) -> Dict[str, Any]:
+    """Validate one state-data file against its state's schema."""
+    validators = validators or _worker_validators
+    try:
+        with open(file_path, 'r') as f:
+            document = json.load(f)
+    except (OSError, ValueError) as e:
+        return {"file": file_path, "stateId": None, "violations": [["", f"unreadable: {e}"]]}
+
+    state_id = document.get("stateId")
+    if state_id not in validators.validators:
+        return {"file": file_path, "stateId": state_id, "violations": [["/stateId", f"unknown state {state_id!r}"]]}
+    violations = validators.validate(state_id, document.get("data", {}))
+    return {"file": file_path, "stateId": state_id, "violations": [list(v) for v in violations]}
+
+
+def iter_state_data_files(directory: str) -> Iterator[str]:
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.endswith(".json"):
+                yield os.path.join(root, name)
+
+
+def validate_directory(definition: Dict[str, Any], directory: str, workers: Optional[int] = None,
+                       chunksize: int = 64) -> Iterator[Dict[str, Any]]:
+    """Validate every state-data file under a directory across a process pool.
+
+    Results are yielded as they complete (in file order), so callers can
+    stream violations without waiting for the whole directory.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(definition,)) as executor:
+        yield from executor.map(validate_state_data_file, iter_state_data_files(directory), chunksize=chunksize)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Validate state data against the per-state schemas of a definition')
+    parser.add_argument('definition_file', help='State machine definition JSON file')
+    parser.add_argument('state_data', help='State-data JSON file, or a directory such as instances/state-data')
+    parser.add_argument('--workers', type=int, help='Worker processes for directory validation (default: CPU count)')
+    parser.add_argument('--json', action='store_true', help='Print one JSON object per file with violations')
+
+    args = parser.parse_args()
+
+    with open(args.definition_file, 'r') as f:
+        definition = json.load(f)
+
+    if os.path.isdir(args.state_data):
+        results = validate_directory(definition, args.state_data, args.workers)
+    else:
+        results = iter([validate_state_data_file(args.state_data, get_validators(definition))])
+
+    checked = failed = 0
+    for result in results:
+        checked += 1
+        if not result["violations"]:
+            continue
+        failed += 1
+        if args.json:
+            print(json.dumps(result), flush=True)
+        else:
+            for pointer, message in result["violations"]:
+                print(f"{result['file']}: {result['stateId']}{pointer or '/'}: {message}", flush=True)
+
+    print(f"Validated {checked} file(s): {failed} with violations", file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()